@@ -0,0 +1,80 @@
+import math
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+
+from navigator.cache import CACHE_DIR
+from navigator.geo import haversine
+from navigator.spatial import SpatialIndex
+
+
+# ====== ĐỒ THỊ DÙNG CHO BENCHMARK ======
+# Tất cả đều dựng được khi không có mạng:
+#   - fixture OSM nhỏ trong benchmarks/fixtures (đọc bằng osmnx.graph_from_xml)
+#   - lưới phố lệch và đồ thị hình học ngẫu nhiên (k láng giềng gần nhất) theo seed
+#   - các file cache .gtg đã có sẵn trên máy (chỉ đo các bước sau khi tải)
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+LAT0, LON0 = 10.7626, 106.6602     # quanh trung tâm TP.HCM
+STEP_DEG = 0.0009                  # ~100 m giữa hai giao lộ
+ONEWAY_SHARE = 0.2
+MAX_DETOUR = 0.15                  # độ dài cạnh = haversine x (1 + U[0, MAX_DETOUR])
+
+
+def _multigraph(lat, lon, src, dst, rng):
+    # Cạnh hai chiều trừ một phần ngẫu nhiên là đường một chiều (hướng ngẫu nhiên)
+    lengths = haversine(lat[src], lon[src], lat[dst], lon[dst]) * (1 + rng.uniform(0, MAX_DETOUR, len(src)))
+    oneway = rng.random(len(src)) < ONEWAY_SHARE
+    flip = rng.random(len(src)) < 0.5
+    G = nx.MultiDiGraph()
+    for i in range(len(lat)):
+        G.add_node(i + 1, y=float(lat[i]), x=float(lon[i]))
+    for u, v, length, one, swap in zip(src.tolist(), dst.tolist(), lengths.tolist(), oneway.tolist(), flip.tolist()):
+        if one and swap:
+            u, v = v, u
+        G.add_edge(u + 1, v + 1, length=length)
+        if not one:
+            G.add_edge(v + 1, u + 1, length=length)
+    return G
+
+
+def grid_graph(n_nodes, seed=0):
+    rng = np.random.default_rng(seed)
+    side = max(2, int(math.ceil(math.sqrt(n_nodes))))
+    jj, ii = np.divmod(np.arange(side * side), side)
+    lat = LAT0 + (jj + rng.uniform(-0.15, 0.15, side * side)) * STEP_DEG
+    lon = LON0 + (ii + rng.uniform(-0.15, 0.15, side * side)) * STEP_DEG
+    idx = np.arange(side * side).reshape(side, side)
+    src = np.concatenate([idx[:, :-1].ravel(), idx[:-1, :].ravel()])
+    dst = np.concatenate([idx[:, 1:].ravel(), idx[1:, :].ravel()])
+    return _multigraph(lat, lon, src, dst, rng)
+
+
+def random_geometric_graph(n_nodes, seed=0, k=3):
+    # Điểm ngẫu nhiên với mật độ như lưới, mỗi điểm nối tới k điểm gần nhất
+    rng = np.random.default_rng(seed)
+    side = math.sqrt(n_nodes) * STEP_DEG
+    lat = LAT0 + rng.uniform(0, side, n_nodes)
+    lon = LON0 + rng.uniform(0, side, n_nodes)
+    index = SpatialIndex(lat, lon)
+    pairs = set()
+    for i in range(n_nodes):
+        nodes, _ = index.k_nearest(lat[i], lon[i], k + 1)
+        for j in nodes.tolist():
+            if j != i:
+                pairs.add((min(i, j), max(i, j)))
+    src, dst = np.array(sorted(pairs)).T
+    return _multigraph(lat, lon, src, dst, rng)
+
+
+def fixture_graphs():
+    # {tên: MultiDiGraph} cho mỗi file .osm trong thư mục fixture (cần osmnx)
+    import osmnx as ox
+
+    return {f"fixture:{path.stem}": ox.graph_from_xml(path, simplify=True, retain_all=True)
+            for path in sorted(FIXTURE_DIR.glob("*.osm"))}
+
+
+def cached_graphs(cache_dir=None):
+    # {tên: đường dẫn} cho các file cache đồ thị có sẵn
+    return {f"cache:{path.stem}": path for path in sorted(Path(cache_dir or CACHE_DIR).glob("*.gtg"))}
@@ -0,0 +1,298 @@
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import folium
+import numpy as np
+from folium.plugins import AntPath
+
+from navigator.alternatives import find_truly_different_paths
+from navigator.cache import read_graph, write_graph
+from navigator.core import route
+from navigator.graph import RoutingGraph
+from navigator.isochrone import isochrone
+from navigator.reduction import contract_chains, find_components
+from navigator.render import build_base_map, exploration_layer, simplify_edges
+from navigator.search import dijkstra
+
+from .graphs import cached_graphs, fixture_graphs, grid_graph, random_geometric_graph
+
+
+# ====== BENCHMARK OFFLINE ======
+# Đo từng bước trên các đồ thị fixture / tổng hợp / cache cục bộ với cặp OD ngẫu nhiên theo seed,
+# báo cáo p50/p95 (ms), số node đã chốt và đỉnh bộ nhớ (tracemalloc, đo riêng một lần gọi),
+# so với baseline đã lưu và trả mã lỗi 1 khi có hồi quy.
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+SEARCH_MODES = ("greedy", "astar", "bidirectional")
+ISOCHRONE_M = 1500
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+def run_stage(calls, settled_of=None, rounds=3):
+    # Như timeit: chạy nóng một lần, tắt GC khi đo, lấy thời gian nhỏ nhất của mỗi lệnh gọi qua các vòng.
+    # Vòng ngoài là số lần chạy nên các lần đo của cùng một lệnh gọi rải đều suốt bước: máy bận
+    # trong một lúc chỉ làm hỏng một vòng chứ không phải mọi lần đo của lệnh gọi đó
+    calls[0]()
+    best = [np.inf] * len(calls)
+    outs = [None] * len(calls)
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            for i, call in enumerate(calls):
+                started = time.perf_counter()
+                outs[i] = call()
+                best[i] = min(best[i], time.perf_counter() - started)
+    finally:
+        gc.enable()
+    times = [b * 1000 for b in best]
+    settled = [] if settled_of is None else [settled_of(out) for out in outs]
+    del outs
+    tracemalloc.start()
+    calls[0]()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "n": len(calls),
+        "p50_ms": _percentile(times, 50),
+        "p95_ms": _percentile(times, 95),
+        "settled_p50": _percentile(settled, 50),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def result_map_html(graph, path, edges, paths):
+    # Giống bản đồ tổng quan trên giao diện: vùng đã duyệt + đường khám phá + các đường thay thế
+    m = folium.Map(location=[float(graph.y.mean()), float(graph.x.mean())], zoom_start=14)
+    exploration_layer(graph, edges).add_to(m)
+    AntPath([(graph.y[n], graph.x[n]) for n in path], color="blue", weight=6, delay=800).add_to(m)
+    for p, color in zip(paths, ("red", "purple", "darkgreen")):
+        AntPath([(graph.y[n], graph.x[n]) for n in p], color=color, weight=4, delay=800).add_to(m)
+    return m._repr_html_()
+
+
+def od_nodes(graph, rng, tries=5):
+    # Node thuộc một thành phần liên thông mạnh lớn (giao của vùng tới được xuôi và ngược
+    # từ một node ngẫu nhiên) để mọi cặp OD đều có đường đi
+    rev, _ = graph.reversed_graph()
+    best = np.arange(0)
+    for seed in rng.integers(0, graph.n_nodes, size=tries).tolist():
+        forward, _ = dijkstra(graph, seed)
+        backward, _ = dijkstra(rev, seed)
+        nodes = np.flatnonzero(np.isfinite(forward) & np.isfinite(backward))
+        if len(nodes) > len(best):
+            best = nodes
+        if len(best) * 2 > graph.n_nodes:
+            break
+    return best
+
+
+def bench_graph(graph, G_multi, args, tmp_dir):
+    rng = np.random.default_rng(args.seed)
+    pairs = rng.choice(od_nodes(graph, rng), size=(args.queries, 2)).tolist()
+    alt_pairs = pairs[:args.alt_queries]
+    results = {}
+
+    if G_multi is not None:
+        results["convert"] = run_stage([lambda: RoutingGraph.from_multigraph(G_multi)], rounds=args.rounds)
+
+    path = Path(tmp_dir) / "bench.gtg"
+    write_graph(path, graph)
+
+    def load():
+        g = read_graph(path)
+        return float(g.lengths.sum()) + int(g.offsets[-1])    # chạm vào toàn bộ trang đã mmap
+    results["cache_load"] = run_stage([load], rounds=args.rounds)
+
+    for mode in SEARCH_MODES:
+        results[mode] = run_stage([lambda s=s, t=t: route(graph, s, t, mode) for s, t in pairs],
+                                  settled_of=lambda r: r.stats["settled"], rounds=args.rounds)
+    # Tiền xử lý rút gọn và A* trên đồ thị đã rút gọn chuỗi node bậc 2
+    results["reduce"] = run_stage([lambda: (find_components(graph), contract_chains(graph))], rounds=args.rounds)
+    contracted = contract_chains(graph)
+    results["astar_reduced"] = run_stage([lambda s=s, t=t: contracted.route(s, t) for s, t in pairs],
+                                         settled_of=lambda r: r.stats["settled"], rounds=args.rounds)
+    # Vùng đến được trong ISOCHRONE_M từ mỗi điểm xuất phát, và một lần cho mọi điểm cùng lúc (+ đa giác)
+    results["isochrone"] = run_stage([lambda s=s: isochrone(graph, s, ISOCHRONE_M) for s, _ in alt_pairs],
+                                     settled_of=lambda r: r.stats["settled"], rounds=args.rounds)
+    origins = [s for s, _ in pairs]
+    results["iso_multi"] = run_stage([lambda: isochrone(graph, origins, ISOCHRONE_M)],
+                                     settled_of=lambda r: r.stats["settled"], rounds=args.rounds)
+    many = isochrone(graph, origins, ISOCHRONE_M)
+    results["iso_polygon"] = run_stage([lambda: many.polygon()], rounds=args.rounds)
+    results["alternatives"] = run_stage(
+        [lambda s=s, t=t: find_truly_different_paths(graph, s, t, max_paths=3) for s, t in alt_pairs],
+        rounds=args.rounds)
+
+    center = (float(graph.y.mean()), float(graph.x.mean()))
+    results["base_map"] = run_stage([lambda: build_base_map(graph, center)._repr_html_()], rounds=args.rounds)
+
+    maps = []
+    for s, t in alt_pairs:
+        explored = route(graph, s, t, "greedy", track_edges=True)
+        maps.append((explored.path, simplify_edges(graph, explored.edges),
+                     find_truly_different_paths(graph, s, t, max_paths=3)))
+    results["result_map"] = run_stage([lambda m=m: result_map_html(graph, *m) for m in maps], rounds=args.rounds)
+    return results
+
+
+def collect_graphs(args):
+    # Trả về danh sách (tên, hàm dựng -> (RoutingGraph, MultiDiGraph hoặc None))
+    sources = []
+    if not args.no_fixtures:
+        try:
+            for name, G in fixture_graphs().items():
+                sources.append((name, lambda G=G: (RoutingGraph.from_multigraph(G), G)))
+        except ImportError:
+            print("osmnx chưa được cài, bỏ qua fixture OSM", file=sys.stderr)
+    builders = {"grid": grid_graph, "rgg": random_geometric_graph}
+    for kind in args.kinds.split(","):
+        for size in (int(v) for v in args.sizes.split(",")):
+            def build(kind=kind, size=size):
+                G = builders[kind](size, args.seed)
+                return RoutingGraph.from_multigraph(G), G
+            sources.append((f"{kind}:{size}", build))
+    if not args.no_cache:
+        for name, path in cached_graphs(args.cache_dir).items():
+            sources.append((name, lambda path=path: (read_graph(path), None)))
+    return sources
+
+
+# ====== SO SÁNH VỚI BASELINE ======
+METRICS = ("p50_ms", "p95_ms", "settled_p50", "peak_kb")
+TIME_METRICS = ("p50_ms", "p95_ms")
+
+
+def compare(results, baseline, args):
+    # Hồi quy khi giá trị mới > cũ x hệ số cho phép và vượt ngưỡng nhiễu tuyệt đối.
+    # Trả về danh sách (đồ thị, bước, chỉ số hoặc None, mô tả)
+    limits = {"p50_ms": (args.time_tolerance, args.noise_ms), "p95_ms": (args.time_tolerance, args.noise_ms),
+              "settled_p50": (args.settled_tolerance, 0), "peak_kb": (args.memory_tolerance, 64)}
+    # Bước mới chưa có trong baseline cũng bị báo (đồ thị không có trong baseline, vd cache cục bộ, thì bỏ qua)
+    regressions = []
+    for name, stages in results.items():
+        known = baseline.get("results", {}).get(name)
+        if known is None:
+            continue
+        for stage, current in stages.items():
+            base = known.get(stage)
+            if base is None:
+                regressions.append((name, stage, None,
+                                    f"{name} {stage}: chưa có trong baseline (chạy lại với --save-baseline)"))
+                continue
+            for metric in METRICS:
+                old, new = base.get(metric), current.get(metric)
+                factor, floor = limits[metric]
+                if old is not None and new is not None and new > old * factor and new - old > floor:
+                    regressions.append((name, stage, metric, f"{name} {stage} {metric}: {old} -> {new} "
+                                                             f"(x{new / old if old else float('inf'):.2f})"))
+    return regressions
+
+
+def keep_faster(results, rerun):
+    # Gộp lần đo lại: mỗi bước giữ thời gian tốt hơn của hai lần (nhiễu chỉ làm chậm đi)
+    for name, stages in rerun.items():
+        for stage, current in stages.items():
+            first = results[name][stage]
+            for metric in TIME_METRICS:
+                first[metric] = min(first[metric], current[metric])
+
+
+def print_table(results, sizes):
+    header = f"{'đồ thị':<24}{'bước':<15}{'n':>5}{'p50 ms':>11}{'p95 ms':>11}{'chốt p50':>11}{'đỉnh KB':>11}"
+    print(header)
+    print("-" * len(header))
+    for name, stages in results.items():
+        print(f"{name}  ({sizes[name][0]} node, {sizes[name][1]} cạnh)")
+        for stage, r in stages.items():
+            settled = "" if r["settled_p50"] is None else f"{r['settled_p50']:.0f}"
+            print(f"{'':<24}{stage:<15}{r['n']:>5}{r['p50_ms']:>11.2f}{r['p95_ms']:>11.2f}{settled:>11}{r['peak_kb']:>11.1f}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark offline: tải cache, chuyển đổi, tìm đường, vẽ bản đồ")
+    parser.add_argument("--sizes", default="2500,10000", help="số node của đồ thị tổng hợp, cách nhau bởi dấu phẩy")
+    parser.add_argument("--kinds", default="grid,rgg", help="loại đồ thị tổng hợp: grid, rgg")
+    parser.add_argument("--queries", type=int, default=40, help="số cặp OD cho các bước tìm kiếm")
+    parser.add_argument("--alt-queries", type=int, default=8, help="số cặp OD cho đường thay thế và bản đồ kết quả")
+    parser.add_argument("--rounds", type=int, default=3, help="số lần chạy mỗi lệnh gọi, lấy thời gian nhỏ nhất")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-fixtures", action="store_true")
+    parser.add_argument("--no-cache", action="store_true", help="bỏ qua các file cache đồ thị cục bộ")
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--output", default=None, help="ghi kết quả JSON")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="file baseline để so sánh")
+    parser.add_argument("--save-baseline", action="store_true", help="ghi kết quả lần chạy này làm baseline")
+    parser.add_argument("--time-tolerance", type=float, default=2.0)
+    parser.add_argument("--settled-tolerance", type=float, default=1.1)
+    parser.add_argument("--memory-tolerance", type=float, default=1.5)
+    parser.add_argument("--noise-ms", type=float, default=1.0, help="chênh lệch thời gian nhỏ hơn mức này được bỏ qua")
+    parser.add_argument("--no-confirm", action="store_true",
+                        help="không đo lại đồ thị có hồi quy thời gian trước khi báo lỗi")
+    return parser
+
+
+def run_graphs(sources, args):
+    results, sizes = {}, {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, build in sources:
+            graph, G_multi = build()
+            sizes[name] = (graph.n_nodes, graph.n_edges)
+            print(f"… {name}", file=sys.stderr)
+            results[name] = bench_graph(graph, G_multi, args, tmp_dir)
+    return results, sizes
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sources = collect_graphs(args)
+    results, sizes = run_graphs(sources, args)
+
+    report = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                 "seed": args.seed, "queries": args.queries, "alt_queries": args.alt_queries, "rounds": args.rounds,
+                 "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "sizes": sizes,
+        "results": results,
+    }
+    print_table(results, sizes)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Đã lưu baseline -> {args.baseline}")
+        return 0
+
+    baseline_path = Path(args.baseline)
+    if not baseline_path.exists():
+        print("Chưa có baseline, chạy lại với --save-baseline để tạo")
+        return 0
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions = compare(results, baseline, args)
+    # Hồi quy thời gian có thể chỉ là nhiễu của máy: đo lại các đồ thị đó một lần và chỉ báo
+    # những bước vẫn chậm ở cả hai lần
+    noisy = sorted({name for name, _, metric, _ in regressions if metric in TIME_METRICS})
+    if noisy and not args.no_confirm:
+        print(f"… đo lại để xác nhận: {', '.join(noisy)}", file=sys.stderr)
+        keep_faster(results, run_graphs([s for s in sources if s[0] in noisy], args)[0])
+        regressions = compare(results, baseline, args)
+    if regressions:
+        print(f"\nHỒI QUY so với {baseline_path}:")
+        for *_, line in regressions:
+            print(f"  ✗ {line}")
+        return 1
+    print(f"\nKhông có hồi quy so với {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
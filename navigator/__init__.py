@@ -0,0 +1,18 @@
+from .graph import RoutingGraph
+from .search import greedy_best_first, dijkstra, shortest_path
+from .core import MODES, EdgeWeights, SearchWorkspace, route
+from .alternatives import alternative_routes, find_truly_different_paths, path_overlap
+from .cache import get_graph_from_cache
+from .build import build_all, load_extract
+from .config import CITYWIDE, DISTRICTS
+from .store import GraphStore, get_store
+from .spatial import SpatialIndex
+from .engine import one_to_many, route_matrix
+from .isochrone import Isochrone, isochrone, plan_isochrone
+from .landmarks import Landmarks, get_landmarks, load_landmarks
+from .attributes import AttributeStore, get_attributes
+from .reduction import Components, ContractedGraph, contract_chains, find_components, get_reduction, largest_component
+from .routecache import RouteCache, get_route_cache
+from .planner import plan_routes, submit_routes
+from .executor import QueryExecutor, QueueFull, get_executor
+from .traffic import TrafficWeights, get_traffic
@@ -0,0 +1,212 @@
+from heapq import heappush, heappop
+
+import numpy as np
+
+from .core import out_edges
+from .executor import checkpoint
+from .geo import goal_heuristic
+from .search import astar, dijkstra, reconstruct_path
+
+
+# ====== TÌM CÁC ĐƯỜNG ĐI KHÁC NHAU ======
+# Không copy đồ thị: mọi biến thể chỉ dùng mảng trọng số / mặt nạ node tái sử dụng.
+# Một đường thay thế được nhận khi:
+#   - độ giãn (chi phí / chi phí đường tốt nhất) <= max_stretch
+#   - độ chồng lấn với mỗi đường đã nhận (tổng độ dài cạnh chung / độ dài đường) <= max_overlap
+# Chi phí là độ dài cạnh hoặc trọng số truyền vào (vd thời gian theo giao thông),
+# độ chồng lấn luôn tính theo độ dài.
+MAX_STRETCH = 1.5
+MAX_OVERLAP = 0.6
+PENALTY = 0.5
+MAX_CANDIDATES = 12
+MAX_SPURS = 16
+
+
+def path_overlap(graph, path, other):
+    # Tỉ lệ độ dài của path nằm trên các cạnh cũng thuộc other
+    edges = graph.path_edges(path)
+    if len(edges) == 0:
+        return 0.0
+    shared = np.isin(edges, graph.path_edges(other))
+    total = graph.lengths[edges].sum()
+    return float(graph.lengths[edges[shared]].sum() / total) if total > 0 else 1.0
+
+
+class _Selector:
+    def __init__(self, graph, shortest, k, max_stretch, max_overlap, h=None, w=None, settled=None):
+        self.graph = graph
+        self.h = h
+        self.w = graph.lengths if w is None else w
+        # Node đã chốt trên đồ thị xuôi / ngược (None = không theo dõi vùng tìm kiếm)
+        self.settled = settled
+        self.paths = [shortest]
+        self.edges = [graph.path_edges(shortest)]
+        self.limit = graph.path_length(shortest, self.w) * max_stretch
+        self.k = k
+        self.max_overlap = max_overlap
+
+    @property
+    def full(self):
+        return len(self.paths) >= self.k
+
+    def offer(self, path):
+        if not path or len(set(path)) != len(path):
+            return False
+        edges = self.graph.path_edges(path)
+        if self.w[edges].sum() > self.limit:
+            return False
+        lengths = self.graph.lengths
+        total = lengths[edges].sum()
+        for other in self.edges:
+            if lengths[edges[np.isin(edges, other)]].sum() > self.max_overlap * total:
+                return False
+        self.paths.append(path)
+        self.edges.append(edges)
+        return True
+
+
+def _plateau(graph, start, end, selector):
+    # Plateau: đoạn cạnh nằm trên cả cây đường ngắn nhất xuôi từ start và cây ngược tới end.
+    # Mỗi plateau cho một đường qua nó: start -> (cây xuôi) -> plateau -> (cây ngược) -> end.
+    rev, rev_edges = graph.reversed_graph()
+    w_rev = None if selector.w is graph.lengths else selector.w[rev_edges]
+    forward, backward = selector.settled or (None, None)
+    df, pf = dijkstra(graph, start, weights=selector.w, cutoff=selector.limit, settled=forward)
+    db, pb = dijkstra(rev, end, weights=w_rev, cutoff=selector.limit, settled=backward)
+
+    v = np.flatnonzero(pf >= 0)
+    u = pf[v]
+    on_plateau = np.zeros(graph.n_nodes, dtype=bool)
+    on_plateau[v[pb[u] == v]] = True              # v là đầu của một cạnh plateau
+    heads = np.flatnonzero(on_plateau)
+    tails = pf[heads]
+    starts = tails[~on_plateau[tails]]            # nút đầu tiên của mỗi chuỗi plateau
+
+    chains = []
+    for a in starts.tolist():
+        b = a
+        while pb[b] >= 0 and on_plateau[pb[b]] and pf[pb[b]] == b:
+            b = int(pb[b])
+        if df[a] + db[a] <= selector.limit:
+            chains.append((df[b] - df[a], a, b))
+    chains.sort(reverse=True)
+
+    for _, a, b in chains:
+        if selector.full:
+            break
+        # Cây xuôi dẫn tới b (đi qua cả chuỗi a..b), cây ngược dẫn từ b về end
+        head = reconstruct_path(pf, start, b)
+        tail = _follow(pb, b, end)
+        if head and (b == end or (tail and tail[-1] == end)):
+            selector.offer(head + tail)
+
+
+def _follow(next_hop, node, end):
+    path = []
+    while node != end and next_hop[node] >= 0:
+        node = int(next_hop[node])
+        path.append(node)
+    return path
+
+
+def _penalty(graph, start, end, selector, penalty=PENALTY):
+    # Phạt các cạnh thuộc đường đã tìm (trọng số chỉ tăng nên A* vẫn chính xác)
+    w = selector.w.copy()
+    for _ in range(MAX_CANDIDATES):
+        if selector.full:
+            break
+        checkpoint()
+        for edges in selector.edges:
+            w[edges] *= 1 + penalty
+        dist, parent = astar(graph, start, end, weights=w, h=selector.h,
+                             settled=selector.settled and selector.settled[0])
+        if not np.isfinite(dist[end]):
+            break
+        selector.offer(reconstruct_path(parent, start, end))
+
+
+def _yen(graph, start, end, selector):
+    # Yen: đường lệch từ từng nút của đường trước, cạnh/nút bị cấm được đánh dấu
+    # trên mảng trọng số và mặt nạ dùng lại, khôi phục ngay sau mỗi lần tìm.
+    w = selector.w.copy()
+    banned = np.zeros(graph.n_nodes, dtype=bool)
+    found = [selector.paths[0]]
+    candidates, seen = [], {tuple(selector.paths[0])}
+    for _ in range(MAX_CANDIDATES):
+        if selector.full:
+            break
+        prev = found[-1]
+        # Đường dài: chỉ lệch tại tối đa MAX_SPURS nút rải đều để giới hạn số lần tìm
+        for i in range(0, len(prev) - 1, max(1, (len(prev) - 1) // MAX_SPURS)):
+            checkpoint()
+            root = prev[:i + 1]
+            cut = [graph.edge_index(p[i], p[i + 1]) for p in found if len(p) > i + 1 and p[:i + 1] == root]
+            saved = w[cut].copy()
+            w[cut] = np.inf
+            banned[root[:-1]] = True
+            dist, parent = astar(graph, prev[i], end, weights=w, banned=banned, h=selector.h,
+                                 settled=selector.settled and selector.settled[0])
+            w[cut] = saved
+            banned[root[:-1]] = False
+            if np.isfinite(dist[end]):
+                path = root[:-1] + reconstruct_path(parent, prev[i], end)
+                if tuple(path) not in seen:
+                    seen.add(tuple(path))
+                    heappush(candidates, (graph.path_length(path, selector.w), path))
+        if not candidates:
+            break
+        _, path = heappop(candidates)
+        found.append(path)
+        selector.offer(path)
+
+
+METHODS = {"plateau": _plateau, "penalty": _penalty, "yen": _yen}
+
+
+def _scanned(graph, forward, backward):
+    # Cạnh rời node đã chốt chiều xuôi và cạnh đi vào node đã chốt chiều ngược
+    rev, rev_edges = graph.reversed_graph()
+    forward, backward = (np.unique(np.asarray(s, dtype=np.int64)) for s in (forward, backward))
+    return np.concatenate([out_edges(graph.offsets, forward), rev_edges[out_edges(rev.offsets, backward)]])
+
+
+def _scaled(h, scale):
+    def scaled(nodes):
+        return h(nodes) * scale
+    return scaled
+
+
+def alternative_routes(graph, start, end, k=3, method="plateau",
+                       max_stretch=MAX_STRETCH, max_overlap=MAX_OVERLAP, landmarks=None, weights=None,
+                       scanned=None):
+    # landmarks (ALT) chỉ làm giảm số node phải duyệt, kết quả không đổi.
+    # weights (core.EdgeWeights): cận dưới theo mét (ALT/haversine) được nhân weights.scale.
+    # scanned (list, tùy chọn) nhận mảng chỉ số cạnh mà kết quả phụ thuộc (vùng của mọi lần tìm)
+    h = landmarks.heuristic(graph, end) if landmarks is not None else None
+    w = None
+    if weights is not None:
+        w = weights.values
+        h = _scaled(h or goal_heuristic(graph, end), weights.scale)
+    settled = None if scanned is None else ([], [])
+    dist, parent = astar(graph, start, end, weights=w, h=h, settled=settled and settled[0])
+    paths = []
+    if np.isfinite(dist[end]):
+        selector = _Selector(graph, reconstruct_path(parent, start, end), k, max_stretch, max_overlap, h, w, settled)
+        METHODS[method](graph, start, end, selector)
+        # Phương pháp phạt trọng số bù vào khi chưa đủ k đường
+        if not selector.full and method != "penalty":
+            _penalty(graph, start, end, selector)
+        paths = selector.paths
+    if scanned is not None:
+        scanned.append(_scanned(graph, *settled))
+    return paths
+
+
+def find_truly_different_paths(graph, start, end, max_paths=3, method="plateau",
+                               max_stretch=MAX_STRETCH, max_overlap=MAX_OVERLAP, landmarks=None, weights=None,
+                               scanned=None):
+    all_paths = alternative_routes(graph, start, end, max_paths, method, max_stretch, max_overlap,
+                                   landmarks, weights, scanned)
+    w = None if weights is None else weights.values
+    all_paths.sort(key=lambda p: graph.path_length(p, w))
+    return all_paths[:max_paths]
@@ -0,0 +1,213 @@
+import math
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .cache import read_arrays, write_arrays
+
+
+# ====== THUỘC TÍNH HIỂN THỊ DẠNG CỘT ======
+# Tìm đường chỉ cần phần "nóng" luôn nằm trong bộ nhớ (RoutingGraph: tọa độ, CSR, độ dài).
+# Các trường chỉ dùng để hiển thị (tên đường, loại đường, hình học cạnh, osmid...) được tách khỏi
+# MultiDiGraph lúc build thành các cột NumPy cạnh file cache (<tên>.attr), theo đúng thứ tự
+# node/cạnh của RoutingGraph. Chuỗi được mã hóa từ điển: mã int32 (-1 = không có) + từ điển
+# (bytes utf-8 nối liền + offsets). File chỉ được mở khi giao diện cần tới, mỗi cột chỉ được
+# giải mã thành chuỗi Python khi được đọc lần đầu.
+EDGE_TEXT = ("name", "highway", "ref", "maxspeed")
+NODE_TEXT = ("highway",)
+
+
+def _text(value):
+    # Giá trị thuộc tính osmnx -> chuỗi hoặc None (danh sách khi gộp nhiều way: nối bằng " / ")
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (list, tuple, set)):
+        parts = list(dict.fromkeys(str(v) for v in value))
+        return " / ".join(parts) if parts else None
+    return str(value)
+
+
+def _first_int(value, default=-1):
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def encode_strings(values):
+    # Danh sách chuỗi/None -> (mã int32, từ điển bytes uint8, offsets int64)
+    index = {}
+    codes = np.fromiter((-1 if v is None else index.setdefault(v, len(index)) for v in values),
+                        dtype=np.int32, count=len(values))
+    encoded = [v.encode("utf-8") for v in index]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return codes, np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def decode_strings(blob, offsets):
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def extract_attributes(G_multi, graph):
+    # Cột thuộc tính theo thứ tự node/cạnh của graph (dựng từ chính G_multi bằng from_multigraph)
+    nodes = [d for _, d in G_multi.nodes(data=True)]
+    edges = list(G_multi.edges(data=True))
+    index = {node: i for i, node in enumerate(graph.node_ids.tolist())}
+    src = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+    dst = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+    lengths = np.fromiter((d.get("length", 1) for _, _, d in edges), dtype=np.float64, count=len(edges))
+    picks = graph.edge_order(src, dst, lengths).tolist()
+    edges = [edges[k][2] for k in picks]
+
+    arrays = {}
+    for kind, rows, columns in (("edge", edges, EDGE_TEXT), ("node", nodes, NODE_TEXT)):
+        for column in columns:
+            codes, blob, offsets = encode_strings([_text(d.get(column)) for d in rows])
+            arrays[f"{kind}_{column}"] = codes
+            arrays[f"{kind}_{column}_dict"] = blob
+            arrays[f"{kind}_{column}_dict_offsets"] = offsets
+    arrays["edge_osmid"] = np.array([_first_int(d.get("osmid")) for d in edges], dtype=np.int64)
+    arrays["edge_oneway"] = np.array([-1 if d.get("oneway") is None else int(bool(d["oneway"])) for d in edges],
+                                     dtype=np.int8)
+    arrays["node_street_count"] = np.array([_first_int(d.get("street_count")) for d in nodes], dtype=np.int16)
+
+    # Hình học cạnh (chỉ cạnh đã được osmnx gộp mới có), luôn theo chiều u -> v
+    counts, xs, ys = [], [], []
+    for k, d in zip(picks, edges):
+        geom = d.get("geometry")
+        coords = list(geom.coords) if geom is not None else []
+        if coords:
+            u = int(src[k])
+            first, last = coords[0], coords[-1]
+            if (last[0] - graph.x[u]) ** 2 + (last[1] - graph.y[u]) ** 2 < \
+                    (first[0] - graph.x[u]) ** 2 + (first[1] - graph.y[u]) ** 2:
+                coords.reverse()
+        counts.append(len(coords))
+        xs.extend(c[0] for c in coords)
+        ys.extend(c[1] for c in coords)
+    offsets = np.zeros(len(edges) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    arrays["edge_geom_offsets"] = offsets
+    arrays["edge_geom_x"] = np.array(xs, dtype=np.float64)
+    arrays["edge_geom_y"] = np.array(ys, dtype=np.float64)
+    return arrays
+
+
+# ====== ĐỌC LƯỜI ======
+class AttributeStore:
+    def __init__(self, path, graph_version=None):
+        self.path = Path(path)
+        self.graph_version = graph_version
+        self._arrays = None
+        self._decoded = {}
+        self._touched = set()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        # Mở file (mmap) ở lần đọc đầu tiên; file thiếu / hỏng / thuộc đồ thị cũ -> không có cột nào
+        if self._arrays is None:
+            with self._lock:
+                if self._arrays is None:
+                    try:
+                        header, arrays = read_arrays(self.path)
+                        if header.get("graph_version") != self.graph_version:
+                            arrays = {}
+                    except (OSError, ValueError, KeyError):
+                        arrays = {}
+                    self._arrays = arrays
+        return self._arrays
+
+    @property
+    def available(self):
+        return bool(self._load())
+
+    @property
+    def loaded(self):
+        return self._arrays is not None
+
+    def column(self, name):
+        # Cột số (mmap chỉ đọc) hoặc None nếu không có
+        arr = self._load().get(name)
+        if arr is not None:
+            self._touched.add(name)
+        return arr
+
+    def dictionary(self, name):
+        values = self._decoded.get(name)
+        if values is None:
+            blob, offsets = self.column(f"{name}_dict"), self.column(f"{name}_dict_offsets")
+            values = [] if blob is None else decode_strings(blob, offsets)
+            self._decoded[name] = values
+        return values
+
+    def text(self, name, ids):
+        # Chuỗi của cột name tại các vị trí ids (None nếu không có giá trị / không có cột)
+        ids = np.asarray(ids, dtype=np.int64)
+        codes = self.column(name)
+        if codes is None:
+            return [None] * len(ids)
+        values = self.dictionary(name)
+        return [values[c] if c >= 0 else None for c in codes[ids].tolist()]
+
+    def edge_text(self, column, edge_ids):
+        return self.text(f"edge_{column}", edge_ids)
+
+    def node_text(self, column, nodes):
+        return self.text(f"node_{column}", nodes)
+
+    def edge_geometry(self, k):
+        # [(vĩ độ, kinh độ), ...] theo chiều cạnh, None nếu cạnh là đoạn thẳng giữa hai node
+        offsets = self.column("edge_geom_offsets")
+        if offsets is None or offsets[k] == offsets[k + 1]:
+            return None
+        a, b = int(offsets[k]), int(offsets[k + 1])
+        return list(zip(self.column("edge_geom_y")[a:b].tolist(), self.column("edge_geom_x")[a:b].tolist()))
+
+    def path_coords(self, graph, path):
+        # Tọa độ để vẽ đường đi theo đúng hình dạng con đường (nếu có hình học cạnh)
+        if not path:
+            return []
+        coords = [(float(graph.y[path[0]]), float(graph.x[path[0]]))]
+        for u, v in zip(path[:-1], path[1:]):
+            geom = self.edge_geometry(graph.edge_index(u, v))
+            coords.extend(geom[1:] if geom else [(float(graph.y[v]), float(graph.x[v]))])
+        return coords
+
+    def load_all(self):
+        # Đọc và giải mã mọi cột (cho báo cáo bộ nhớ khi toàn bộ phần "lạnh" đã nằm trong RAM)
+        for name in list(self._load()):
+            if name.endswith("_dict"):
+                self.dictionary(name[:-len("_dict")])
+            else:
+                self.column(name)
+
+    @property
+    def nbytes(self):
+        # Các cột đã đọc (trang mmap có thể bị chạm) + chuỗi Python đã giải mã
+        mapped = sum(self._arrays[name].nbytes for name in self._touched) if self._arrays else 0
+        decoded = sum(sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+                      for values in self._decoded.values())
+        return mapped + decoded
+
+
+# ====== LƯU CẠNH FILE CACHE ======
+def attributes_path(graph):
+    path = graph.meta.get("path")
+    return Path(path).with_suffix(".attr") if path else None
+
+
+def save_attributes(graph, arrays, path=None):
+    write_arrays(path or attributes_path(graph), arrays, {"kind": "attributes", "graph_version": graph.meta.get("version")})
+
+
+def get_attributes(graph):
+    # AttributeStore chưa mở file (None nếu đồ thị không đọc từ file cache)
+    path = attributes_path(graph)
+    return AttributeStore(path, graph.meta.get("version")) if path is not None else None
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from .cache import NETWORK_TYPE, cache_path, osmnx_version, preprocess, read_graph, write_graph
+from .config import CONTRACT_CHAINS, DISTRICTS, LANDMARK_COUNT
+from .graph import RoutingGraph
+
+
+# ====== BUILD OFFLINE TỪ FILE OSM CỤC BỘ ======
+# Đọc một file trích xuất OSM (.osm / .osm.pbf) đúng một lần, lọc đường ô tô như bộ lọc "drive"
+# của osmnx, gộp node trung gian rồi cắt theo đa giác ranh giới của từng quận. Mỗi quận được
+# build trong một process riêng: ghi cache đồ thị, thuộc tính hiển thị, bảng ALT và file rút gọn,
+# để request đầu tiên không phải tải hay tiền xử lý gì. Quận có file OSM, ranh giới và tham số
+# build không đổi so với cache hiện có thì được bỏ qua.
+BUILD_FILTER_VERSION = 1
+# Giá trị tag loại bỏ cạnh (tương đương bộ lọc Overpass network_type="drive" của osmnx)
+DRIVE_EXCLUDE = {
+    "highway": {"abandoned", "bridleway", "bus_guideway", "construction", "corridor", "cycleway", "elevator",
+                "escalator", "footway", "no", "path", "pedestrian", "planned", "platform", "proposed", "raceway",
+                "razed", "rest_area", "service", "services", "steps", "track"},
+    "area": {"yes"},
+    "access": {"private"},
+    "motor_vehicle": {"no"},
+    "motorcar": {"no"},
+    "service": {"alley", "driveway", "emergency_access", "parking", "parking_aisle", "private"},
+}
+
+
+def _values(value):
+    return value if isinstance(value, list) else [value]
+
+
+def is_drivable(data):
+    if data.get("highway") is None:
+        return False
+    return not any(v in excluded for key, excluded in DRIVE_EXCLUDE.items() for v in _values(data.get(key)))
+
+
+def _pbf_to_xml(path, out_dir):
+    try:
+        import osmium
+    except ImportError as e:
+        raise ValueError(f"{path}: cần pyosmium để đọc .osm.pbf "
+                         f"(hoặc chuyển sang .osm trước bằng 'osmium cat {path.name} -o extract.osm')") from e
+    out = Path(out_dir) / "extract.osm"
+    writer = osmium.SimpleWriter(str(out))
+    try:
+        for obj in osmium.FileProcessor(str(path)):
+            writer.add(obj)
+    finally:
+        writer.close()
+    return out
+
+
+def load_extract(osm_path):
+    # MultiDiGraph đường ô tô đã gộp node trung gian cho toàn bộ file trích xuất
+    import networkx as nx
+    import osmnx as ox
+
+    path = Path(osm_path)
+    saved = ox.settings.useful_tags_way
+    ox.settings.useful_tags_way = list(dict.fromkeys([*saved, *DRIVE_EXCLUDE]))
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            xml = _pbf_to_xml(path, tmp) if path.name.endswith(".pbf") else path
+            G = ox.graph_from_xml(xml, simplify=False, retain_all=True)
+    finally:
+        ox.settings.useful_tags_way = saved
+    G.remove_edges_from([(u, v, k) for u, v, k, d in G.edges(keys=True, data=True) if not is_drivable(d)])
+    G.remove_nodes_from(list(nx.isolates(G)))
+    return ox.simplify_graph(G)
+
+
+# ====== RANH GIỚI QUẬN ======
+def read_boundaries(path):
+    # {tên quận: geometry GeoJSON}; feature được nhận theo thuộc tính name (vd "Quận 1") hoặc
+    # place_name (vd "District 1, Ho Chi Minh City, Vietnam"). GeoJSON đọc trực tiếp, định dạng
+    # khác (shapefile, GeoPackage...) đọc bằng geopandas
+    path = Path(path)
+    if path.suffix.lower() in (".geojson", ".json"):
+        features = json.loads(path.read_text(encoding="utf-8"))["features"]
+    else:
+        import geopandas as gpd
+
+        features = gpd.read_file(path).to_crs(4326).__geo_interface__["features"]
+    by_place = {place: name for name, place in DISTRICTS.items()}
+    boundaries = {}
+    for feature in features:
+        props = feature.get("properties") or {}
+        name = props.get("name") if props.get("name") in DISTRICTS else by_place.get(props.get("place_name"))
+        if name is not None:
+            boundaries[name] = feature["geometry"]
+    return boundaries
+
+
+# ====== DẤU VÂN TAY ĐẦU VÀO ======
+def file_digest(path, chunk=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        while block := f.read(chunk):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_params(place_name, osm_path, osm_sha1, geometry):
+    # Ghi vào header cache (meta["build"]); khác nhau ở bất kỳ trường nào thì phải build lại
+    return {"source": "extract", "place_name": place_name, "network_type": NETWORK_TYPE, "simplify": True,
+            "osm": Path(osm_path).name, "osm_sha1": osm_sha1,
+            "boundary_sha1": hashlib.sha1(json.dumps(geometry, sort_keys=True).encode("utf-8")).hexdigest(),
+            "filter": BUILD_FILTER_VERSION, "landmarks": LANDMARK_COUNT, "contract": CONTRACT_CHAINS}
+
+
+def is_up_to_date(path, build):
+    # Cache cùng tham số build và các file tiền xử lý đi kèm còn khớp version đồ thị
+    from .attributes import attributes_path
+    from .landmarks import load_landmarks
+    from .reduction import load_reduction
+
+    try:
+        graph = read_graph(path)
+    except (OSError, ValueError, KeyError):
+        return False
+    if graph.meta.get("build") != build or graph.meta.get("osmnx_version") != osmnx_version():
+        return False
+    if LANDMARK_COUNT > 0 and load_landmarks(graph) is None:
+        return False
+    reduction = load_reduction(graph)
+    if reduction is None or (CONTRACT_CHAINS and reduction[1] is None):
+        return False
+    return attributes_path(graph).exists()
+
+
+# ====== BUILD MỘT QUẬN (CHẠY TRONG PROCESS CON) ======
+# Với start method fork, file trích xuất đã đọc ở process cha được dùng chung (copy-on-write);
+# nếu không, mỗi process tự đọc một lần
+_extracts = {}
+
+
+def _extract(osm_path):
+    G = _extracts.get(osm_path)
+    if G is None:
+        G = _extracts[osm_path] = load_extract(osm_path)
+    return G
+
+
+def build_district(name, geometry, osm_path, build, cache_dir=None):
+    import osmnx as ox
+    from shapely.geometry import shape
+
+    from .attributes import extract_attributes, save_attributes
+
+    started = time.perf_counter()
+    G = ox.truncate.truncate_graph_polygon(_extract(osm_path), shape(geometry))
+    if G.number_of_nodes() == 0:
+        raise ValueError(f"{name}: không có đường nào trong ranh giới")
+    G = ox.truncate.largest_component(G, strongly=False)
+
+    path = cache_path(DISTRICTS[name], cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_graph(path, RoutingGraph.from_multigraph(G), {"osmnx_version": osmnx_version(), "build": build})
+    graph = read_graph(path)
+    save_attributes(graph, extract_attributes(G, graph))
+    preprocess(graph)
+    return {"district": name, "status": "built", "nodes": graph.n_nodes, "edges": graph.n_edges,
+            "seconds": round(time.perf_counter() - started, 2)}
+
+
+def _build_task(task, osm_path, cache_dir):
+    # Lỗi bất kỳ (osmnx, shapely...) chỉ làm hỏng quận đó, không làm dừng cả lượt build
+    name, geometry, build = task
+    try:
+        return build_district(name, geometry, osm_path, build, cache_dir)
+    except Exception as e:
+        return {"district": name, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+
+# ====== BUILD TẤT CẢ ======
+def build_all(osm_path, boundaries_path, names=None, cache_dir=None, workers=0, force=False, citywide=True,
+              log=print):
+    osm_path = str(Path(osm_path).resolve())
+    boundaries = read_boundaries(boundaries_path)
+    # Không chỉ định quận: build mọi quận có ranh giới, quận không có ranh giới chỉ bị bỏ qua;
+    # quận được chỉ định mà không có ranh giới là lỗi
+    named = bool(names)
+    names = list(names) if named else list(DISTRICTS)
+    osm_sha1 = file_digest(osm_path)
+    results, tasks = [], []
+    for name in names:
+        if name not in boundaries:
+            if named:
+                results.append({"district": name, "status": "error", "error": "không có ranh giới"})
+            else:
+                results.append({"district": name, "status": "skipped", "reason": "không có ranh giới"})
+            continue
+        build = extract_params(DISTRICTS[name], osm_path, osm_sha1, boundaries[name])
+        if not force and is_up_to_date(cache_path(DISTRICTS[name], cache_dir), build):
+            results.append({"district": name, "status": "skipped", "reason": "không đổi"})
+            continue
+        tasks.append((name, boundaries[name], build))
+    for r in results:
+        log(json.dumps(r, ensure_ascii=False))
+
+    if tasks:
+        run = partial(_build_task, osm_path=osm_path, cache_dir=cache_dir)
+        workers = min(len(tasks), workers or os.cpu_count() or 1)
+        if workers <= 1:
+            done = map(run, tasks)
+        else:
+            fork = "fork" in multiprocessing.get_all_start_methods()
+            if fork:
+                _extract(osm_path)    # đọc một lần trước khi fork, các process con dùng chung
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork") if fork else None)
+            done = pool.map(run, tasks)
+        try:
+            for r in done:
+                log(json.dumps(r, ensure_ascii=False))
+                results.append(r)
+        finally:
+            if workers > 1:
+                pool.shutdown()
+            _extracts.pop(osm_path, None)
+
+    if citywide and all(cache_path(place, cache_dir).exists() for place in DISTRICTS.values()):
+        log(json.dumps(build_citywide(cache_dir), ensure_ascii=False))
+    return results
+
+
+def build_citywide(cache_dir=None):
+    # Đồ thị toàn thành phố gộp từ cache các quận, kèm nhãn thành phần liên thông
+    from .cache import get_graph_from_cache
+    from .citywide import get_citywide
+    from .reduction import get_reduction
+
+    started = time.perf_counter()
+    city = get_citywide(DISTRICTS, partial(get_graph_from_cache, cache_dir=cache_dir), cache_dir)
+    get_reduction(city.graph, contract=False)
+    return {"district": "citywide", "status": "built", "nodes": city.graph.n_nodes,
+            "edges": city.graph.n_edges, "seconds": round(time.perf_counter() - started, 2)}
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from importlib.metadata import version, PackageNotFoundError
+from pathlib import Path
+
+import numpy as np
+
+from .graph import RoutingGraph
+
+
+# ====== ĐỊNH DẠNG CACHE NHỊ PHÂN ======
+# [MAGIC 8 byte][format uint32][độ dài header uint32][header JSON][đệm][các mảng phẳng]
+# Mỗi mảng được căn lề ALIGN byte, vị trí/kiểu/số phần tử ghi trong header.
+# File được mở bằng mmap chỉ đọc nên nhiều process dùng chung trang bộ nhớ.
+CACHE_DIR = Path("cache_graphs")
+MAGIC = b"GTNGRAPH"
+FORMAT_VERSION = 1
+ALIGN = 64
+ARRAYS = ("node_ids", "x", "y", "offsets", "targets", "lengths")
+
+NETWORK_TYPE = "drive"
+FALLBACK_DIST = 3000
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def osmnx_version():
+    try:
+        return version("osmnx")
+    except PackageNotFoundError:
+        return None
+
+
+def build_params(place_name):
+    return {"place_name": place_name, "network_type": NETWORK_TYPE,
+            "simplify": True, "fallback_dist": FALLBACK_DIST}
+
+
+def cache_path(place_name, cache_dir=None):
+    cache_dir = Path(cache_dir or CACHE_DIR)
+    return cache_dir / f"{place_name.replace(',', '').replace(' ', '_')}.gtg"
+
+
+# ====== GHI / ĐỌC ======
+def write_arrays(path, arrays, meta=None):
+    path = Path(path)
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+    digest = hashlib.sha1()
+    layout = {}
+    pos = 0
+    for name, arr in arrays.items():
+        digest.update(arr.data)
+        layout[name] = {"dtype": arr.dtype.str, "offset": pos, "count": int(arr.size)}
+        pos = _align(pos + arr.nbytes)
+
+    header = dict(meta or {})
+    header.update({
+        "format": FORMAT_VERSION,
+        "version": digest.hexdigest()[:16],
+        "created": time.time(),
+        "arrays": layout,
+    })
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    # Ghi ra file tạm rồi đổi tên để process khác không đọc phải file dở dang
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(arr.tobytes())
+    os.replace(tmp, path)
+    return header
+
+
+def write_graph(path, graph, meta=None, extra_arrays=None):
+    arrays = {name: getattr(graph, name) for name in ARRAYS}
+    arrays.update(extra_arrays or {})
+    meta = dict(meta or {}, n_nodes=graph.n_nodes, n_edges=graph.n_edges)
+    return write_arrays(path, arrays, meta)
+
+
+def read_arrays(path):
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path}: không phải file cache đồ thị")
+    fmt, header_len = struct.unpack_from("<II", mm, len(MAGIC))
+    if fmt != FORMAT_VERSION:
+        raise ValueError(f"{path}: định dạng cache {fmt} không được hỗ trợ")
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(mm[start:start + header_len]).decode("utf-8"))
+    data_start = _align(start + header_len)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        if spec["count"] == 0:
+            arrays[name] = np.empty(0, dtype=np.dtype(spec["dtype"]))
+            continue
+        arrays[name] = np.frombuffer(mm, dtype=np.dtype(spec["dtype"]), count=spec["count"],
+                                     offset=data_start + spec["offset"])
+    return header, arrays
+
+
+def read_graph(path, with_extra=False):
+    header, arrays = read_arrays(path)
+    header["path"] = str(path)
+    graph = RoutingGraph(meta=header, **{name: arrays.pop(name) for name in ARRAYS})
+    return (graph, arrays) if with_extra else graph
+
+
+def is_fresh(meta, place_name):
+    build = meta.get("build") or {}
+    if build.get("source") == "extract":
+        # Build offline từ file OSM cục bộ (python -m navigator build): dùng tới khi được build lại
+        return meta.get("format") == FORMAT_VERSION and build.get("place_name") == place_name
+    return (meta.get("format") == FORMAT_VERSION and
+            meta.get("osmnx_version") == osmnx_version() and
+            meta.get("build") == build_params(place_name))
+
+
+# ====== TẢI TỪ OSM ======
+def download_graph(place_name):
+    import osmnx as ox
+
+    try:
+        gdf = ox.geocode_to_gdf(place_name)
+        if not gdf.empty and gdf.geometry.iloc[0].geom_type in ["Polygon", "MultiPolygon"]:
+            G = ox.graph_from_polygon(gdf.geometry.iloc[0], network_type=NETWORK_TYPE, simplify=True)
+        else:
+            raise ValueError
+    except Exception:
+        lat, lon = ox.geocode(place_name)
+        north, south, east, west = ox.utils_geo.bbox_from_point((lat, lon), dist=FALLBACK_DIST)
+        G = ox.graph_from_bbox(north, south, east, west, network_type=NETWORK_TYPE, simplify=True)
+    return G
+
+
+def get_graph_from_cache(place_name, cache_dir=None):
+    path = cache_path(place_name, cache_dir)
+    if path.exists():
+        try:
+            graph = read_graph(path)
+            if is_fresh(graph.meta, place_name):
+                return graph
+        except (OSError, ValueError, KeyError):
+            pass  # cache hỏng -> build lại
+
+    from .attributes import extract_attributes, save_attributes
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    G = download_graph(place_name)
+    graph = RoutingGraph.from_multigraph(G)
+    write_graph(path, graph, {"osmnx_version": osmnx_version(), "build": build_params(place_name)})
+    graph = read_graph(path)
+    # Thuộc tính hiển thị tách ra file cột riêng, MultiDiGraph không được giữ lại
+    save_attributes(graph, extract_attributes(G, graph))
+    preprocess(graph)
+    return graph
+
+
+def preprocess(graph):
+    # Dựng lại các bảng phụ thuộc vào đồ thị ngay sau khi build cache
+    from .config import CONTRACT_CHAINS, LANDMARK_COUNT
+    from .landmarks import get_landmarks
+    from .reduction import get_reduction
+    if LANDMARK_COUNT > 0:
+        get_landmarks(graph, LANDMARK_COUNT)
+    get_reduction(graph, CONTRACT_CHAINS)
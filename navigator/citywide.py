@@ -0,0 +1,219 @@
+import math
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from . import alternatives, core
+from .cache import CACHE_DIR, get_graph_from_cache, read_graph, write_graph
+from .graph import RoutingGraph
+
+
+# ====== ĐỒ THỊ TOÀN THÀNH PHỐ ======
+# Gộp đồ thị của tất cả các quận, node biên trùng id OSM chỉ giữ một bản.
+# Node được sắp xếp theo ô lưới CELL_SIZE_M nên mỗi ô là một đoạn liên tục
+# trong file mmap: truy vấn chỉ chạm vào các trang của những ô nằm trong hành lang.
+CITYWIDE_FILE = "HCMC_citywide.gtg"
+CELL_SIZE_M = 2000
+CORRIDOR_BUFFERS_M = (1500, 4000, 10000)
+CORRIDOR_CACHE_SIZE = 8        # hành lang của các cặp (s, t) gần nhất, dùng chung giữa các phiên
+METERS_PER_DEG = 111_320.0
+
+
+def merge_graphs(graphs):
+    node_ids = np.concatenate([g.node_ids for g in graphs])
+    uniq, first, inverse = np.unique(node_ids, return_index=True, return_inverse=True)
+    x = np.concatenate([g.x for g in graphs])[first]
+    y = np.concatenate([g.y for g in graphs])[first]
+
+    src, dst, lengths = [], [], []
+    base = 0
+    for g in graphs:
+        src.append(inverse[base + g.edge_sources()])
+        dst.append(inverse[base + g.targets])
+        lengths.append(g.lengths)
+        base += g.n_nodes
+    return uniq, x, y, np.concatenate(src), np.concatenate(dst), np.concatenate(lengths)
+
+
+def make_grid(x, y, cell_size=CELL_SIZE_M):
+    lat0 = float(y.min())
+    lon0 = float(x.min())
+    kx = METERS_PER_DEG * math.cos(math.radians(float(y.mean())))
+    ky = METERS_PER_DEG
+    nx = int((float(x.max()) - lon0) * kx // cell_size) + 1
+    ny = int((float(y.max()) - lat0) * ky // cell_size) + 1
+    return {"lon0": lon0, "lat0": lat0, "kx": kx, "ky": ky, "nx": nx, "ny": ny, "cell_size": cell_size}
+
+
+def cell_ids(grid, x, y):
+    cx = np.minimum(((x - grid["lon0"]) * grid["kx"] // grid["cell_size"]).astype(np.int64), grid["nx"] - 1)
+    cy = np.minimum(((y - grid["lat0"]) * grid["ky"] // grid["cell_size"]).astype(np.int64), grid["ny"] - 1)
+    return cy * grid["nx"] + cx
+
+
+def build_citywide(graphs, cell_size=CELL_SIZE_M):
+    node_ids, x, y, src, dst, lengths = merge_graphs(graphs)
+    grid = make_grid(x, y, cell_size)
+    cells = cell_ids(grid, x, y)
+
+    # Đánh số lại node theo ô lưới
+    order = np.argsort(cells, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    graph = RoutingGraph.from_edges(node_ids[order], x[order], y[order], rank[src], rank[dst], lengths)
+
+    cell_offsets = np.zeros(grid["nx"] * grid["ny"] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells, minlength=grid["nx"] * grid["ny"]), out=cell_offsets[1:])
+    return graph, cell_offsets, grid
+
+
+def _connected(sub, ls, lt):
+    result = core.route(sub, ls, lt, "astar")
+    return result if result.path else None
+
+
+class CitywideGraph:
+    def __init__(self, graph, cell_offsets, grid):
+        self.graph = graph
+        self.cell_offsets = cell_offsets
+        self.grid = grid
+        self._corridors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _to_meters(self, i):
+        return ((self.graph.x[i] - self.grid["lon0"]) * self.grid["kx"],
+                (self.graph.y[i] - self.grid["lat0"]) * self.grid["ky"])
+
+    def corridor_cells(self, s, t, buffer_m):
+        # Các ô có tâm cách đoạn thẳng s-t không quá buffer + nửa đường chéo ô
+        g = self.grid
+        size = g["cell_size"]
+        cells = np.arange(g["nx"] * g["ny"])
+        cx = (cells % g["nx"] + 0.5) * size
+        cy = (cells // g["nx"] + 0.5) * size
+        (px, py), (qx, qy) = self._to_meters(s), self._to_meters(t)
+        dx, dy = qx - px, qy - py
+        seg2 = dx * dx + dy * dy
+        u = np.clip(((cx - px) * dx + (cy - py) * dy) / seg2, 0, 1) if seg2 > 0 else 0.0
+        dist = np.hypot(cx - (px + u * dx), cy - (py + u * dy))
+        keep = dist <= buffer_m + size * math.sqrt(0.5)
+        keep &= self.cell_offsets[1:] > self.cell_offsets[:-1]
+        return cells[keep]
+
+    def corridor_nodes(self, s, t, buffer_m):
+        cells = self.corridor_cells(s, t, buffer_m)
+        starts = self.cell_offsets[cells]
+        counts = self.cell_offsets[cells + 1] - starts
+        row_start = np.cumsum(counts) - counts
+        return np.repeat(starts - row_start, counts) + np.arange(int(counts.sum()))
+
+    def subgraph_for(self, s, t, probe=_connected):
+        # Mở rộng hành lang dần cho tới khi s và t liên thông, cuối cùng dùng cả thành phố.
+        # probe(sub, ls, lt) là lần tìm thật của người gọi, trả về None khi không có đường: hành lang
+        # đầu tiên probe tìm được đường được chọn và kết quả đó trả về luôn, khỏi tìm lại lần nữa.
+        # Trả về (sub, nodes, ls, lt, found); found None (hành lang lấy từ cache hoặc cả thành phố)
+        # nghĩa là người gọi tự tìm trên sub
+        with self._lock:
+            cached = self._corridors.get((s, t))
+            if cached is not None:
+                self._corridors.move_to_end((s, t))
+                return (*cached, None)
+        straight = math.dist(self._to_meters(s), self._to_meters(t))
+        corridor, found = None, None
+        # Chắc chắn không có đường: khỏi mở rộng hành lang, core.route trên cả thành phố trả về ngay
+        unreachable = self.graph.components is not None and self.graph.components.proven_unreachable(s, t)
+        for buffer_m in () if unreachable else CORRIDOR_BUFFERS_M:
+            nodes = self.corridor_nodes(s, t, max(buffer_m, 0.25 * straight))
+            sub = self.graph.subgraph(nodes)
+            ls, lt = int(np.searchsorted(nodes, s)), int(np.searchsorted(nodes, t))
+            found = probe(sub, ls, lt)
+            if found is not None:
+                corridor = (sub, nodes, ls, lt)
+                break
+        if corridor is None:
+            corridor = (self.graph, np.arange(self.graph.n_nodes), s, t)
+        with self._lock:
+            self._corridors[(s, t)] = corridor
+            self._corridors.move_to_end((s, t))
+            while len(self._corridors) > CORRIDOR_CACHE_SIZE:
+                self._corridors.popitem(last=False)
+        return (*corridor, found)
+
+
+# ====== TRUY VẤN XUYÊN QUẬN ======
+def _sub_weights(city, sub, weights):
+    # Trọng số theo cạnh toàn thành phố -> theo cạnh của đồ thị con hành lang
+    if weights is None or sub is city.graph:
+        return weights
+    return weights.subset(sub.meta["parent_edges"])
+
+
+def route(city, start, goal, mode="greedy", track_edges=False, weights=None):
+    # Kết quả theo chỉ số toàn thành phố (node và cạnh)
+    def search(sub, ls, lt):
+        return core.route(sub, ls, lt, mode, _sub_weights(city, sub, weights), track_edges)
+
+    def probe(sub, ls, lt):
+        result = search(sub, ls, lt)
+        return result if result.path else None
+    sub, nodes, ls, lt, result = city.subgraph_for(start, goal, probe)
+    if result is None:
+        result = search(sub, ls, lt)
+    result.path = [int(nodes[i]) for i in result.path]
+    if result.edges is not None and sub is not city.graph:
+        result.edges = sub.meta["parent_edges"][result.edges].tolist()
+    if result.scanned is not None and sub is not city.graph:
+        result.scanned = sub.meta["parent_edges"][result.scanned]
+    return result
+
+
+def greedy_best_first(city, start, goal):
+    result = route(city, start, goal, "greedy", track_edges=True)
+    edges = np.asarray(result.edges, dtype=np.int64)
+    graph = city.graph
+    return result.path, list(zip(graph.edge_sources()[edges].tolist(), graph.targets[edges].tolist()))
+
+
+def find_truly_different_paths(city, start, end, weights=None, scanned=None, **kwargs):
+    # scanned (list, tùy chọn) nhận chỉ số cạnh toàn thành phố mà kết quả phụ thuộc
+    def search(sub, ls, lt):
+        found = None if scanned is None else []
+        paths = alternatives.find_truly_different_paths(sub, ls, lt, weights=_sub_weights(city, sub, weights),
+                                                        scanned=found, **kwargs)
+        return paths, found
+
+    def probe(sub, ls, lt):
+        result = search(sub, ls, lt)
+        return result if result[0] else None
+    sub, nodes, ls, lt, result = city.subgraph_for(start, end, probe)
+    paths, found = search(sub, ls, lt) if result is None else result
+    if scanned is not None:
+        scanned.extend(found if sub is city.graph else [sub.meta["parent_edges"][e] for e in found])
+    return [[int(nodes[i]) for i in path] for path in paths]
+
+
+# ====== BUILD / TẢI CACHE ======
+def citywide_path(cache_dir=None):
+    return Path(cache_dir or CACHE_DIR) / CITYWIDE_FILE
+
+
+def get_citywide(districts, loader=get_graph_from_cache, cache_dir=None):
+    graphs = [loader(place_name) for place_name in districts.values()]
+    sources = {place_name: g.meta.get("version") for place_name, g in zip(districts.values(), graphs)}
+
+    path = citywide_path(cache_dir)
+    if path.exists():
+        try:
+            graph, extra = read_graph(path, with_extra=True)
+            if graph.meta.get("sources") == sources and graph.meta.get("grid", {}).get("cell_size") == CELL_SIZE_M:
+                return CitywideGraph(graph, extra["cell_offsets"], graph.meta["grid"])
+        except (OSError, ValueError, KeyError):
+            pass  # cache hỏng -> build lại
+
+    graph, cell_offsets, grid = build_citywide(graphs)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_graph(path, graph, {"sources": sources, "grid": grid}, {"cell_offsets": cell_offsets})
+    graph, extra = read_graph(path, with_extra=True)
+    return CitywideGraph(graph, extra["cell_offsets"], graph.meta["grid"])
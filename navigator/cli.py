@@ -0,0 +1,245 @@
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .cache import cache_path
+from .config import CITYWIDE, DISTRICTS, ISOCHRONE_BUFFER_M, LANDMARK_COUNT, SERVICE_HOST, SERVICE_PORT
+from .engine import load_district, route_matrix
+from .isochrone import SHAPES
+from .landmarks import build_landmarks, landmarks_path, save_landmarks, settled_report
+
+
+# ====== ĐỌC / GHI FILE OD ======
+def read_table(path):
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pandas as pd
+        return pd.read_parquet(path).to_dict("records")
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def write_table(path, rows):
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pandas as pd
+        pd.DataFrame(rows).to_parquet(path, index=False)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["origin", "destination"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def resolve_nodes(graph, rows, prefix):
+    # Cột <prefix>_lat/<prefix>_lon được gắn vào node gần nhất;
+    # cột <prefix> là mã node (N001...) hoặc id OSM
+    if rows and f"{prefix}_lat" in rows[0]:
+        lats = np.array([float(r[f"{prefix}_lat"]) for r in rows])
+        lons = np.array([float(r[f"{prefix}_lon"]) for r in rows])
+        nodes, _ = graph.spatial_index().snap(lats, lons)
+        return nodes.astype(np.int64)
+    # Mã sai báo theo số dòng dữ liệu (dòng 1 ngay sau tiêu đề) thay vì chạy với node ngoài đồ thị
+    nodes = []
+    for i, r in enumerate(rows, start=1):
+        value = str(r[prefix]).strip()
+        try:
+            if value.startswith("N"):
+                node = int(value[1:]) - 1
+                if not 0 <= node < graph.n_nodes:
+                    raise ValueError
+            else:
+                node = graph.index_of(int(value))
+        except (KeyError, ValueError):
+            raise ValueError(f"dòng {i}: {prefix} '{value}' không có trong đồ thị "
+                             f"(mã N001..N{graph.n_nodes:03d} hoặc id OSM)") from None
+        nodes.append(node)
+    return np.array(nodes, dtype=np.int64)
+
+
+# ====== LỆNH matrix ======
+def cmd_matrix(args):
+    started = time.perf_counter()
+    graph, graph_path = load_district(args.district, args.cache_dir)
+    rows = read_table(args.pairs)
+    origins = resolve_nodes(graph, rows, "origin")
+    destinations = resolve_nodes(graph, rows, "destination")
+
+    dists, paths = route_matrix(graph, origins, destinations, with_paths=args.paths,
+                                workers=args.workers, graph_path=graph_path)
+
+    node_ids = graph.node_ids
+    out = []
+    for i, row in enumerate(rows):
+        item = dict(row)
+        item["origin_node"] = int(node_ids[origins[i]])
+        item["destination_node"] = int(node_ids[destinations[i]])
+        item["distance_m"] = round(float(dists[i]), 2) if np.isfinite(dists[i]) else ""
+        if paths is not None:
+            item["path"] = " ".join(str(int(node_ids[n])) for n in paths[i])
+        out.append(item)
+    write_table(args.output, out)
+    print(f"{len(rows)} cặp OD, {len(np.unique(origins))} điểm xuất phát, "
+          f"{time.perf_counter() - started:.2f}s -> {args.output}", file=sys.stderr)
+
+
+# ====== LỆNH landmarks ======
+def cmd_landmarks(args):
+    names = list(DISTRICTS) if args.district == "all" else [args.district]
+    for name in names:
+        graph, _ = load_district(name, args.cache_dir)
+        started = time.perf_counter()
+        landmarks = build_landmarks(graph, args.count)
+        save_landmarks(landmarks, landmarks_path(graph))
+        summary, _ = settled_report(graph, landmarks, args.queries)
+        summary.update(district=name, nodes=graph.n_nodes, build_s=round(time.perf_counter() - started, 2))
+        print(json.dumps(summary, ensure_ascii=False))
+
+
+# ====== LỆNH isochrone ======
+def cmd_isochrone(args):
+    # Vùng đến được từ mọi điểm trong file nguồn (cột source hoặc source_lat/source_lon) bằng một
+    # lần tìm kiếm; ghi các node đến được, đa giác GeoJSON và in độ phủ theo từng ngưỡng
+    from .isochrone import plan_isochrone
+    from .store import GraphStore
+
+    started = time.perf_counter()
+    store = GraphStore(memory_budget=1 << 30, cache_dir=args.cache_dir)
+    district = store.get(args.district)
+    graph = district.graph
+    sources = resolve_nodes(graph, read_table(args.sources), "source")
+    iso = plan_isochrone(district, sources, args.cutoff, args.weight)
+    if args.output:
+        cost = "distance_m" if args.weight == "length" else "duration_s"
+        write_table(args.output, [{"node": int(n), cost: round(float(d), 2), "source_node": int(s)}
+                                  for n, d, s in zip(graph.node_ids[iso.nodes].tolist(), iso.dist.tolist(),
+                                                     graph.node_ids[iso.sources[iso.origin]].tolist())])
+    if args.polygon:
+        feature = {"type": "Feature", "properties": {"district": args.district, "cutoff": args.cutoff,
+                                                     "weight": args.weight, "reached": len(iso)},
+                   "geometry": iso.geojson(shape=args.shape, buffer_m=args.buffer_m)}
+        Path(args.polygon).write_text(json.dumps(feature), encoding="utf-8")
+    cutoffs = [float(c) for c in args.coverage.split(",")] if args.coverage else None
+    for row in iso.coverage(cutoffs):
+        print(json.dumps(row, ensure_ascii=False))
+    print(f"{len(iso.sources)} điểm xuất phát, {len(iso)} node đến được, "
+          f"{time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+
+# ====== LỆNH memory ======
+def cmd_memory(args):
+    # Bộ nhớ từng quận (KB) khi được giữ trong GraphStore; bỏ qua quận chưa có cache
+    from .store import GraphStore
+
+    names = list(DISTRICTS) if args.district == "all" else [args.district]
+    store = GraphStore(memory_budget=1 << 30, cache_dir=args.cache_dir)
+    for name in names:
+        if not cache_path(DISTRICTS[name], args.cache_dir).exists():
+            print(f"{name}: chưa có cache, bỏ qua", file=sys.stderr)
+            continue
+        district = store.get(name)
+        if args.attributes and district.attributes is not None:
+            district.attributes.load_all()
+        report = {key: round(value / 1024, 1) for key, value in district.memory().items()}
+        print(json.dumps({"district": name, "nodes": district.graph.n_nodes, "edges": district.graph.n_edges,
+                          "attributes_file": bool(district.attributes and district.attributes.available),
+                          **report}, ensure_ascii=False))
+
+
+# ====== LỆNH build ======
+def cmd_build(args):
+    from .build import build_all
+
+    names = None if args.district == ["all"] else args.district
+    results = build_all(args.osm, args.boundaries, names, args.cache_dir, args.workers, args.force,
+                        citywide=not args.no_citywide)
+    errors = [r for r in results if r["status"] == "error"]
+    print(f"{sum(r['status'] == 'built' for r in results)} quận build mới, "
+          f"{sum(r['status'] == 'skipped' for r in results)} bỏ qua, {len(errors)} lỗi", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+# ====== LỆNH serve ======
+def cmd_serve(args):
+    from .service import serve
+
+    preload = [name.strip() for name in args.preload.split(",") if name.strip()] if args.preload else []
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.batch_ms, preload))
+    except KeyboardInterrupt:
+        pass
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m navigator",
+                                     description="Greedy Traffic Navigator - định tuyến không giao diện")
+    parser.add_argument("--cache-dir", default=None, help="thư mục cache đồ thị (mặc định cache_graphs)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("matrix", help="ma trận khoảng cách cho file cặp OD (CSV/Parquet)")
+    p.add_argument("--district", required=True, choices=list(DISTRICTS) + [CITYWIDE])
+    p.add_argument("--pairs", required=True,
+                   help="cột origin,destination (mã node/id OSM) hoặc origin_lat,origin_lon,destination_lat,destination_lon")
+    p.add_argument("--output", required=True)
+    p.add_argument("--workers", type=int, default=0, help="số process (0 = số CPU)")
+    p.add_argument("--paths", action="store_true", help="ghi cả danh sách node của đường đi")
+    p.set_defaults(func=cmd_matrix)
+
+    p = sub.add_parser("landmarks", help="dựng bảng ALT và so sánh số node đã chốt với tìm kiếm thường")
+    p.add_argument("--district", required=True, choices=list(DISTRICTS) + ["all"])
+    p.add_argument("--count", type=int, default=LANDMARK_COUNT or 8)
+    p.add_argument("--queries", type=int, default=50, help="số truy vấn ngẫu nhiên cho báo cáo")
+    p.set_defaults(func=cmd_landmarks)
+
+    p = sub.add_parser("isochrone", help="vùng đến được trong N mét / giây từ một hoặc nhiều điểm")
+    p.add_argument("--district", required=True, choices=list(DISTRICTS) + [CITYWIDE])
+    p.add_argument("--sources", required=True,
+                   help="cột source (mã node/id OSM) hoặc source_lat,source_lon; mọi dòng tìm chung một lần")
+    p.add_argument("--cutoff", required=True, type=float, help="mét (length) hoặc giây (time)")
+    p.add_argument("--weight", default="length", choices=["length", "time"])
+    p.add_argument("--output", default=None, help="ghi các node đến được (CSV/Parquet)")
+    p.add_argument("--polygon", default=None, help="ghi đa giác vùng đến được (GeoJSON)")
+    p.add_argument("--shape", default="buffer", choices=list(SHAPES))
+    p.add_argument("--buffer-m", type=float, default=ISOCHRONE_BUFFER_M)
+    p.add_argument("--coverage", default="", help="các ngưỡng báo cáo độ phủ, vd 300,600,900")
+    p.set_defaults(func=cmd_isochrone)
+
+    p = sub.add_parser("memory", help="báo cáo bộ nhớ từng quận (KB): đồ thị, ALT, rút gọn, thuộc tính")
+    p.add_argument("--district", default="all", choices=list(DISTRICTS) + ["all"])
+    p.add_argument("--attributes", action="store_true", help="đọc cả các cột thuộc tính hiển thị")
+    p.set_defaults(func=cmd_memory)
+
+    p = sub.add_parser("build", help="build cache các quận từ file OSM cục bộ, không cần mạng")
+    p.add_argument("--osm", required=True, help="file trích xuất .osm hoặc .osm.pbf")
+    p.add_argument("--boundaries", required=True,
+                   help="ranh giới quận (GeoJSON/shapefile...), thuộc tính name hoặc place_name")
+    p.add_argument("--district", nargs="+", default=["all"], choices=list(DISTRICTS) + ["all"])
+    p.add_argument("--workers", type=int, default=0, help="số process (0 = số CPU)")
+    p.add_argument("--force", action="store_true", help="build lại cả quận không thay đổi")
+    p.add_argument("--no-citywide", action="store_true", help="không gộp đồ thị toàn thành phố")
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser("serve", help="dịch vụ HTTP/JSON: /route, /alternatives, /matrix")
+    p.add_argument("--host", default=SERVICE_HOST)
+    p.add_argument("--port", type=int, default=SERVICE_PORT)
+    p.add_argument("--workers", type=int, default=None, help="số process tìm đường (0 = số CPU)")
+    p.add_argument("--batch-ms", type=float, default=None, help="cửa sổ gộp truy vấn cùng điểm xuất phát")
+    p.add_argument("--preload", default="", help="các khu vực tải sẵn, cách nhau bởi dấu phẩy")
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
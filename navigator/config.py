@@ -0,0 +1,86 @@
+import os
+
+
+# ====== DANH SÁCH QUẬN ======
+DISTRICTS = {
+    "Quận 1": "District 1, Ho Chi Minh City, Vietnam",
+    "Quận 3": "District 3, Ho Chi Minh City, Vietnam",
+    "Quận 4": "District 4, Ho Chi Minh City, Vietnam",
+    "Quận 5": "District 5, Ho Chi Minh City, Vietnam",
+    "Quận 6": "District 6, Ho Chi Minh City, Vietnam",
+    "Quận 7": "District 7, Ho Chi Minh City, Vietnam",
+    "Quận 10": "District 10, Ho Chi Minh City, Vietnam",
+    "Quận 11": "District 11, Ho Chi Minh City, Vietnam",
+    "Bình Thạnh": "Binh Thanh District, Ho Chi Minh City, Vietnam",
+    "Gò Vấp": "Go Vap District, Ho Chi Minh City, Vietnam",
+    "Tân Bình": "Tan Binh District, Ho Chi Minh City, Vietnam",
+    "Phú Nhuận": "Phu Nhuan District, Ho Chi Minh City, Vietnam",
+    "Thủ Đức": "Thu Duc City, Ho Chi Minh City, Vietnam"
+}
+
+# Khu vực gộp tất cả các quận, cho phép tìm đường xuyên quận
+CITYWIDE = "Toàn TP.HCM"
+
+# ====== GIỚI HẠN BỘ NHỚ ======
+# Ngân sách bộ nhớ cho các quận giữ trong GraphStore (MB)
+GRAPH_MEMORY_MB = float(os.environ.get("GTN_GRAPH_MEMORY_MB", 1024))
+
+# ====== TIỀN XỬ LÝ ======
+# Số landmark ALT dựng lại mỗi khi cache đồ thị được build (0 = tắt)
+LANDMARK_COUNT = int(os.environ.get("GTN_LANDMARKS", 8))
+# Rút gọn chuỗi node bậc 2 thành cạnh tắt (A* chạy trên đồ thị rút gọn); nhãn thành phần
+# liên thông luôn được tính để loại ngay truy vấn không có đường. Tắt mặc định: đồ thị quận đã được
+# osmnx gộp node trung gian nên gần như không còn chuỗi để rút, A* rút gọn chỉ thêm chi phí.
+# Khi bật, đồ thị rút gọn chỉ được dùng nếu còn ít hơn CONTRACT_MAX_CORE số node của đồ thị gốc
+CONTRACT_CHAINS = os.environ.get("GTN_CONTRACT_CHAINS", "0") == "1"
+CONTRACT_MAX_CORE = float(os.environ.get("GTN_CONTRACT_MAX_CORE", 0.7))
+
+# ====== HIỂN THỊ ======
+# Lớp vùng đã duyệt: số cạnh tối đa được vẽ và độ phân giải khi gộp cạnh
+# (số điểm ảnh theo chiều lớn hơn của khung bao), cạnh trùng điểm ảnh chỉ vẽ một lần
+OVERLAY_MAX_EDGES = int(os.environ.get("GTN_OVERLAY_MAX_EDGES", 4000))
+OVERLAY_PIXELS = int(os.environ.get("GTN_OVERLAY_PIXELS", 800))
+
+# ====== CACHE KẾT QUẢ TÌM ĐƯỜNG ======
+# Số kết quả giữ lại (LRU) và thời gian sống (giây, 0 = không hết hạn)
+ROUTE_CACHE_SIZE = int(os.environ.get("GTN_ROUTE_CACHE_SIZE", 2048))
+ROUTE_CACHE_TTL_S = float(os.environ.get("GTN_ROUTE_CACHE_TTL_S", 3600))
+
+# ====== ĐO ĐẠC ======
+# Ghi thời gian và bộ đếm theo từng bước của mỗi lần chạy / mỗi truy vấn ra file JSON lines.
+# INSTRUMENT_ALLOC đo thêm cấp phát bằng tracemalloc (làm chậm rõ rệt code cấp phát nhiều)
+INSTRUMENT = os.environ.get("GTN_INSTRUMENT", "0") == "1"
+INSTRUMENT_ALLOC = os.environ.get("GTN_INSTRUMENT_ALLOC", "0") == "1"
+INSTRUMENT_LOG = os.environ.get("GTN_INSTRUMENT_LOG", "logs/instrument.jsonl")
+
+# ====== GIAO THÔNG ======
+# Snapshot tốc độ theo cạnh (.parquet/.csv) đặt trong TRAFFIC_DIR, trùng tên với file cache đồ thị,
+# được đọc lại khi file thay đổi; mỗi TRAFFIC_REFRESH_S giây kiểm tra file và khung giờ hiện tại
+TRAFFIC_DIR = os.environ.get("GTN_TRAFFIC_DIR", "traffic")
+TRAFFIC_REFRESH_S = float(os.environ.get("GTN_TRAFFIC_REFRESH_S", 60))
+TRAFFIC_BUCKET_MIN = int(os.environ.get("GTN_TRAFFIC_BUCKET_MIN", 15))
+# Tốc độ (km/h) khi chưa có số liệu và khoảng kẹp; tốc độ tối đa quyết định độ chặt của heuristic
+TRAFFIC_DEFAULT_KPH = float(os.environ.get("GTN_TRAFFIC_DEFAULT_KPH", 25))
+TRAFFIC_MIN_KPH = float(os.environ.get("GTN_TRAFFIC_MIN_KPH", 3))
+TRAFFIC_MAX_KPH = float(os.environ.get("GTN_TRAFFIC_MAX_KPH", 60))
+
+# ====== DỊCH VỤ HTTP ======
+# Số process tìm đường (0 = số CPU, 1 = một luồng trong process chính), cửa sổ gộp các truy vấn
+# cùng điểm xuất phát (ms), thời gian xử lý tối đa mỗi yêu cầu (giây) và kích thước body tối đa (byte)
+SERVICE_HOST = os.environ.get("GTN_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("GTN_SERVICE_PORT", 8765))
+SERVICE_WORKERS = int(os.environ.get("GTN_SERVICE_WORKERS", 0))
+SERVICE_BATCH_MS = float(os.environ.get("GTN_SERVICE_BATCH_MS", 2))
+SERVICE_TIMEOUT_S = float(os.environ.get("GTN_SERVICE_TIMEOUT_S", 30))
+SERVICE_MAX_BODY = int(os.environ.get("GTN_SERVICE_MAX_BODY", 1048576))
+
+# ====== THỰC THI TRUY VẤN DÙNG CHUNG ======
+# Số luồng tìm đường dùng chung cho mọi phiên, số truy vấn tối đa đang chờ + đang chạy
+# và thời gian chờ chỗ trống (giây) trước khi từ chối truy vấn mới
+QUERY_WORKERS = int(os.environ.get("GTN_QUERY_WORKERS", 4))
+QUERY_QUEUE = int(os.environ.get("GTN_QUERY_QUEUE", 64))
+QUERY_WAIT_S = float(os.environ.get("GTN_QUERY_WAIT_S", 2))
+
+# ====== VÙNG ĐẾN ĐƯỢC (ISOCHRONE) ======
+# Bán kính (mét) quanh các đoạn đường đến được khi dựng đa giác vùng phủ cho bản đồ
+ISOCHRONE_BUFFER_M = float(os.environ.get("GTN_ISOCHRONE_BUFFER_M", 40))
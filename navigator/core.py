@@ -0,0 +1,412 @@
+import math
+import threading
+from contextlib import contextmanager
+from heapq import heapify, heappush, heappop
+
+import numpy as np
+
+from .geo import EARTH_RADIUS_M
+
+
+# ====== VÙNG NHỚ TẠM DÙNG LẠI GIỮA CÁC TRUY VẤN ======
+# dist/parent của node v chỉ hợp lệ khi seen[v] == gen, node đã chốt khi closed[v] == gen.
+# Mỗi truy vấn chỉ tăng gen thay vì cấp phát và khởi tạo lại mảng cỡ n.
+# Dùng list Python vì vòng lặp tìm kiếm đọc/ghi từng phần tử.
+class SearchWorkspace:
+    def __init__(self, n_nodes):
+        self.n_nodes = n_nodes
+        self.seen = [0] * n_nodes
+        self.closed = [0] * n_nodes
+        self.dist = [0.0] * n_nodes
+        self.parent = [-1] * n_nodes
+        self.gen = 0
+
+    def begin(self):
+        self.gen += 1
+        return self.gen
+
+    def path_to(self, start, goal):
+        if self.seen[goal] != self.gen:
+            return []
+        path = [goal]
+        while path[-1] != start:
+            path.append(self.parent[path[-1]])
+        path.reverse()
+        return path
+
+
+# ====== KHO WORKSPACE DÙNG CHUNG ======
+# Mỗi truy vấn mượn workspace trong lúc tìm rồi trả lại, nên mọi luồng (phiên Streamlit,
+# worker của QueryExecutor, dịch vụ HTTP) dùng lại vùng nhớ đã cấp phát thay vì mỗi luồng
+# (luồng script Streamlit sống ngắn) tự cấp phát mảng cỡ n. Workspace lớn dùng được cho đồ thị
+# nhỏ hơn (đồ thị con hành lang); chỉ giữ lại tối đa max_idle workspace rảnh, lớn nhất trước.
+MAX_IDLE_WORKSPACES = 16
+
+
+class WorkspacePool:
+    def __init__(self, max_idle=MAX_IDLE_WORKSPACES):
+        self.max_idle = max_idle
+        self.created = 0
+        self.reused = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self, n_nodes):
+        with self._lock:
+            fits = [i for i, ws in enumerate(self._idle) if ws.n_nodes >= n_nodes]
+            if fits:
+                self.reused += 1
+                return self._idle.pop(min(fits, key=lambda i: self._idle[i].n_nodes))
+            self.created += 1
+        return SearchWorkspace(n_nodes)
+
+    def release(self, ws):
+        with self._lock:
+            self._idle.append(ws)
+            if len(self._idle) > self.max_idle:
+                self._idle.remove(min(self._idle, key=lambda w: w.n_nodes))
+
+    @contextmanager
+    def borrow(self, n_nodes, count=1):
+        items = [self.acquire(n_nodes) for _ in range(count)]
+        try:
+            yield items
+        finally:
+            for ws in items:
+                self.release(ws)
+
+    def stats(self):
+        with self._lock:
+            return {"idle": len(self._idle), "created": self.created, "reused": self.reused,
+                    "idle_nodes": sum(ws.n_nodes for ws in self._idle)}
+
+
+_workspaces = WorkspacePool()
+
+
+def get_workspaces():
+    return _workspaces
+
+
+class SearchResult:
+    __slots__ = ("path", "distance", "stats", "edges", "scanned")
+
+    def __init__(self, path, distance, stats, edges=None, scanned=None):
+        self.path = path
+        self.distance = distance
+        self.stats = stats        # pushes, pops, settled
+        self.edges = edges        # chỉ số các cạnh đã duyệt (khi track_edges=True)
+        self.scanned = scanned    # cạnh mà kết quả phụ thuộc (khi track_edges=True, xem _settled)
+
+
+# ====== CẠNH MÀ KẾT QUẢ PHỤ THUỘC ======
+# A* / Dijkstra chỉ đọc trọng số các cạnh rời node đã chốt (chiều ngược: cạnh đi vào), nên
+# kết quả còn đúng chừng nào trọng số các cạnh đó không đổi: node chưa chốt có f >= chi phí tốt
+# nhất và heuristic vẫn là cận dưới với mọi trọng số >= độ dài * scale. RouteCache dùng tập
+# cạnh này để chỉ bỏ kết quả chạm vào cạnh vừa đổi thời gian đi.
+def out_edges(offsets, nodes):
+    # Chỉ số CSR của mọi cạnh rời các node
+    nodes = np.asarray(nodes, dtype=np.int64)
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    row_start = np.cumsum(counts) - counts
+    return np.repeat(starts - row_start, counts) + np.arange(int(counts.sum()))
+
+
+def _settled(ws, gen, sources, targets, edges):
+    # Node đã chốt trong số các nguồn và đích các cạnh đã ghi (mỗi node đã chốt khác nguồn có cạnh cha)
+    nodes = set(sources)
+    nodes.update(targets[k] for k in edges)
+    return [v for v in nodes if ws.closed[v] == gen]
+
+
+# ====== TRỌNG SỐ CẠNH DỰNG SẴN ======
+# Trọng số bất biến (vd thời gian đi theo giao thông) kèm bản list xuôi/ngược dựng một lần
+# thay vì mỗi truy vấn. scale đổi heuristic haversine (mét) sang cùng đơn vị với trọng số,
+# vd 1 / tốc độ tối đa (m/s) cho thời gian: A* vẫn chính xác khi weight >= length * scale.
+class EdgeWeights:
+    def __init__(self, values, scale=1.0):
+        self.values = values
+        self.scale = scale
+        self._forward = None
+        self._reverse = None
+
+    def forward(self):
+        if self._forward is None:
+            self._forward = self.values.tolist()
+        return self._forward
+
+    def reverse(self, graph):
+        if self._reverse is None:
+            self._reverse = self.values[graph.reversed_graph()[1]].tolist()
+        return self._reverse
+
+    def subset(self, edge_ids):
+        # Trọng số cho đồ thị con (edge_ids: chỉ số cạnh trong đồ thị cha)
+        return EdgeWeights(self.values[edge_ids], self.scale)
+
+
+def haversine_to(graph, goal, scale=1.0):
+    # Heuristic vô hướng h(v): khoảng cách đường tròn lớn (mét, nhân scale) từ node v tới goal
+    return haversine_to_point(graph, graph.y[goal], graph.x[goal], scale)
+
+
+def haversine_to_point(graph, lat_deg, lon_deg, scale=1.0):
+    # Như haversine_to nhưng tới một tọa độ bất kỳ (vd node đã bị rút gọn khỏi đồ thị)
+    lat, lon, cos_lat = graph.adjacency_lists()[3:]
+    glat, glon = math.radians(lat_deg), math.radians(lon_deg)
+    gcos = math.cos(glat)
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    radius = 2 * EARTH_RADIUS_M * scale
+
+    def h(v):
+        a = sin((lat[v] - glat) / 2) ** 2 + cos_lat[v] * gcos * sin((lon[v] - glon) / 2) ** 2
+        return radius * asin(sqrt(min(a, 1.0)))
+    return h
+
+
+def alt_to(graph, landmarks, node, scale=1.0, reverse=False):
+    # Heuristic ALT vô hướng: cận dưới (mét, nhân scale) từ v tới node (reverse: từ node tới v),
+    # bảng cận của mọi node dựng một lần theo lô rồi tra theo chỉ số
+    return (landmarks.lower_bounds(graph, node, reverse) * scale).tolist().__getitem__
+
+
+# ====== GREEDY BEST-FIRST ======
+# Mỗi node vào hàng đợi đúng một lần (lần đầu được phát hiện), dừng ngay khi phát hiện goal.
+def _greedy(graph, start, goal, h, ws, track_edges):
+    offsets, targets = graph.adjacency_lists()[:2]
+    gen = ws.begin()
+    seen, parent = ws.seen, ws.parent
+    seen[start] = gen
+    parent[start] = -1
+    heap = [(0.0, start)]
+    edges = [] if track_edges else None
+    pushes, pops = 1, 0
+    found = start == goal
+    while heap and not found:
+        _, u = heappop(heap)
+        pops += 1
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            if seen[v] == gen:
+                continue
+            seen[v] = gen
+            parent[v] = u
+            if track_edges:
+                edges.append(k)
+            if v == goal:
+                found = True
+                break
+            heappush(heap, (h(v), v))
+            pushes += 1
+
+    stats = {"pushes": pushes, "pops": pops, "settled": pops}
+    if not found:
+        return SearchResult([], np.inf, stats, edges)
+    return SearchResult(ws.path_to(start, goal), None, stats, edges)
+
+
+# ====== A* ======
+# Hàng đợi nhị phân với bỏ qua mục cũ: node đã chốt hoặc có khóa lỗi thời bị bỏ qua khi lấy ra.
+def _astar(graph, start, goal, w, h, ws, track_edges):
+    offsets, targets = graph.adjacency_lists()[:2]
+    gen = ws.begin()
+    seen, closed, dist, parent = ws.seen, ws.closed, ws.dist, ws.parent
+    seen[start] = gen
+    dist[start] = 0.0
+    parent[start] = -1
+    heap = [(h(start), 0.0, start)]
+    edges = [] if track_edges else None
+    pushes, pops, settled = 1, 0, 0
+    while heap:
+        _, d, u = heappop(heap)
+        pops += 1
+        if closed[u] == gen:
+            continue
+        closed[u] = gen
+        settled += 1
+        if u == goal:
+            break
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            nd = d + w[k]
+            if (seen[v] != gen or nd < dist[v]) and closed[v] != gen:
+                seen[v] = gen
+                dist[v] = nd
+                parent[v] = u
+                if track_edges:
+                    edges.append(k)
+                heappush(heap, (nd + h(v), nd, v))
+                pushes += 1
+
+    stats = {"pushes": pushes, "pops": pops, "settled": settled}
+    scanned = out_edges(graph.offsets, _settled(ws, gen, (start,), targets, edges)) if track_edges else None
+    if closed[goal] != gen:
+        return SearchResult([], np.inf, stats, edges, scanned)
+    return SearchResult(ws.path_to(start, goal), dist[goal], stats, edges, scanned)
+
+
+# ====== A* NHIỀU NGUỒN / NHIỀU ĐÍCH ======
+# sources {node: chi phí ban đầu}, goals {node: chi phí còn lại từ node tới đích thật};
+# h(v) là cận dưới chi phí từ v tới đích thật. Dừng khi khóa nhỏ nhất >= chi phí tốt nhất
+# (best có thể khởi tạo sẵn, vd khi nguồn và đích nằm trên cùng một cạnh rút gọn).
+def _astar_multi(graph, sources, goals, w, h, ws, track_edges, best=np.inf):
+    offsets, targets = graph.adjacency_lists()[:2]
+    gen = ws.begin()
+    seen, closed, dist, parent = ws.seen, ws.closed, ws.dist, ws.parent
+    heap = []
+    for s, d0 in sources.items():
+        seen[s] = gen
+        dist[s] = d0
+        parent[s] = -1
+        heap.append((d0 + h(s), d0, s))
+    heapify(heap)
+    edges = [] if track_edges else None
+    best_goal = -1
+    pushes, pops, settled = len(heap), 0, 0
+    while heap:
+        f, d, u = heappop(heap)
+        pops += 1
+        if f >= best:
+            break
+        if closed[u] == gen:
+            continue
+        closed[u] = gen
+        settled += 1
+        extra = goals.get(u)
+        if extra is not None and d + extra < best:
+            best, best_goal = d + extra, u
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            nd = d + w[k]
+            if (seen[v] != gen or nd < dist[v]) and closed[v] != gen:
+                seen[v] = gen
+                dist[v] = nd
+                parent[v] = u
+                if track_edges:
+                    edges.append(k)
+                heappush(heap, (nd + h(v), nd, v))
+                pushes += 1
+
+    stats = {"pushes": pushes, "pops": pops, "settled": settled}
+    scanned = out_edges(graph.offsets, _settled(ws, gen, sources, targets, edges)) if track_edges else None
+    path = []
+    if best_goal >= 0:
+        path = [best_goal]
+        while parent[path[-1]] >= 0:
+            path.append(parent[path[-1]])
+        path.reverse()
+    return SearchResult(path, best, stats, edges, scanned)
+
+
+# ====== A* HAI CHIỀU ======
+# Thế trung bình p(v) = (h_t(v) - h_s(v)) / 2 cho chiều xuôi và -p(v) cho chiều ngược,
+# cả hai chiều chạy Dijkstra trên cùng độ dài rút gọn nên điều kiện dừng là
+# khóa nhỏ nhất xuôi + khóa nhỏ nhất ngược >= mu (độ dài đường tốt nhất đã gặp).
+def _bidirectional(graph, start, goal, w, w_rev, ws_f, ws_b, track_edges, scale=1.0, landmarks=None):
+    if start == goal:
+        return SearchResult([start], 0.0, {"pushes": 0, "pops": 0, "settled": 0},
+                            *([], np.zeros(0, dtype=np.int64)) if track_edges else (None, None))
+    rev, rev_edges = graph.reversed_graph()
+    if landmarks is None:
+        h_goal, h_start = haversine_to(graph, goal, scale), haversine_to(graph, start, scale)
+    else:
+        h_goal, h_start = alt_to(graph, landmarks, goal, scale), alt_to(graph, landmarks, start, scale, reverse=True)
+
+    def potential(v):
+        return (h_goal(v) - h_start(v)) / 2
+
+    gen_f, gen_b = ws_f.begin(), ws_b.begin()
+    for ws, gen, src in ((ws_f, gen_f, start), (ws_b, gen_b, goal)):
+        ws.seen[src] = gen
+        ws.dist[src] = 0.0
+        ws.parent[src] = -1
+    heap_f = [(potential(start), 0.0, start)]
+    heap_b = [(-potential(goal), 0.0, goal)]
+    edges_f, edges_b = [], []
+    fwd = (ws_f, gen_f, ws_b, gen_b, *graph.adjacency_lists()[:2], w, 1.0, heap_f, edges_f)
+    bwd = (ws_b, gen_b, ws_f, gen_f, *rev.adjacency_lists()[:2], w_rev, -1.0, heap_b, edges_b)
+
+    mu, meet = np.inf, -1
+    pushes, pops, settled = 2, 0, 0
+    while heap_f and heap_b:
+        if heap_f[0][0] + heap_b[0][0] >= mu:
+            break
+        ws, gen, o_ws, o_gen, offsets, targets, wt, sign, heap, edges = \
+            fwd if heap_f[0][0] <= heap_b[0][0] else bwd
+        seen, closed, dist, parent = ws.seen, ws.closed, ws.dist, ws.parent
+        _, d, u = heappop(heap)
+        pops += 1
+        if closed[u] == gen:
+            continue
+        closed[u] = gen
+        settled += 1
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            nd = d + wt[k]
+            # Cập nhật mu khi chạm vùng đã được chiều kia thăm
+            if o_ws.seen[v] == o_gen and nd + o_ws.dist[v] < mu:
+                mu, meet = nd + o_ws.dist[v], v
+            if (seen[v] != gen or nd < dist[v]) and closed[v] != gen:
+                seen[v] = gen
+                dist[v] = nd
+                parent[v] = u
+                if track_edges:
+                    edges.append(k)
+                heappush(heap, (nd + sign * potential(v), nd, v))
+                pushes += 1
+
+    stats = {"pushes": pushes, "pops": pops, "settled": settled}
+    edges = scanned = None
+    if track_edges:
+        edges = edges_f + rev_edges[edges_b].tolist()
+        settled_f = _settled(ws_f, gen_f, (start,), graph.adjacency_lists()[1], edges_f)
+        settled_b = _settled(ws_b, gen_b, (goal,), rev.adjacency_lists()[1], edges_b)
+        scanned = np.concatenate([out_edges(graph.offsets, settled_f), rev_edges[out_edges(rev.offsets, settled_b)]])
+    if meet < 0:
+        return SearchResult([], np.inf, stats, edges, scanned)
+    head = ws_f.path_to(start, meet)
+    tail = ws_b.path_to(goal, meet)[::-1]
+    return SearchResult(head + tail[1:], mu, stats, edges, scanned)
+
+
+# ====== ĐIỂM VÀO ======
+MODES = ("greedy", "astar", "bidirectional")
+
+
+def route(graph, start, goal, mode="astar", weights=None, track_edges=False, landmarks=None):
+    # weights: None (độ dài), EdgeWeights (list dựng sẵn, heuristic nhân scale) hoặc mảng numpy
+    # (chuyển sang list mỗi lần gọi, heuristic tính bằng mét nên cần trọng số >= độ dài cạnh).
+    # landmarks (bảng ALT của chính graph, nếu có): A* và A* hai chiều dùng cận ALT thay haversine
+    if weights is not None and not isinstance(weights, EdgeWeights):
+        weights = EdgeWeights(np.asarray(weights))
+    scale = 1.0 if weights is None else weights.scale
+    # Khác thành phần liên thông (nếu đã tính, xem reduction.py): thất bại ngay không cần tìm
+    if graph.components is not None and graph.components.proven_unreachable(start, goal):
+        return SearchResult([], np.inf, {"pushes": 0, "pops": 0, "settled": 0},
+                            *([], np.zeros(0, dtype=np.int64)) if track_edges else (None, None))
+    if mode == "greedy":
+        # Đường greedy chỉ theo heuristic, không phụ thuộc trọng số (scanned = None)
+        with _workspaces.borrow(graph.n_nodes) as (ws,):
+            result = _greedy(graph, start, goal, haversine_to(graph, goal), ws, track_edges)
+        if result.path:
+            result.distance = graph.path_length(result.path, None if weights is None else weights.values)
+        return result
+    w = graph.adjacency_lists()[2] if weights is None else weights.forward()
+    if mode == "astar":
+        h = haversine_to(graph, goal, scale) if landmarks is None else alt_to(graph, landmarks, goal, scale)
+        with _workspaces.borrow(graph.n_nodes) as (ws,):
+            return _astar(graph, start, goal, w, h, ws, track_edges)
+    if mode == "bidirectional":
+        rev, rev_edges = graph.reversed_graph()
+        w_rev = rev.adjacency_lists()[2] if weights is None else weights.reverse(graph)
+        with _workspaces.borrow(graph.n_nodes, 2) as (ws, ws_rev):
+            return _bidirectional(graph, start, goal, w, w_rev, ws, ws_rev, track_edges, scale, landmarks)
+    raise ValueError(f"Không hỗ trợ chế độ tìm kiếm '{mode}'")
+
+
+def route_multi(graph, sources, goals, h, weights=None, track_edges=False, best=np.inf):
+    # sources/goals: {node: chi phí}, h: cận dưới tới đích thật (cùng đơn vị với trọng số)
+    w = graph.adjacency_lists()[2] if weights is None else weights.forward()
+    with _workspaces.borrow(graph.n_nodes) as (ws,):
+        return _astar_multi(graph, sources, goals, w, h, ws, track_edges, best)
@@ -0,0 +1,83 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from .cache import cache_path, get_graph_from_cache, read_graph
+from .citywide import citywide_path, get_citywide
+from .config import CITYWIDE, DISTRICTS
+from .search import dijkstra, reconstruct_path
+
+
+# ====== TẢI ĐỒ THỊ THEO TÊN KHU VỰC ======
+def load_district(name, cache_dir=None):
+    # Đảm bảo cache tồn tại; trả về (graph, đường dẫn file) để worker tự mmap lại
+    loader = partial(get_graph_from_cache, cache_dir=cache_dir)
+    if name == CITYWIDE:
+        city = get_citywide(DISTRICTS, loader, cache_dir)
+        return city.graph, citywide_path(cache_dir)
+    place_name = DISTRICTS[name]
+    return loader(place_name), cache_path(place_name, cache_dir)
+
+
+# ====== MỘT NGUỒN - NHIỀU ĐÍCH ======
+def one_to_many(graph, origin, destinations, with_paths=False, weights=None):
+    # Một cây đường đi ngắn nhất cho mỗi điểm xuất phát, dừng khi đã chốt hết các đích
+    destinations = np.asarray(destinations, dtype=np.int64)
+    dist, parent = dijkstra(graph, origin, destinations, weights=weights)
+    dists = dist[destinations]
+    paths = None
+    if with_paths:
+        paths = [reconstruct_path(parent, origin, int(d)) if np.isfinite(dv) else []
+                 for d, dv in zip(destinations, dists)]
+    return dists, paths
+
+
+def _solve(graph, task, with_paths):
+    origin, rows, destinations = task
+    dists, paths = one_to_many(graph, origin, destinations, with_paths)
+    return rows, dists, paths
+
+
+# Mỗi worker mở file cache bằng mmap một lần, các trang được chia sẻ giữa các process
+_worker_graph = None
+
+
+def _attach(path):
+    global _worker_graph
+    _worker_graph = read_graph(path)
+
+
+def _solve_in_worker(task, with_paths):
+    return _solve(_worker_graph, task, with_paths)
+
+
+def _collect(dists, paths, rows, d, p):
+    dists[rows] = d
+    if paths is not None:
+        for row, path in zip(rows.tolist(), p):
+            paths[row] = path
+
+
+def route_matrix(graph, origins, destinations, with_paths=False, workers=1, graph_path=None):
+    # Khoảng cách (và đường đi) cho từng cặp OD; các cặp cùng điểm xuất phát dùng chung một cây
+    origins = np.asarray(origins, dtype=np.int64)
+    destinations = np.asarray(destinations, dtype=np.int64)
+    order = np.argsort(origins, kind="stable")
+    bounds = np.flatnonzero(np.diff(origins[order])) + 1
+    tasks = [(int(origins[rows[0]]), rows, destinations[rows]) for rows in np.split(order, bounds) if len(rows)]
+
+    dists = np.full(len(origins), np.inf)
+    paths = [None] * len(origins) if with_paths else None
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and graph_path is not None and len(tasks) > 1:
+        with ProcessPoolExecutor(workers, initializer=_attach, initargs=(str(graph_path),)) as pool:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            results = pool.map(partial(_solve_in_worker, with_paths=with_paths), tasks, chunksize=chunksize)
+            for rows, d, p in results:
+                _collect(dists, paths, rows, d, p)
+    else:
+        for task in tasks:
+            _collect(dists, paths, *_solve(graph, task, with_paths))
+    return dists, paths
@@ -0,0 +1,177 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import QUERY_QUEUE, QUERY_WAIT_S, QUERY_WORKERS
+from .core import get_workspaces
+
+
+# ====== THỰC THI TRUY VẤN DÙNG CHUNG ======
+# Mọi phiên gửi truy vấn vào một nhóm luồng cố định chạy trên đồ thị chỉ đọc dùng chung
+# (GraphStore), vùng nhớ tạm mượn từ kho workspace của core.
+#   - Giới hạn: tối đa max_pending truy vấn đang chờ + đang chạy; đầy thì chờ tối đa wait giây
+#     rồi báo QueueFull để giao diện yêu cầu thử lại thay vì xếp hàng vô hạn.
+#   - Dùng chung: truy vấn cùng khóa (vd khóa RouteCache) đang chạy thì phiên sau chờ chung kết quả.
+#   - Hủy: mỗi phiên giữ một Ticket; khi mọi phiên chờ một truy vấn đã hủy (rerun, đổi khu vực),
+#     truy vấn chưa chạy bị bỏ khỏi hàng đợi, truy vấn đang chạy dừng ở checkpoint() kế tiếp.
+class QueueFull(RuntimeError):
+    pass
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+_cancel = contextvars.ContextVar("gtn_cancel", default=None)
+
+
+def checkpoint():
+    # Gọi giữa các bước dài của một truy vấn: dừng sớm khi không còn ai chờ kết quả
+    event = _cancel.get()
+    if event is not None and event.is_set():
+        raise QueryCancelled()
+
+
+class _Job:
+    __slots__ = ("key", "owners", "cancel", "future")
+
+    def __init__(self, key, owner):
+        self.key = key
+        self.owners = [owner]
+        self.cancel = threading.Event()
+        self.future = None
+
+
+class Ticket:
+    # Phần của một phiên trong một truy vấn (có thể dùng chung với phiên khác)
+    def __init__(self, executor, job, owner, shared):
+        self.executor = executor
+        self.job = job
+        self.owner = owner
+        self.shared = shared      # True nếu truy vấn đã được phiên khác gửi trước
+
+    def done(self):
+        return self.job.future.done()
+
+    def result(self, timeout=None):
+        return self.job.future.result(timeout)
+
+    def cancel(self):
+        self.executor._release(self.job, self.owner)
+
+
+class QueryExecutor:
+    def __init__(self, workers=QUERY_WORKERS, max_pending=QUERY_QUEUE, wait=QUERY_WAIT_S):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait = wait
+        self.submitted = 0
+        self.shared = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.failed = 0
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="gtn-query")
+        self._jobs = set()
+        self._keys = {}
+        self._cond = threading.Condition()
+
+    def submit(self, fn, *args, key=None, owner=None, **kwargs):
+        # fn chạy trong ngữ cảnh (contextvars) của người gửi, vd trace đo đạc đang mở
+        with self._cond:
+            job = self._keys.get(key) if key is not None else None
+            if job is not None and not job.cancel.is_set():
+                job.owners.append(owner)
+                self.shared += 1
+                return Ticket(self, job, owner, True)
+            deadline = time.monotonic() + self.wait
+            while len(self._jobs) >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise QueueFull(f"Đang có {len(self._jobs)} truy vấn chờ xử lý")
+                self._cond.wait(remaining)
+            job = _Job(key, owner)
+            self._jobs.add(job)
+            if key is not None:
+                self._keys[key] = job
+            self.submitted += 1
+            ctx = contextvars.copy_context()
+            job.future = self._pool.submit(ctx.run, self._run, job, fn, args, kwargs)
+        job.future.add_done_callback(lambda f, job=job: self._finished(job))
+        return Ticket(self, job, owner, False)
+
+    def run(self, fn, *args, key=None, owner=None, timeout=None, **kwargs):
+        ticket = self.submit(fn, *args, key=key, owner=owner, **kwargs)
+        try:
+            return ticket.result(timeout)
+        finally:
+            ticket.cancel()
+
+    @staticmethod
+    def _run(job, fn, args, kwargs):
+        if job.cancel.is_set():
+            raise QueryCancelled()
+        token = _cancel.set(job.cancel)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _cancel.reset(token)
+
+    def _finished(self, job):
+        with self._cond:
+            self._jobs.discard(job)
+            if self._keys.get(job.key) is job:
+                del self._keys[job.key]
+            f = job.future
+            if f.cancelled() or isinstance(f.exception(), QueryCancelled):
+                self.cancelled += 1
+            elif f.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self._cond.notify_all()
+
+    def _release(self, job, owner):
+        # Bỏ phần của owner; không còn ai chờ thì hủy truy vấn (không ảnh hưởng kết quả đã xong)
+        with self._cond:
+            if job.future.done() or owner not in job.owners:
+                return
+            job.owners.remove(owner)
+            if job.owners:
+                return
+            job.cancel.set()
+            if self._keys.get(job.key) is job:
+                del self._keys[job.key]
+        job.future.cancel()
+
+    def cancel_owner(self, owner):
+        # Hủy mọi truy vấn owner đang chờ (vd phiên đổi khu vực giữa chừng)
+        with self._cond:
+            jobs = [job for job in self._jobs if owner in job.owners]
+        for job in jobs:
+            self._release(job, owner)
+        return len(jobs)
+
+    def stats(self):
+        with self._cond:
+            return {"workers": self.workers, "pending": len(self._jobs), "max_pending": self.max_pending,
+                    "submitted": self.submitted, "shared": self.shared, "rejected": self.rejected,
+                    "cancelled": self.cancelled, "completed": self.completed, "failed": self.failed,
+                    "workspaces": get_workspaces().stats()}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = QueryExecutor()
+        return _executor
@@ -0,0 +1,27 @@
+import numpy as np
+
+
+# ====== KHOẢNG CÁCH ĐỊA LÝ ======
+# Cùng bán kính Trái Đất với osmnx nên đơn vị khớp với trọng số 'length' (mét).
+# Độ dài cạnh OSM luôn >= khoảng cách đường tròn lớn giữa hai đầu mút,
+# vì vậy heuristic haversine là chấp nhận được (admissible) cho A*.
+EARTH_RADIUS_M = 6_371_009
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def goal_heuristic(graph, goal):
+    # Trả về h(nodes): khoảng cách (mét) từ một mảng node tới goal, tính theo lô
+    lat, lon, cos_lat = graph.coords_rad()
+    glat, glon, gcos = lat[goal], lon[goal], cos_lat[goal]
+
+    def h(nodes):
+        a = (np.sin((lat[nodes] - glat) / 2) ** 2 +
+             cos_lat[nodes] * gcos * np.sin((lon[nodes] - glon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return h
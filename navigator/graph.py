@@ -0,0 +1,173 @@
+import numpy as np
+
+from .spatial import SpatialIndex
+
+
+# ====== ĐỒ THỊ ĐỊNH TUYẾN DẠNG CSR ======
+# Node được đánh số liên tục 0..n-1 theo đúng thứ tự G_multi.nodes(),
+# cạnh ra của node i nằm trong targets[offsets[i]:offsets[i+1]].
+# Cạnh song song chỉ giữ cạnh ngắn nhất (giống multigraph_to_digraph cũ).
+class RoutingGraph:
+    def __init__(self, node_ids, x, y, offsets, targets, lengths, meta=None):
+        self.node_ids = node_ids    # id OSM gốc (int64)
+        self.x = x                  # kinh độ (float64)
+        self.y = y                  # vĩ độ (float64)
+        self.offsets = offsets      # int64, độ dài n+1
+        self.targets = targets      # int32, độ dài m
+        self.lengths = lengths      # float64, độ dài m (mét)
+        self.meta = dict(meta or {})
+        self.components = None      # nhãn thành phần liên thông (reduction.Components) nếu đã tính
+        self._index = None
+        self._sources = None
+        self._reverse = None
+        self._rad = None
+        self._spatial = None
+        self._lists = None
+
+    @property
+    def n_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def n_edges(self):
+        return len(self.targets)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.node_ids, self.x, self.y,
+                                      self.offsets, self.targets, self.lengths))
+
+    # ====== TẠO ĐỒ THỊ ======
+    @staticmethod
+    def edge_order(src, dst, lengths):
+        # Chỉ số các cạnh đầu vào được giữ, theo đúng thứ tự cạnh trong CSR.
+        # Sắp theo (u, v, length) để cạnh ngắn nhất của mỗi cặp (u, v) đứng đầu
+        order = np.lexsort((lengths, dst, src))
+        src, dst = src[order], dst[order]
+        keep = np.ones(len(src), dtype=bool)
+        keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+        return order[keep]
+
+    @classmethod
+    def from_edges(cls, node_ids, x, y, src, dst, lengths, meta=None):
+        n = len(node_ids)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.float64)
+
+        picks = cls.edge_order(src, dst, lengths)
+        src, dst, lengths = src[picks], dst[picks], lengths[picks]
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+        return cls(np.asarray(node_ids, dtype=np.int64),
+                   np.asarray(x, dtype=np.float64),
+                   np.asarray(y, dtype=np.float64),
+                   offsets, dst.astype(np.int32), lengths, meta)
+
+    @classmethod
+    def from_multigraph(cls, G_multi, meta=None):
+        n = G_multi.number_of_nodes()
+        m = G_multi.number_of_edges()
+        node_ids = np.fromiter(G_multi.nodes(), dtype=np.int64, count=n)
+        x = np.fromiter((d['x'] for _, d in G_multi.nodes(data=True)), dtype=np.float64, count=n)
+        y = np.fromiter((d['y'] for _, d in G_multi.nodes(data=True)), dtype=np.float64, count=n)
+
+        index = {node: i for i, node in enumerate(node_ids.tolist())}
+        src = np.empty(m, dtype=np.int64)
+        dst = np.empty(m, dtype=np.int64)
+        lengths = np.empty(m, dtype=np.float64)
+        for k, (u, v, length) in enumerate(G_multi.edges(data='length', default=1)):
+            src[k] = index[u]
+            dst[k] = index[v]
+            lengths[k] = length
+        return cls.from_edges(node_ids, x, y, src, dst, lengths, meta)
+
+    # ====== TRA CỨU ======
+    def index_of(self, node_id):
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.node_ids.tolist())}
+        return self._index[node_id]
+
+    def neighbors(self, i):
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def coords_rad(self):
+        # (vĩ độ, kinh độ, cos vĩ độ) dạng radian, tính một lần cho heuristic
+        if self._rad is None:
+            lat = np.radians(self.y)
+            self._rad = (lat, np.radians(self.x), np.cos(lat))
+        return self._rad
+
+    def adjacency_lists(self):
+        # (offsets, targets, lengths, vĩ độ, kinh độ, cos vĩ độ) dạng list Python cho vòng lặp
+        # tìm kiếm: đọc từng phần tử list nhanh hơn nhiều so với cắt mảng numpy cho mỗi node
+        if self._lists is None:
+            self._lists = tuple(a.tolist() for a in (self.offsets, self.targets, self.lengths,
+                                                     *self.coords_rad()))
+        return self._lists
+
+    def spatial_index(self):
+        # Chỉ mục lưới cho tra cứu node gần nhất, dựng một lần cho mỗi đồ thị
+        if self._spatial is None:
+            self._spatial = SpatialIndex(self.y, self.x)
+        return self._spatial
+
+    def edge_sources(self):
+        # Đỉnh nguồn của từng cạnh (tính một lần)
+        if self._sources is None:
+            self._sources = np.repeat(np.arange(self.n_nodes, dtype=np.int32),
+                                      np.diff(self.offsets))
+        return self._sources
+
+    def edge_index(self, u, v):
+        a, b = self.offsets[u], self.offsets[u + 1]
+        # targets trong mỗi hàng đã được sắp tăng dần
+        k = a + np.searchsorted(self.targets[a:b], v)
+        if k < b and self.targets[k] == v:
+            return int(k)
+        return -1
+
+    def edge_length(self, u, v):
+        return float(self.lengths[self.edge_index(u, v)])
+
+    def path_edges(self, path):
+        return np.array([self.edge_index(u, v) for u, v in zip(path[:-1], path[1:])],
+                        dtype=np.int64)
+
+    def path_length(self, path, weights=None):
+        w = self.lengths if weights is None else weights
+        return float(w[self.path_edges(path)].sum()) if len(path) > 1 else 0.0
+
+    def reversed_graph(self):
+        # Đồ thị ngược (cạnh v -> u) dùng chung tọa độ, kèm edge_ids trỏ về cạnh xuôi
+        if self._reverse is None:
+            order = np.argsort(self.targets, kind='stable')
+            offsets = np.zeros(self.n_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.targets, minlength=self.n_nodes), out=offsets[1:])
+            rev = RoutingGraph(self.node_ids, self.x, self.y, offsets,
+                               self.edge_sources()[order], self.lengths[order], self.meta)
+            rev._rad = self._rad
+            self._reverse = (rev, order)
+        return self._reverse
+
+    def subgraph(self, nodes):
+        # Đồ thị con cảm sinh trên tập node (mảng chỉ số đã sắp tăng dần).
+        # Chi phí tỉ lệ với kích thước đồ thị con, không phụ thuộc n_nodes.
+        nodes = np.asarray(nodes, dtype=np.int64)
+        starts = self.offsets[nodes]
+        counts = self.offsets[nodes + 1] - starts
+        total = int(counts.sum())
+        row_start = np.cumsum(counts) - counts
+        edge_ids = np.repeat(starts - row_start, counts) + np.arange(total)
+
+        tg = self.targets[edge_ids]
+        pos = np.minimum(np.searchsorted(nodes, tg), max(len(nodes) - 1, 0))
+        inside = nodes[pos] == tg if len(nodes) else np.zeros(0, dtype=bool)
+        src = np.repeat(np.arange(len(nodes)), counts)[inside]
+
+        offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(nodes)), out=offsets[1:])
+        return RoutingGraph(self.node_ids[nodes], self.x[nodes], self.y[nodes], offsets,
+                            pos[inside].astype(np.int32), self.lengths[edge_ids[inside]],
+                            {"parent_version": self.meta.get("version"), "parent_edges": edge_ids[inside]})
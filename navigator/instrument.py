@@ -0,0 +1,158 @@
+import contextvars
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from .config import INSTRUMENT, INSTRUMENT_ALLOC, INSTRUMENT_LOG
+
+
+# ====== ĐO THỜI GIAN / CẤP PHÁT THEO TỪNG BƯỚC ======
+# Một Trace ứng với một lần chạy script (rerun) hoặc một truy vấn tìm đường, gồm các stage
+# với thời gian (ms), cấp phát (KB, khi bật tracemalloc) và bộ đếm tùy ý (settled, pushes...).
+# Trace đang hoạt động được truyền qua contextvar nên code sâu bên trong chỉ cần gọi stage().
+# Khi tắt, mọi lời gọi trả về đối tượng rỗng dùng chung, gần như không tốn chi phí.
+# Mỗi trace khi kết thúc được ghi thành một dòng JSON vào INSTRUMENT_LOG.
+_current = contextvars.ContextVar("gtn_trace", default=None)
+_log_lock = threading.Lock()
+
+
+class _Discard(dict):
+    # Bộ đếm của stage khi đo đạc tắt: bỏ qua mọi ghi
+    def __setitem__(self, key, value):
+        pass
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+class _NullStage:
+    def __enter__(self):
+        return _DISCARD
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NullTrace:
+    enabled = False
+    stages = ()
+    children = ()
+
+    def stage(self, name, **fields):
+        return _NULL_STAGE
+
+    def annotate(self, **fields):
+        pass
+
+    def finish(self):
+        return None
+
+    def record(self):
+        return None
+
+
+_DISCARD = _Discard()
+_NULL_STAGE = _NullStage()
+NULL_TRACE = _NullTrace()
+
+
+class Trace:
+    enabled = True
+
+    def __init__(self, kind, fields, alloc=INSTRUMENT_ALLOC, log_path=INSTRUMENT_LOG):
+        self.kind = kind
+        self.fields = fields
+        self.alloc = alloc
+        self.log_path = log_path
+        self.stages = []
+        self.children = []
+        self.started = time.perf_counter()
+        self.timestamp = time.time()
+        self.elapsed_ms = None
+        self._token = None
+        if alloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        rec = {"stage": name, **fields}
+        if self.alloc:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["ms"] = round((time.perf_counter() - started) * 1000, 3)
+            if self.alloc:
+                current, peak = tracemalloc.get_traced_memory()
+                rec["alloc_kb"] = round((current - before) / 1024, 1)
+                rec["peak_kb"] = round((peak - before) / 1024, 1)
+            self.stages.append(rec)
+
+    def annotate(self, **fields):
+        self.fields.update(fields)
+
+    def record(self):
+        return {"kind": self.kind, "ts": round(self.timestamp, 3), "ms": self.elapsed_ms,
+                **self.fields, "stages": self.stages}
+
+    def finish(self):
+        if self.elapsed_ms is not None:
+            return self.record()
+        self.elapsed_ms = round((time.perf_counter() - self.started) * 1000, 3)
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+        parent = _current.get()
+        if parent is not None:
+            parent.children.append(self)
+        rec = self.record()
+        write_record(rec, self.log_path)
+        return rec
+
+
+def write_record(rec, path=INSTRUMENT_LOG):
+    if not path:
+        return
+    path = Path(path)
+    line = json.dumps(rec, ensure_ascii=False, default=str)
+    with _log_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def current():
+    return _current.get() or NULL_TRACE
+
+
+def start(kind, enabled=None, **fields):
+    # Trace con được bật khi đang nằm trong một trace đang bật, kể cả khi INSTRUMENT tắt.
+    # enabled khác None mở một trace gốc: bỏ trace còn sót lại trên luồng (vd lần chạy script trước
+    # bị ngắt trước khi finish) để nó không bật trace con và không giữ cây trace mãi lớn dần
+    if enabled is None:
+        enabled = INSTRUMENT or _current.get() is not None
+    else:
+        _current.set(None)
+    if not enabled:
+        return NULL_TRACE
+    t = Trace(kind, fields)
+    t._token = _current.set(t)
+    return t
+
+
+@contextmanager
+def trace(kind, enabled=None, **fields):
+    t = start(kind, enabled, **fields)
+    try:
+        yield t
+    finally:
+        t.finish()
+
+
+def stage(name, **fields):
+    return current().stage(name, **fields)
@@ -0,0 +1,234 @@
+import math
+from heapq import heapify, heappush, heappop
+
+import numpy as np
+
+from . import instrument
+from .config import ISOCHRONE_BUFFER_M
+from .core import EdgeWeights, get_workspaces
+from .geo import EARTH_RADIUS_M
+
+
+# ====== VÙNG ĐẾN ĐƯỢC (ISOCHRONE) ======
+# "Từ các điểm này đi được tới đâu trong N mét / N giây": một lần Dijkstra nhiều nguồn có giới hạn
+# (mọi nguồn cùng nằm trong hàng đợi ban đầu, vd tất cả bệnh viện của quận) thay vì tìm đường tới
+# từng node. Node có chi phí vượt cutoff không bao giờ được đưa vào hàng đợi nên tìm kiếm dừng ngay
+# khi đã chốt hết vùng trong giới hạn. Kết quả là các mảng NumPy theo thứ tự chốt (chi phí tăng
+# dần): node, chi phí, node cha và nguồn gần nhất, nên các ngưỡng nhỏ hơn cutoff (báo cáo độ phủ
+# 5/10/15 phút) chỉ là một lần searchsorted trên cùng kết quả.
+SHAPES = ("buffer", "convex")
+
+
+def _bounded(graph, sources, cutoff, w, ws):
+    offsets, targets = graph.adjacency_lists()[:2]
+    gen = ws.begin()
+    seen, closed, dist, parent = ws.seen, ws.closed, ws.dist, ws.parent
+    heap = []
+    for s, d0 in sources.items():
+        if d0 <= cutoff:
+            seen[s] = gen
+            dist[s] = d0
+            parent[s] = -1
+            heap.append((d0, s))
+    heapify(heap)
+    order = []
+    pushes, pops = len(heap), 0
+    while heap:
+        d, u = heappop(heap)
+        pops += 1
+        if closed[u] == gen:
+            continue
+        closed[u] = gen
+        order.append(u)
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            nd = d + w[k]
+            if nd <= cutoff and (seen[v] != gen or nd < dist[v]) and closed[v] != gen:
+                seen[v] = gen
+                dist[v] = nd
+                parent[v] = u
+                heappush(heap, (nd, v))
+                pushes += 1
+    stats = {"pushes": pushes, "pops": pops, "settled": len(order)}
+    return order, [dist[v] for v in order], [parent[v] for v in order], stats
+
+
+def _sources(sources):
+    # int, dãy node hoặc {node: chi phí xuất phát} -> {node: chi phí} (node trùng giữ chi phí nhỏ nhất)
+    if isinstance(sources, dict):
+        items = sources.items()
+    else:
+        items = ((s, 0.0) for s in np.atleast_1d(sources).tolist())
+    out = {}
+    for s, d0 in items:
+        s, d0 = int(s), float(d0)
+        if d0 < out.get(s, np.inf):
+            out[s] = d0
+    if not out:
+        raise ValueError("Cần ít nhất một điểm xuất phát")
+    return out
+
+
+def isochrone(graph, sources, cutoff, weights=None):
+    # weights: None (cutoff theo mét), EdgeWeights hoặc mảng numpy cùng đơn vị với cutoff
+    if cutoff < 0:
+        raise ValueError("cutoff phải >= 0")
+    if weights is not None and not isinstance(weights, EdgeWeights):
+        weights = EdgeWeights(np.asarray(weights))
+    sources = _sources(sources)
+    w = graph.adjacency_lists()[2] if weights is None else weights.forward()
+    with get_workspaces().borrow(graph.n_nodes) as (ws,):
+        order, dist, parent, stats = _bounded(graph, sources, cutoff, w, ws)
+    # Nguồn gần nhất của từng node: cha luôn được chốt trước con
+    index = {s: i for i, s in enumerate(sources)}
+    origin = {}
+    for v, p in zip(order, parent):
+        origin[v] = index[v] if p < 0 else origin[p]
+    return Isochrone(graph, np.fromiter(sources, dtype=np.int64, count=len(sources)), cutoff,
+                     np.array(order, dtype=np.int64), np.array(dist, dtype=np.float64),
+                     np.array(parent, dtype=np.int64),
+                     np.fromiter((origin[v] for v in order), dtype=np.int32, count=len(order)),
+                     None if weights is None else weights.values, stats)
+
+
+class Isochrone:
+    __slots__ = ("graph", "sources", "cutoff", "nodes", "dist", "parent", "origin", "weights", "stats")
+
+    def __init__(self, graph, sources, cutoff, nodes, dist, parent, origin, weights, stats):
+        self.graph = graph
+        self.sources = sources    # các node xuất phát khác nhau, theo thứ tự truyền vào
+        self.cutoff = cutoff
+        self.nodes = nodes        # node đến được, chi phí tăng dần
+        self.dist = dist
+        self.parent = parent      # node cha trên cây đường đi ngắn nhất (-1 với nguồn)
+        self.origin = origin      # vị trí trong sources của nguồn gần nhất
+        self.weights = weights    # mảng trọng số cạnh (None = độ dài)
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _limit(self, cutoff):
+        cutoff = self.cutoff if cutoff is None else min(cutoff, self.cutoff)
+        return cutoff, int(np.searchsorted(self.dist, cutoff, side="right"))
+
+    def within(self, cutoff=None):
+        # (node, chi phí) đến được trong ngưỡng cutoff <= self.cutoff
+        _, k = self._limit(cutoff)
+        return self.nodes[:k], self.dist[:k]
+
+    def dist_array(self):
+        # Chi phí theo chỉ số node của cả đồ thị (inf = không đến được)
+        out = np.full(self.graph.n_nodes, np.inf)
+        out[self.nodes] = self.dist
+        return out
+
+    def edge_reach(self, cutoff=None):
+        # (chỉ số cạnh, tỉ lệ 0..1 đi được, vị trí node nguồn của cạnh trong self.nodes)
+        # cho mọi cạnh rời một node đến được; cạnh đi hết có tỉ lệ 1
+        g = self.graph
+        cutoff, k = self._limit(cutoff)
+        starts = g.offsets[self.nodes[:k]].astype(np.int64)
+        counts = g.offsets[self.nodes[:k] + 1].astype(np.int64) - starts
+        owner = np.repeat(np.arange(k), counts)
+        edges = np.repeat(starts, counts) + np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        w = (g.lengths if self.weights is None else self.weights)[edges]
+        left = cutoff - self.dist[owner]
+        frac = np.divide(left, w, out=np.ones(len(edges)), where=w > 0)
+        return edges, np.clip(frac, 0.0, 1.0), owner
+
+    def coverage(self, cutoffs=None):
+        # Độ phủ theo từng ngưỡng: số node, chiều dài đường (mét, tính cả đoạn đi được một phần)
+        # và số node mỗi nguồn phục vụ
+        g = self.graph
+        total_m = float(g.lengths.sum())
+        rows = []
+        for cutoff in (self.cutoff,) if cutoffs is None else cutoffs:
+            cutoff, k = self._limit(cutoff)
+            edges, frac, _ = self.edge_reach(cutoff)
+            road_m = float((g.lengths[edges] * frac).sum())
+            rows.append({"cutoff": cutoff, "nodes": k, "node_share": round(k / max(g.n_nodes, 1), 4),
+                         "road_m": round(road_m, 1), "road_share": round(road_m / total_m, 4) if total_m else 0.0,
+                         "per_source": np.bincount(self.origin[:k], minlength=len(self.sources)).tolist()})
+        return rows
+
+    # ====== ĐA GIÁC CHO BẢN ĐỒ ======
+    def polygon(self, cutoff=None, shape="buffer", buffer_m=ISOCHRONE_BUFFER_M):
+        # Hình học shapely (kinh độ, vĩ độ) của vùng đến được:
+        #   buffer  - ô lưới cạnh buffer_m chứa đoạn đường đến được cùng 8 ô xung quanh, gộp lại
+        #             (vùng đệm rộng buffer_m..2 * buffer_m theo mạng lưới đường). Hợp các ô lưới không
+        #             chồng nhau (coverage union) nhanh hơn nhiều so với hợp hàng nghìn vùng đệm của
+        #             từng đoạn thẳng chồng lên nhau, nên dùng được cho cả quận / toàn thành phố.
+        #   convex  - bao lồi các điểm đến được của từng nguồn, nới thêm buffer_m (nhanh, thô hơn)
+        # Tính trong mặt phẳng mét quanh tâm vùng (xấp xỉ phẳng đủ chính xác trong một thành phố)
+        import shapely
+
+        if shape not in SHAPES:
+            raise ValueError(f"Không hỗ trợ kiểu đa giác '{shape}'")
+        g = self.graph
+        _, k = self._limit(cutoff)
+        if k == 0:
+            # Không đến được node nào (vd mọi nguồn có chi phí xuất phát vượt cutoff): hình học rỗng
+            return shapely.Polygon()
+        edges, frac, owner = self.edge_reach(cutoff)
+        lon0, lat0 = float(g.x[self.nodes[:k]].mean()), float(g.y[self.nodes[:k]].mean())
+        ky = math.radians(1) * EARTH_RADIUS_M
+        scale = np.array([ky * math.cos(math.radians(lat0)), ky])
+
+        def project(nodes):
+            return (np.column_stack([g.x[nodes], g.y[nodes]]) - [lon0, lat0]) * scale
+        a = project(self.nodes[owner])
+        b = a + (project(g.targets[edges]) - a) * frac[:, None]
+        points = project(self.nodes[:k])
+        if shape == "buffer":
+            cells = _cells(np.concatenate([a, points]), np.concatenate([b, points]), buffer_m)
+            x, y = cells[:, 0] * buffer_m, cells[:, 1] * buffer_m
+            geom = shapely.coverage_union_all(shapely.box(x, y, x + buffer_m, y + buffer_m))
+            geom = shapely.simplify(geom, buffer_m / 2)
+        else:
+            groups = np.concatenate([self.origin[:k], self.origin[owner]])
+            coords = np.concatenate([points, b])
+            geom = shapely.union_all([shapely.buffer(shapely.convex_hull(shapely.multipoints(coords[groups == i])),
+                                                     buffer_m) for i in np.unique(groups).tolist()])
+        return shapely.transform(geom, lambda c: c / scale + [lon0, lat0])
+
+    def geojson(self, cutoff=None, shape="buffer", buffer_m=ISOCHRONE_BUFFER_M):
+        import shapely
+
+        return shapely.geometry.mapping(self.polygon(cutoff, shape, buffer_m))
+
+
+_KEY = 1 << 31
+
+
+def _cells(a, b, cell):
+    # Ô lưới (i, j) cạnh cell mà các đoạn a -> b đi qua (lấy mẫu mỗi nửa ô) cùng 8 ô xung quanh
+    n = np.ceil(np.hypot(*(b - a).T) / (cell / 2)).astype(np.int64) + 1
+    seg = np.repeat(np.arange(len(a)), n)
+    t = (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)) / np.repeat(np.maximum(n - 1, 1), n)
+    ij = np.floor((a[seg] + (b - a)[seg] * t[:, None]) / cell).astype(np.int64) + _KEY // 2
+    keys = np.unique(ij[:, 0] * _KEY + ij[:, 1])
+    ring = np.array([di * _KEY + dj for di in (-1, 0, 1) for dj in (-1, 0, 1)])
+    keys = np.unique((keys[:, None] + ring).ravel())
+    return np.column_stack([keys // _KEY, keys % _KEY]) - _KEY // 2
+
+
+# ====== THEO KHU VỰC ======
+def plan_isochrone(district, sources, cutoff, weight="length"):
+    # weight "length" (cutoff theo mét) hoặc "time" (cutoff theo giây, giao thông hiện tại);
+    # chạy trên đồ thị đầy đủ của khu vực (kể cả toàn thành phố) để có mọi node đến được
+    with instrument.trace("isochrone", district=district.name, cutoff=cutoff, weight=weight) as t:
+        if weight == "length":
+            weights = None
+        elif weight == "time":
+            from .traffic import get_traffic
+
+            state = get_traffic(district).state
+            weights = state.weights
+            t.annotate(traffic_version=state.version)
+        else:
+            raise ValueError(f"Không hỗ trợ trọng số '{weight}'")
+        with instrument.stage("search") as rec:
+            iso = isochrone(district.graph, sources, cutoff, weights)
+            rec.update(iso.stats, sources=len(iso.sources))
+        return iso
@@ -0,0 +1,139 @@
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .cache import read_arrays, write_arrays
+from .config import LANDMARK_COUNT
+from .geo import goal_heuristic
+from .search import astar, dijkstra
+
+
+# ====== ALT: A* + LANDMARK + BẤT ĐẲNG THỨC TAM GIÁC ======
+# Với mỗi landmark L lưu d(L, v) và d(v, L) cho mọi node v. Cận dưới của d(v, t):
+#   max_L max(d(v, L) - d(t, L), d(L, t) - d(L, v))
+# kết hợp với haversine. Vẫn chính xác khi trọng số >= độ dài (phạt, cấm cạnh).
+# Bảng được lưu cạnh file cache đồ thị (<tên>.alt) kèm version của đồ thị.
+# Bảng lưu float32: mỗi khoảng cách và phép trừ lệch tối đa nửa ulp, nên cận được trừ đi
+# slack = 2 eps * khoảng cách lớn nhất để không bao giờ vượt chi phí thật.
+class Landmarks:
+    def __init__(self, nodes, to_lm, from_lm, graph_version=None):
+        self.nodes = nodes          # chỉ số node được chọn làm landmark
+        self.to_lm = to_lm          # n x K, d(v, L)
+        self.from_lm = from_lm      # n x K, d(L, v)
+        self.graph_version = graph_version
+        longest = max(float(t[np.isfinite(t)].max(initial=0.0)) for t in (to_lm, from_lm))
+        self.slack = 2 * float(np.finfo(np.float32).eps) * longest
+
+    @property
+    def nbytes(self):
+        return self.nodes.nbytes + self.to_lm.nbytes + self.from_lm.nbytes
+
+    def lower_bounds(self, graph, node, reverse=False):
+        # Cận dưới (mét) của d(v, node) cho mọi node v, reverse: của d(node, v); tính một lần cho
+        # cả truy vấn rồi tra theo chỉ số
+        to_lm, from_lm = (self.from_lm, self.to_lm) if reverse else (self.to_lm, self.from_lm)
+        with np.errstate(invalid="ignore"):
+            bound = np.fmax(to_lm - to_lm[node], from_lm[node] - from_lm)
+        bound = np.nan_to_num(bound, nan=0.0, posinf=np.inf).max(axis=1).astype(np.float64) - self.slack
+        return np.maximum(bound, goal_heuristic(graph, node)(np.arange(graph.n_nodes)))
+
+    def heuristic(self, graph, target):
+        bound = self.lower_bounds(graph, target)
+
+        def h(nodes):
+            return bound[nodes]
+        return h
+
+
+def select_landmarks(graph, k=LANDMARK_COUNT):
+    # Chọn xa nhất lần lượt: bắt đầu từ node xa tâm nhất, mỗi landmark tiếp theo
+    # là node xa nhất (theo đường đi) so với các landmark đã chọn
+    cx, cy = graph.x.mean(), graph.y.mean()
+    first = int(np.argmax((graph.x - cx) ** 2 + (graph.y - cy) ** 2))
+    nodes = [first]
+    dist, _ = dijkstra(graph, first)
+    from_lm = [dist]
+    nearest = dist.copy()
+    while len(nodes) < min(k, graph.n_nodes):
+        candidates = np.where(np.isfinite(nearest), nearest, -1.0)
+        candidates[nodes] = -1.0
+        nxt = int(np.argmax(candidates))
+        if candidates[nxt] <= 0:
+            break
+        dist, _ = dijkstra(graph, nxt)
+        nodes.append(nxt)
+        from_lm.append(dist)
+        nearest = np.fmin(nearest, dist)
+    return np.array(nodes, dtype=np.int32), from_lm
+
+
+def build_landmarks(graph, k=LANDMARK_COUNT):
+    nodes, from_lm = select_landmarks(graph, k)
+    rev, _ = graph.reversed_graph()
+    to_lm = [dijkstra(rev, int(lm))[0] for lm in nodes]
+    return Landmarks(nodes, np.stack(to_lm, axis=1).astype(np.float32),
+                     np.stack(from_lm, axis=1).astype(np.float32), graph.meta.get("version"))
+
+
+# ====== LƯU / TẢI CẠNH FILE CACHE ======
+def landmarks_path(graph):
+    path = graph.meta.get("path")
+    return Path(path).with_suffix(".alt") if path else None
+
+
+def save_landmarks(landmarks, path):
+    write_arrays(path, {"nodes": landmarks.nodes, "to_lm": landmarks.to_lm, "from_lm": landmarks.from_lm},
+                 {"kind": "alt", "graph_version": landmarks.graph_version})
+
+
+def load_landmarks(graph):
+    # None nếu chưa tiền xử lý hoặc bảng thuộc về phiên bản đồ thị cũ
+    path = landmarks_path(graph)
+    if path is None or not path.exists():
+        return None
+    try:
+        header, arrays = read_arrays(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if header.get("graph_version") != graph.meta.get("version"):
+        return None
+    k = len(arrays["nodes"])
+    return Landmarks(arrays["nodes"], arrays["to_lm"].reshape(-1, k),
+                     arrays["from_lm"].reshape(-1, k), header["graph_version"])
+
+
+def get_landmarks(graph, k=LANDMARK_COUNT):
+    landmarks = load_landmarks(graph)
+    if landmarks is None or len(landmarks.nodes) != k:
+        landmarks = build_landmarks(graph, k)
+        path = landmarks_path(graph)
+        if path is not None:
+            save_landmarks(landmarks, path)
+    return landmarks
+
+
+# ====== BÁO CÁO SỐ NODE ĐÃ CHỐT ======
+def settled_report(graph, landmarks, n_queries=50, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for s, t in rng.integers(0, graph.n_nodes, size=(n_queries, 2)).tolist():
+        row = {"source": s, "target": t}
+        for name, run in (("dijkstra", lambda st: dijkstra(graph, s, t, stats=st)),
+                          ("astar", lambda st: astar(graph, s, t, stats=st)),
+                          ("alt", lambda st: astar(graph, s, t, h=landmarks.heuristic(graph, t), stats=st))):
+            stats = {}
+            started = time.perf_counter()
+            dist, _ = run(stats)
+            row[f"{name}_settled"] = stats.get("settled", 0)
+            row[f"{name}_ms"] = (time.perf_counter() - started) * 1000
+            row[f"{name}_dist"] = float(dist[t])
+        rows.append(row)
+
+    summary = {"queries": len(rows), "landmarks": len(landmarks.nodes)}
+    for name in ("dijkstra", "astar", "alt"):
+        summary[f"{name}_settled_median"] = float(np.median([r[f"{name}_settled"] for r in rows]))
+        summary[f"{name}_ms_median"] = float(np.median([r[f"{name}_ms"] for r in rows]))
+    summary["exact"] = all(np.isclose(r["alt_dist"], r["dijkstra_dist"]) or
+                           (np.isinf(r["alt_dist"]) and np.isinf(r["dijkstra_dist"])) for r in rows)
+    return summary, rows
@@ -0,0 +1,113 @@
+import numpy as np
+
+from . import citywide, instrument
+from .alternatives import find_truly_different_paths, path_overlap
+from .core import route
+from .executor import checkpoint, get_executor
+from .render import simplify_edges
+from .routecache import get_route_cache
+from .traffic import get_traffic
+
+
+# ====== TÌM ĐƯỜNG CHO MỘT CẶP ĐIỂM ======
+# Đường khám phá (greedy / A* / A* hai chiều) + tối đa max_paths đường thay thế,
+# đường khám phá được thêm vào nếu không trùng phần lớn với các đường đã có.
+# Kết quả (kể cả "không có đường") được cache theo khu vực, version đồ thị, điểm đầu/cuối và tham số.
+# weights (core.EdgeWeights, vd thời gian đi theo giao thông) thay độ dài làm chi phí.
+# A* trong một quận chạy trên đồ thị đã rút gọn chuỗi node bậc 2 (nếu có), kết quả theo chỉ số gốc,
+# với cận ALT khi quận đã có bảng landmark.
+def compute_routes(district, start, end, algorithm="greedy", max_paths=3, weights=None):
+    graph = district.graph
+    with instrument.stage("search", algorithm=algorithm) as rec:
+        if district.citywide is not None:
+            # Tìm đường xuyên quận trong hành lang giữa hai điểm
+            result = citywide.route(district.citywide, start, end, algorithm, track_edges=True, weights=weights)
+        elif algorithm == "astar" and district.contracted is not None:
+            result = district.contracted.route(start, end, weights, track_edges=True, landmarks=district.landmarks)
+        else:
+            result = route(graph, start, end, algorithm, weights, track_edges=True, landmarks=district.landmarks)
+        rec.update(result.stats)
+    checkpoint()
+    path = result.path
+    paths = []
+    scanned = None
+    if weights is not None:
+        # Trọng số thay đổi được: ghi lại các cạnh đã xét của mọi lần tìm (greedy không phụ thuộc)
+        scanned = [] if result.scanned is None else [result.scanned]
+    if path:
+        with instrument.stage("alternatives") as rec:
+            if district.citywide is not None:
+                paths = citywide.find_truly_different_paths(district.citywide, start, end, max_paths=max_paths,
+                                                            weights=weights, scanned=scanned)
+            else:
+                paths = find_truly_different_paths(graph, start, end, max_paths=max_paths,
+                                                   landmarks=district.landmarks, weights=weights, scanned=scanned)
+            if path not in paths and not any(path_overlap(graph, path, p) > 0.7 for p in paths):
+                paths.append(path)
+            paths = paths[:max_paths]
+            rec["paths"] = len(paths)
+        checkpoint()
+    with instrument.stage("simplify", edges_in=len(result.edges)) as rec:
+        # Chỉ giữ chỉ số các cạnh còn thấy được ở độ phân giải bản đồ
+        edges = simplify_edges(graph, result.edges)
+        rec["edges_out"] = len(edges)
+    depends = None
+    if scanned is not None:
+        # Cạnh mà kết quả phụ thuộc: vùng đã xét và các đường trả về
+        depends = np.concatenate([np.asarray(e, dtype=np.int64) for e in scanned] +
+                                 [graph.path_edges(p) for p in paths])
+    return {
+        "path": path,
+        "edges": edges,
+        "stats": result.stats,
+        "paths": paths,
+        "distances": [graph.path_length(p) for p in paths],
+        "durations": None if weights is None else [graph.path_length(p, weights.values) for p in paths],
+        "depends": depends,
+    }
+
+
+def _traffic(district, weight):
+    # Trọng số giao thông cho "time" (None với "length")
+    if weight == "length":
+        return None
+    if weight != "time":
+        raise ValueError(f"Không hỗ trợ trọng số '{weight}'")
+    return get_traffic(district)
+
+
+def route_key(district, start, end, algorithm, max_paths, weight):
+    return get_route_cache().make_key(district.name, district.graph.meta.get("version"), start, end,
+                                      {"algorithm": algorithm, "max_paths": max_paths, "weight": weight})
+
+
+def plan_routes(district, start, end, algorithm="greedy", max_paths=3, cache=None, weight="length"):
+    # Trả về (kết quả, lấy từ cache hay không); weight "length" (mét) hoặc "time" (giây, theo giao thông)
+    cache = get_route_cache() if cache is None else cache
+    traffic = _traffic(district, weight)
+    state = None if traffic is None else traffic.state
+    key = route_key(district, start, end, algorithm, max_paths, weight)
+    with instrument.trace("query", district=district.name, start=int(start), end=int(end),
+                          algorithm=algorithm, weight=weight) as t:
+        if state is not None:
+            t.annotate(traffic_version=state.version)
+        result = cache.get(key)
+        t.annotate(cached=result is not None)
+        if result is not None:
+            return result, True
+        result = compute_routes(district, start, end, algorithm, max_paths, None if state is None else state.weights)
+        depends = result.pop("depends")
+        if state is None:
+            cache.put(key, result)
+        else:
+            # Thời gian đi đổi trong lúc tính thì không ghi (lần dọn cache có thể đã chạy trước)
+            traffic.cache_result(state, cache, key, result, depends)
+        return result, False
+
+
+def submit_routes(district, start, end, algorithm="greedy", max_paths=3, weight="length", owner=None, executor=None):
+    # plan_routes trên QueryExecutor dùng chung: trả về Ticket, truy vấn giống hệt đang chạy thì dùng chung.
+    # Có thể báo executor.QueueFull khi quá nhiều truy vấn đang chờ
+    executor = get_executor() if executor is None else executor
+    return executor.submit(plan_routes, district, start, end, algorithm, max_paths, weight=weight,
+                           key=route_key(district, start, end, algorithm, max_paths, weight), owner=owner)
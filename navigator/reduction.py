@@ -0,0 +1,437 @@
+import heapq
+from pathlib import Path
+
+import numpy as np
+
+from .cache import read_arrays, write_arrays
+from .config import CONTRACT_MAX_CORE
+from .core import EdgeWeights, SearchResult, haversine_to_point, route_multi
+from .graph import RoutingGraph
+
+
+# ====== THÀNH PHẦN LIÊN THÔNG ======
+# scc đánh số theo thứ tự Tarjan xuất thành phần (thành phần "hút" ra trước), nên mọi cạnh
+# giữa hai thành phần mạnh đi từ nhãn lớn sang nhãn nhỏ: scc[s] < scc[t] => không có đường s -> t.
+# wcc là thành phần liên thông yếu: khác nhau => không có đường theo cả hai chiều.
+# rank là một thứ tự topo thứ hai của đồ thị thành phần (cạnh đi từ rank nhỏ sang rank lớn), chọn
+# thành phần theo chiều ngược với Tarjan khi có nhiều lựa chọn: hai thành phần không nối với nhau
+# mà Tarjan xếp "đúng chiều" thường bị rank xếp ngược lại, rank[s] > rank[t] => không có đường.
+# Ba điều kiện đủ để loại ngay truy vấn tới "đảo" mà không phải duyệt hết phần tới được.
+# Chỉ là điều kiện đủ: proven_unreachable False KHÔNG có nghĩa là chắc chắn có đường. Hai thứ tự
+# topo không thể hiện hết quan hệ tới được giữa các thành phần, nên vẫn còn cặp lọt qua (trên đồ thị
+# rgg tổng hợp: từ 0 tới khoảng 1/4 số cặp không có đường, tùy seed); khi đó tìm kiếm vẫn trả về
+# không có đường, chỉ chậm hơn.
+class Components:
+    def __init__(self, scc, wcc, rank):
+        self.scc = scc              # int32, nhãn thành phần liên thông mạnh theo thứ tự topo ngược
+        self.wcc = wcc              # int32, nhãn thành phần liên thông yếu
+        self.rank = rank            # int32, thứ tự topo thứ hai theo nhãn scc (mỗi thành phần một số)
+        self._lists = None
+
+    @property
+    def nbytes(self):
+        return self.scc.nbytes + self.wcc.nbytes + self.rank.nbytes
+
+    def proven_unreachable(self, s, t):
+        # True => chắc chắn không có đường s -> t; False => chưa xác định (vẫn phải tìm kiếm)
+        if self._lists is None:
+            self._lists = (self.scc.tolist(), self.wcc.tolist(), self.rank.tolist())
+        scc, wcc, rank = self._lists
+        return wcc[s] != wcc[t] or scc[s] < scc[t] or rank[scc[s]] > rank[scc[t]]
+
+    def largest(self):
+        # Chỉ số (tăng dần) các node thuộc thành phần liên thông mạnh lớn nhất
+        if len(self.scc) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.scc == np.argmax(np.bincount(self.scc)))
+
+
+def strong_components(graph):
+    # Tarjan không đệ quy trên CSR
+    offsets, targets = graph.adjacency_lists()[:2]
+    n = graph.n_nodes
+    index, low = [-1] * n, [0] * n
+    on_stack, comp = [False] * n, [-1] * n
+    stack = []
+    counter = n_comp = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, offsets[root]]]
+        while work:
+            frame = work[-1]
+            v, k = frame
+            if k < offsets[v + 1]:
+                frame[1] = k + 1
+                w = targets[k]
+                if index[w] < 0:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append([w, offsets[w]])
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+            work.pop()
+            if work and low[v] < low[work[-1][0]]:
+                low[work[-1][0]] = low[v]
+            if low[v] == index[v]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp[w] = n_comp
+                    if w == v:
+                        break
+                n_comp += 1
+    return np.array(comp, dtype=np.int32)
+
+
+def weak_components(graph):
+    # BFS trên đồ thị vô hướng (cạnh xuôi + cạnh ngược)
+    offsets, targets = graph.adjacency_lists()[:2]
+    rev_offsets, rev_targets = graph.reversed_graph()[0].adjacency_lists()[:2]
+    n = graph.n_nodes
+    comp = [-1] * n
+    n_comp = 0
+    for root in range(n):
+        if comp[root] >= 0:
+            continue
+        comp[root] = n_comp
+        queue = [root]
+        for u in queue:
+            for adj_offsets, adj in ((offsets, targets), (rev_offsets, rev_targets)):
+                for k in range(adj_offsets[u], adj_offsets[u + 1]):
+                    v = adj[k]
+                    if comp[v] < 0:
+                        comp[v] = n_comp
+                        queue.append(v)
+        n_comp += 1
+    return np.array(comp, dtype=np.int32)
+
+
+def condensation_order(graph, scc):
+    # Kahn trên đồ thị thành phần, luôn lấy thành phần nguồn có nhãn scc nhỏ nhất. Tarjan xuất thành
+    # phần theo DFS từ node 0, nên thứ tự này khác Tarjan ở các thành phần không nối với nhau
+    n_comp = int(scc.max()) + 1 if len(scc) else 0
+    src, dst = scc[graph.edge_sources()], scc[graph.targets]
+    cross = src != dst
+    src, dst = src[cross], dst[cross]
+    order = np.argsort(src, kind="stable")
+    offsets = np.searchsorted(src[order], np.arange(n_comp + 1)).tolist()
+    dst = dst[order].tolist()
+    indegree = np.bincount(dst, minlength=n_comp).tolist()
+    heap = [c for c in range(n_comp) if indegree[c] == 0]
+    rank = [0] * n_comp
+    for r in range(n_comp):
+        c = heapq.heappop(heap)
+        rank[c] = r
+        for d in dst[offsets[c]:offsets[c + 1]]:
+            indegree[d] -= 1
+            if indegree[d] == 0:
+                heapq.heappush(heap, d)
+    return np.array(rank, dtype=np.int32)
+
+
+def find_components(graph):
+    scc = strong_components(graph)
+    return Components(scc, weak_components(graph), condensation_order(graph, scc))
+
+
+def largest_component(graph, components=None):
+    # Đồ thị con trên thành phần liên thông mạnh lớn nhất: mọi cặp node đều có đường đi.
+    # Trả về (đồ thị con, chỉ số node gốc của từng node trong đồ thị con)
+    components = components or graph.components or find_components(graph)
+    nodes = components.largest()
+    return graph.subgraph(nodes), nodes
+
+
+# ====== RÚT GỌN CHUỖI NODE BẬC 2 ======
+# Node chỉ nằm giữa một đoạn đường (một chiều: 1 vào 1 ra; hai chiều: đúng hai láng giềng,
+# đi được cả hai hướng) bị bỏ khỏi đồ thị tìm kiếm. Mỗi chuỗi giữa hai node còn lại thành một
+# cạnh tắt có độ dài bằng tổng chuỗi; chain_edges giữ các cạnh gốc theo thứ tự đi để tính lại
+# trọng số (thời gian theo giao thông) và mở rộng đường đi về đủ node khi hiển thị.
+# Cạnh tắt song song (hai chuỗi nối cùng cặp node) được giữ lại, khi mở rộng chọn chuỗi rẻ nhất.
+class ContractedGraph:
+    def __init__(self, graph, keep, core, chain_offsets, chain_edges):
+        self.graph = graph                  # đồ thị gốc
+        self.keep = keep                    # chỉ số gốc của các node còn lại (tăng dần)
+        self.core = core                    # RoutingGraph trên các node còn lại, mỗi cạnh là một chuỗi
+        self.chain_offsets = chain_offsets  # int64, độ dài core.n_edges + 1
+        self.chain_edges = chain_edges      # int64, cạnh gốc của các chuỗi nối tiếp nhau
+        self._local = None
+        self._slots = None
+        self._weights = None
+
+    @property
+    def nbytes(self):
+        return self.keep.nbytes + self.core.nbytes + self.chain_offsets.nbytes + self.chain_edges.nbytes
+
+    def local(self):
+        # Chỉ số gốc -> chỉ số trong core, -1 nếu node đã bị rút gọn
+        if self._local is None:
+            local = np.full(self.graph.n_nodes, -1, dtype=np.int64)
+            local[self.keep] = np.arange(len(self.keep))
+            self._local = local
+        return self._local
+
+    def slots(self, node):
+        # Các vị trí j trong chain_edges mà node là đích của cạnh j và nằm giữa chuỗi
+        if self._slots is None:
+            inner = np.ones(len(self.chain_edges), dtype=bool)
+            inner[self.chain_offsets[1:] - 1] = False
+            slots = np.flatnonzero(inner)
+            nodes = self.graph.targets[self.chain_edges[slots]]
+            order = np.argsort(nodes, kind="stable")
+            self._slots = (nodes[order], slots[order])
+        nodes, slots = self._slots
+        a, b = np.searchsorted(nodes, node), np.searchsorted(nodes, node, side="right")
+        return slots[a:b].tolist()
+
+    def core_weights(self, weights):
+        # Trọng số theo cạnh gốc -> theo cạnh tắt (tổng chuỗi), dựng lại khi weights đổi
+        if weights is None:
+            return None
+        cached = self._weights
+        if cached is not None and cached[0] is weights:
+            return cached[1]
+        values = np.add.reduceat(weights.values[self.chain_edges], self.chain_offsets[:-1]) \
+            if self.core.n_edges else np.zeros(0)
+        core_weights = EdgeWeights(values, weights.scale)
+        self._weights = (weights, core_weights)
+        return core_weights
+
+    def _chain(self, j):
+        return int(np.searchsorted(self.chain_offsets, j, side="right")) - 1
+
+    def _cheapest(self, a, b, w):
+        # Cạnh tắt a -> b rẻ nhất (targets trong mỗi hàng đã sắp tăng dần)
+        lo, hi = self.core.offsets[a], self.core.offsets[a + 1]
+        row = self.core.targets[lo:hi]
+        k0, k1 = lo + np.searchsorted(row, b), lo + np.searchsorted(row, b, side="right")
+        return int(k0 + np.argmin(w[k0:k1]))
+
+    def expand(self, core_path, weights=None):
+        # Đường đi trên core -> danh sách chỉ số node gốc
+        if not core_path:
+            return []
+        w = self.core.lengths if weights is None else self.core_weights(weights).values
+        path = [int(self.keep[core_path[0]])]
+        for a, b in zip(core_path[:-1], core_path[1:]):
+            k = self._cheapest(a, b, w)
+            path.extend(self.graph.targets[self.chain_edges[self.chain_offsets[k]:self.chain_offsets[k + 1]]].tolist())
+        return path
+
+    def expand_edges(self, core_edges):
+        # Cạnh tắt -> toàn bộ cạnh gốc của chuỗi (vd vùng đã duyệt để vẽ bản đồ)
+        core_edges = np.asarray(core_edges, dtype=np.int64)
+        starts = self.chain_offsets[core_edges]
+        counts = self.chain_offsets[core_edges + 1] - starts
+        row_start = np.cumsum(counts) - counts
+        return self.chain_edges[np.repeat(starts - row_start, counts) + np.arange(int(counts.sum()))]
+
+    # ====== TÌM ĐƯỜNG TRÊN ĐỒ THỊ RÚT GỌN ======
+    def route(self, start, goal, weights=None, track_edges=False, landmarks=None):
+        # A* chính xác giữa hai node gốc bất kỳ, kể cả node nằm giữa chuỗi: điểm đầu đi ra hai
+        # đầu chuỗi chứa nó, điểm cuối được vào từ đầu các chuỗi đi qua nó. Kết quả theo chỉ số gốc.
+        # landmarks (bảng ALT của đồ thị gốc): cận của node core là cận của node gốc tương ứng
+        graph = self.graph
+        if graph.components is not None and graph.components.proven_unreachable(start, goal):
+            return SearchResult([], np.inf, {"pushes": 0, "pops": 0, "settled": 0},
+                                *([], np.zeros(0, dtype=np.int64)) if track_edges else (None, None))
+        w = graph.lengths if weights is None else weights.values
+        local = self.local()
+        sources, goals = {}, {}
+        heads, tails = {}, {}       # nguồn/đích core -> (chuỗi, vị trí) đạt chi phí nhỏ nhất
+        best, direct = np.inf, None
+        if local[start] >= 0:
+            sources[int(local[start])] = 0.0
+        start_slots = self.slots(start)
+        for j in start_slots:
+            k = self._chain(j)
+            cost = float(w[self.chain_edges[j + 1:self.chain_offsets[k + 1]]].sum())
+            b = int(self.core.targets[k])
+            if cost < sources.get(b, np.inf):
+                sources[b] = cost
+                heads[b] = (k, j)
+        if local[goal] >= 0:
+            goals[int(local[goal])] = 0.0
+        for j in self.slots(goal):
+            k = self._chain(j)
+            cost = float(w[self.chain_edges[self.chain_offsets[k]:j + 1]].sum())
+            a = int(self.core.edge_sources()[k])
+            if cost < goals.get(a, np.inf):
+                goals[a] = cost
+                tails[a] = (k, j)
+            # Điểm đầu nằm trước điểm cuối trên cùng một chuỗi: đi thẳng không qua core
+            for js in start_slots:
+                if self.chain_offsets[k] <= js < j:
+                    cost = float(w[self.chain_edges[js + 1:j + 1]].sum())
+                    if cost < best:
+                        best, direct = cost, (js, j)
+        if start == goal:
+            best, direct = 0.0, None
+
+        scale = 1.0 if weights is None else weights.scale
+        if landmarks is None:
+            h = haversine_to_point(self.core, float(graph.y[goal]), float(graph.x[goal]), scale)
+        else:
+            h = (landmarks.lower_bounds(graph, goal)[self.keep] * scale).tolist().__getitem__
+        result = route_multi(self.core, sources, goals, h, self.core_weights(weights), track_edges, best)
+        if result.edges is not None:
+            result.edges = self.expand_edges(result.edges).tolist()
+            # Cạnh tắt đã xét cùng toàn bộ các chuỗi chứa điểm đầu / điểm cuối
+            ends = [self._chain(j) for j in start_slots + self.slots(goal)]
+            result.scanned = self.expand_edges(np.concatenate([result.scanned, np.array(ends, dtype=np.int64)]))
+        if result.path:
+            core_path = result.path
+            path = self.expand(core_path, weights)
+            if core_path[0] in heads:
+                k, j = heads[core_path[0]]
+                path = [start] + graph.targets[self.chain_edges[j + 1:self.chain_offsets[k + 1] - 1]].tolist() + path
+            if core_path[-1] in tails:
+                k, j = tails[core_path[-1]]
+                path += graph.targets[self.chain_edges[self.chain_offsets[k]:j + 1]].tolist()
+            result.path = path
+        elif start == goal:
+            result.path, result.distance = [start], 0.0
+        elif direct is not None:
+            js, j = direct
+            result.path = [start] + graph.targets[self.chain_edges[js + 1:j + 1]].tolist()
+        return result
+
+
+def _pass_through(graph):
+    # Node có thể rút gọn: một chiều (1 vào, 1 ra, khác nhau) hoặc hai chiều (đúng hai láng
+    # giềng, có cạnh vào và ra với cả hai); không có khuyên
+    offsets, targets = graph.adjacency_lists()[:2]
+    rev_offsets, rev_targets = graph.reversed_graph()[0].adjacency_lists()[:2]
+    out_deg = np.diff(graph.offsets)
+    in_deg = np.bincount(graph.targets, minlength=graph.n_nodes)
+    flags = [False] * graph.n_nodes
+    for v in np.flatnonzero(((out_deg == 1) & (in_deg == 1)) | ((out_deg == 2) & (in_deg == 2))).tolist():
+        out = targets[offsets[v]:offsets[v + 1]]
+        into = rev_targets[rev_offsets[v]:rev_offsets[v + 1]]
+        if v in out:
+            continue
+        if len(out) == 1:
+            flags[v] = out[0] != into[0]
+        else:
+            flags[v] = out[0] != out[1] and sorted(into) == out
+    return flags
+
+
+def contract_chains(graph):
+    offsets, targets = graph.adjacency_lists()[:2]
+    contractible = _pass_through(graph)
+    visited = [False] * graph.n_nodes
+    src, dst, chains = [], [], []
+
+    def walk(u):
+        for k in range(offsets[u], offsets[u + 1]):
+            edges = [k]
+            prev, x = u, targets[k]
+            while contractible[x] and x != u:
+                visited[x] = True
+                a, b = offsets[x], offsets[x + 1]
+                nxt = a if b - a == 1 or targets[a] != prev else a + 1
+                edges.append(nxt)
+                prev, x = x, targets[nxt]
+            src.append(u)
+            dst.append(x)
+            chains.append(edges)
+
+    kept = [v for v in range(graph.n_nodes) if not contractible[v]]
+    for u in kept:
+        walk(u)
+    # Vòng khép kín toàn node bậc 2 (không chạm node nào còn lại): giữ một node của mỗi vòng
+    for v in range(graph.n_nodes):
+        if contractible[v] and not visited[v]:
+            contractible[v] = False
+            visited[v] = True
+            kept.append(v)
+            walk(v)
+
+    keep = np.array(sorted(kept), dtype=np.int64)
+    local = np.full(graph.n_nodes, -1, dtype=np.int64)
+    local[keep] = np.arange(len(keep))
+    src = local[np.array(src, dtype=np.int64)]
+    dst = local[np.array(dst, dtype=np.int64)]
+    counts = np.array([len(c) for c in chains], dtype=np.int64)
+    flat = np.fromiter((k for c in chains for k in c), dtype=np.int64, count=int(counts.sum()))
+    chain_offsets = np.zeros(len(chains) + 1, dtype=np.int64)
+    np.cumsum(counts, out=chain_offsets[1:])
+    lengths = np.add.reduceat(graph.lengths[flat], chain_offsets[:-1]) if len(chains) else np.zeros(0)
+
+    # Sắp cạnh tắt theo (nguồn, đích, độ dài) như CSR của RoutingGraph, giữ cả cạnh song song
+    order = np.lexsort((lengths, dst, src))
+    counts = counts[order]
+    starts = chain_offsets[:-1][order]
+    chain_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(counts, out=chain_offsets[1:])
+    flat = flat[np.repeat(starts - chain_offsets[:-1], counts) + np.arange(int(counts.sum()))]
+    core_offsets = np.zeros(len(keep) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=len(keep)), out=core_offsets[1:])
+    core = RoutingGraph(graph.node_ids[keep], graph.x[keep], graph.y[keep], core_offsets,
+                        dst[order].astype(np.int32), lengths[order], {"parent_version": graph.meta.get("version")})
+    return ContractedGraph(graph, keep, core, chain_offsets, flat)
+
+
+# ====== LƯU / TẢI CẠNH FILE CACHE ======
+# Nhãn thành phần và đồ thị rút gọn được lưu chung (<tên>.red) kèm version của đồ thị
+def reduction_path(graph):
+    path = graph.meta.get("path")
+    return Path(path).with_suffix(".red") if path else None
+
+
+def save_reduction(graph, components, contracted, path):
+    arrays = {"scc": components.scc, "wcc": components.wcc, "rank": components.rank}
+    if contracted is not None:
+        arrays.update({"keep": contracted.keep, "core_offsets": contracted.core.offsets,
+                       "core_targets": contracted.core.targets, "core_lengths": contracted.core.lengths,
+                       "chain_offsets": contracted.chain_offsets, "chain_edges": contracted.chain_edges})
+    write_arrays(path, arrays, {"kind": "reduction", "graph_version": graph.meta.get("version")})
+
+
+def load_reduction(graph):
+    # (Components, ContractedGraph hoặc None), None nếu chưa tiền xử lý hoặc thuộc đồ thị cũ
+    path = reduction_path(graph)
+    if path is None or not path.exists():
+        return None
+    try:
+        header, arrays = read_arrays(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    # File cũ chưa có rank thì tính lại như file của đồ thị cũ
+    if header.get("graph_version") != graph.meta.get("version") or "rank" not in arrays:
+        return None
+    components = Components(arrays["scc"], arrays["wcc"], arrays["rank"])
+    contracted = None
+    if "keep" in arrays:
+        keep = arrays["keep"]
+        core = RoutingGraph(graph.node_ids[keep], graph.x[keep], graph.y[keep], arrays["core_offsets"],
+                            arrays["core_targets"], arrays["core_lengths"],
+                            {"parent_version": graph.meta.get("version")})
+        contracted = ContractedGraph(graph, keep, core, arrays["chain_offsets"], arrays["chain_edges"])
+    return components, contracted
+
+
+def get_reduction(graph, contract=True):
+    # Đọc từ file nếu còn mới, nếu không thì tính và lưu lại; gắn nhãn thành phần vào graph
+    # để core.route loại ngay truy vấn không có đường
+    reduction = load_reduction(graph)
+    if reduction is None or (contract and reduction[1] is None):
+        reduction = (find_components(graph), contract_chains(graph) if contract else None)
+        path = reduction_path(graph)
+        if path is not None:
+            save_reduction(graph, *reduction, path)
+    components, contracted = reduction
+    graph.components = components
+    if not contract or (contracted is not None and contracted.core.n_nodes >= CONTRACT_MAX_CORE * graph.n_nodes):
+        # Rút được quá ít node: A* trên đồ thị rút gọn chậm hơn trên đồ thị gốc
+        contracted = None
+    return components, contracted
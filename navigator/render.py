@@ -0,0 +1,184 @@
+import threading
+from collections import OrderedDict, defaultdict
+
+import folium
+import numpy as np
+from branca.element import MacroElement
+from folium.plugins import FastMarkerCluster
+from folium.template import Template
+
+from .config import OVERLAY_MAX_EDGES, OVERLAY_PIXELS
+
+
+# ====== BẢN ĐỒ NỀN CỦA KHU VỰC ======
+# Toàn bộ mạng lưới là một MultiLineString GeoJSON (cạnh hai chiều vẽ một lần),
+# node là một lớp cụm dựng trong trình duyệt từ mảng [vĩ độ, kinh độ, chỉ số],
+# thay cho một CircleMarker kèm tooltip cho mỗi node.
+# Đồ thị quá lớn được thưa bớt đều theo chỉ số.
+BASE_MAX_NODES = 20_000
+BASE_MAX_EDGES = 60_000
+COORD_DECIMALS = 5          # ~1 m, đủ cho hiển thị
+HTML_CACHE_SIZE = 8
+
+# Nhãn N001... tính ngay trong trình duyệt để không phải gửi kèm chuỗi cho từng node
+_NODE_CALLBACK = """
+function (row) {
+    var label = "N" + String(row[2] + 1).padStart(3, "0");
+    return L.circleMarker(new L.LatLng(row[0], row[1]),
+                          {radius: 2, color: "gray", fill: true, fillOpacity: 0.6}).bindTooltip(label);
+}
+"""
+
+
+def _thin(count, limit):
+    # Chỉ số giữ lại: tất cả nếu không vượt giới hạn, nếu không lấy đều theo bước
+    if count <= limit:
+        return np.arange(count)
+    return np.linspace(0, count - 1, limit).astype(np.int64)
+
+
+def network_geojson(graph, max_edges=BASE_MAX_EDGES):
+    src = graph.edge_sources().astype(np.int64)
+    dst = graph.targets.astype(np.int64)
+    a, b = np.minimum(src, dst), np.maximum(src, dst)
+    pairs = np.unique(a * graph.n_nodes + b)
+    pairs = pairs[_thin(len(pairs), max_edges)]
+    a, b = pairs // graph.n_nodes, pairs % graph.n_nodes
+    lines = np.stack([graph.x[a], graph.y[a], graph.x[b], graph.y[b]], axis=1)
+    return {"type": "Feature", "properties": {},
+            "geometry": {"type": "MultiLineString",
+                         "coordinates": lines.round(COORD_DECIMALS).reshape(-1, 2, 2).tolist()}}
+
+
+def node_rows(graph, max_nodes=BASE_MAX_NODES):
+    keep = _thin(graph.n_nodes, max_nodes)
+    coords = np.stack([graph.y[keep], graph.x[keep]], axis=1).round(COORD_DECIMALS).tolist()
+    return [[lat, lon, i] for (lat, lon), i in zip(coords, keep.tolist())]
+
+
+def build_base_map(graph, center, zoom_start=13):
+    m = folium.Map(location=list(center), zoom_start=zoom_start)
+    folium.GeoJson(network_geojson(graph), name="Mạng lưới",
+                   style_function=lambda _: {"color": "#888888", "weight": 1, "opacity": 0.5}).add_to(m)
+    FastMarkerCluster(node_rows(graph), callback=_NODE_CALLBACK, name="Node",
+                      options={"disableClusteringAtZoom": 16, "chunkedLoading": True}).add_to(m)
+    return m
+
+
+# ====== CACHE HTML THEO KHU VỰC + PHIÊN BẢN ĐỒ THỊ ======
+_html_cache = OrderedDict()
+_html_lock = threading.Lock()
+
+
+def base_map_html(district):
+    key = (district.name, district.graph.meta.get("version"))
+    with _html_lock:
+        html = _html_cache.get(key)
+        if html is not None:
+            _html_cache.move_to_end(key)
+            return html
+    html = build_base_map(district.graph, district.center)._repr_html_()
+    with _html_lock:
+        _html_cache[key] = html
+        while len(_html_cache) > HTML_CACHE_SIZE:
+            _html_cache.popitem(last=False)
+    return html
+
+
+# ====== LỚP VÙNG ĐÃ DUYỆT ======
+# Số cạnh được vẽ tỉ lệ với số điểm ảnh chứ không với số node đã duyệt:
+# cạnh được lượng tử hóa theo lưới điểm ảnh trên khung bao, cạnh ngắn hơn một điểm ảnh
+# hoặc trùng nhau (kể cả ngược chiều) chỉ giữ một, rồi thưa đều nếu vẫn vượt max_edges.
+def simplify_edges(graph, edges, max_edges=OVERLAY_MAX_EDGES, pixels=OVERLAY_PIXELS):
+    edges = np.unique(np.asarray(edges, dtype=np.int64))
+    if len(edges) == 0:
+        return edges.astype(np.int32)
+    src, dst = graph.edge_sources()[edges], graph.targets[edges]
+    ends = np.concatenate([src, dst])
+    lat0, lon0 = graph.y[ends].min(), graph.x[ends].min()
+    cell = max(np.ptp(graph.y[ends]), np.ptp(graph.x[ends]), 1e-9) / pixels
+
+    def pixel(nodes):
+        row = ((graph.y[nodes] - lat0) / cell).astype(np.int64)
+        col = ((graph.x[nodes] - lon0) / cell).astype(np.int64)
+        return row * (pixels + 1) + col
+
+    a, b = pixel(src), pixel(dst)
+    key = np.minimum(a, b) * (pixels + 1) ** 2 + np.maximum(a, b)
+    _, first = np.unique(key, return_index=True)
+    first = first[a[first] != b[first]]
+    keep = edges[np.sort(first)]
+    return keep[_thin(len(keep), max_edges)].astype(np.int32)
+
+
+def _chains(src, dst):
+    # Nối các cạnh liên tiếp (đích cạnh trước là gốc cạnh sau) thành polyline dài hơn
+    out = defaultdict(list)
+    for k, u in enumerate(src):
+        out[u].append(k)
+    used = [False] * len(src)
+    heads = set(dst)
+    order = [k for k, u in enumerate(src) if u not in heads] + list(range(len(src)))
+    lines = []
+    for k in order:
+        if used[k]:
+            continue
+        line = [src[k]]
+        while k is not None:
+            used[k] = True
+            line.append(dst[k])
+            nxt = out[dst[k]]
+            while nxt and used[nxt[-1]]:
+                nxt.pop()
+            k = nxt.pop() if nxt else None
+        lines.append(line)
+    return lines
+
+
+def encode_lines(graph, lines, decimals=COORD_DECIMALS):
+    # Tọa độ nguyên (độ x 10^decimals), mỗi polyline lưu chênh lệch so với điểm trước,
+    # điểm đầu tính từ origin: [dlat0, dlon0, dlat1, dlon1, ...]
+    scale = 10 ** decimals
+    lat = np.round(graph.y * scale).astype(np.int64)
+    lon = np.round(graph.x * scale).astype(np.int64)
+    origin = [int(lat.min()), int(lon.min())]
+    encoded = []
+    for line in lines:
+        pts = np.stack([lat[line] - origin[0], lon[line] - origin[1]], axis=1)
+        pts[1:] -= pts[:-1].copy()
+        encoded.append(pts.ravel().tolist())
+    return {"scale": scale, "origin": origin, "lines": encoded}
+
+
+class EncodedPolylines(MacroElement):
+    # Một L.polyline nhiều đoạn được giải mã trong trình duyệt
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function () {
+                var data = {{ this.data|tojson }};
+                var lines = [];
+                for (var i = 0; i < data.lines.length; i++) {
+                    var flat = data.lines[i], lat = data.origin[0], lon = data.origin[1], pts = [];
+                    for (var j = 0; j < flat.length; j += 2) {
+                        lat += flat[j];
+                        lon += flat[j + 1];
+                        pts.push([lat / data.scale, lon / data.scale]);
+                    }
+                    lines.push(pts);
+                }
+                return L.polyline(lines, {{ this.options|tojson }}).addTo({{ this._parent.get_name() }});
+            })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, data, **options):
+        super().__init__()
+        self._name = "EncodedPolylines"
+        self.data = data
+        self.options = options
+
+
+def exploration_layer(graph, edge_ids, color="orange", weight=2, opacity=0.4):
+    edge_ids = np.asarray(edge_ids, dtype=np.int64)
+    lines = _chains(graph.edge_sources()[edge_ids].tolist(), graph.targets[edge_ids].tolist())
+    return EncodedPolylines(encode_lines(graph, lines), color=color, weight=weight, opacity=opacity)
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .config import ROUTE_CACHE_SIZE, ROUTE_CACHE_TTL_S
+
+
+# ====== CACHE KẾT QUẢ TÌM ĐƯỜNG ======
+# Khóa: (khu vực, version đồ thị, start, end, tham số thuật toán). Version đổi mỗi khi
+# cache đồ thị được build lại nên kết quả cũ không bao giờ khớp; drop_stale dọn chúng ngay
+# khi phiên bản mới được tải. Vượt max_entries thì loại theo LRU, quá ttl giây thì hết hạn.
+# Kết quả phụ thuộc trọng số thay đổi được (giao thông) lưu kèm mảng chỉ số cạnh đã sắp mà
+# kết quả phụ thuộc (cạnh đã xét của mọi lần tìm, xem core.out_edges); drop_edges chỉ bỏ những
+# kết quả chạm vào các cạnh vừa đổi trọng số.
+# Kết quả được dùng chung giữa các phiên, người gọi không được sửa.
+class RouteCache:
+    def __init__(self, max_entries=None, ttl=None, clock=time.monotonic):
+        self.max_entries = ROUTE_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = ROUTE_CACHE_TTL_S if ttl is None else ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.dropped = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(district, version, start, end, params):
+        return (district, version, int(start), int(end), tuple(sorted(params.items())))
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and self.ttl > 0 and self.clock() > item[0]:
+                del self._entries[key]
+                self.expired += 1
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, value, edges=None):
+        if edges is not None:
+            edges = np.unique(np.asarray(edges, dtype=np.int64))
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value, edges)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def drop_edges(self, district, edge_ids):
+        # Bỏ các kết quả của khu vực có phụ thuộc vào ít nhất một cạnh trong edge_ids
+        edge_ids = np.unique(np.asarray(edge_ids, dtype=np.int64))
+        if len(edge_ids) == 0:
+            return 0
+        with self._lock:
+            stale = [key for key, (_, _, edges) in self._entries.items()
+                     if key[0] == district and edges is not None and len(edges)
+                     and np.isin(edges, edge_ids, assume_unique=True).any()]
+            for key in stale:
+                del self._entries[key]
+            self.dropped += len(stale)
+        return len(stale)
+
+    def drop_stale(self, district, version):
+        # Bỏ mọi kết quả của khu vực được tính trên phiên bản đồ thị khác
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == district and k[1] != version]:
+                del self._entries[key]
+
+    def invalidate(self, district=None):
+        with self._lock:
+            if district is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == district]:
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "dropped": self.dropped,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+
+_route_cache = None
+_route_cache_lock = threading.Lock()
+
+
+def get_route_cache():
+    global _route_cache
+    with _route_cache_lock:
+        if _route_cache is None:
+            _route_cache = RouteCache()
+        return _route_cache
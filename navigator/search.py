@@ -0,0 +1,131 @@
+from heapq import heappush, heappop
+
+import numpy as np
+
+from .core import route
+from .geo import goal_heuristic, haversine
+
+
+# ====== CÁC HÀM THUẬT TOÁN ======
+def heuristic(graph, n1, n2):
+    # Khoảng cách đường tròn lớn (mét) giữa hai node
+    return float(haversine(graph.y[n1], graph.x[n1], graph.y[n2], graph.x[n2]))
+
+
+def reconstruct_path(parent, start, goal):
+    path = [goal]
+    while path[-1] != start:
+        prev = parent[path[-1]]
+        if prev < 0:
+            return []
+        path.append(int(prev))
+    path.reverse()
+    return path
+
+
+def greedy_best_first(graph, start, goal):
+    # Trả về (path, visited_edges) với visited_edges là các cặp (u, v) đã duyệt
+    result = route(graph, start, goal, "greedy", track_edges=True)
+    edges = np.asarray(result.edges, dtype=np.int64)
+    return result.path, list(zip(graph.edge_sources()[edges].tolist(), graph.targets[edges].tolist()))
+
+
+def dijkstra(graph, source, target=-1, weights=None, banned=None, cutoff=np.inf, stats=None, settled=None):
+    # Trả về (dist, parent); target là một node hoặc mảng node (một nguồn - nhiều đích),
+    # dừng sớm khi đã chốt hết các đích hoặc khoảng cách vượt cutoff.
+    # settled (list, tùy chọn) nhận các node đã chốt, vd để biết kết quả phụ thuộc cạnh nào
+    targets, offsets = graph.targets, graph.offsets
+    w = graph.lengths if weights is None else weights
+    dist = np.full(graph.n_nodes, np.inf)
+    parent = np.full(graph.n_nodes, -1, dtype=np.int32)
+    done = np.zeros(graph.n_nodes, dtype=bool) if banned is None else banned.copy()
+    goals = np.zeros(graph.n_nodes, dtype=bool)
+    target = np.atleast_1d(target)
+    goals[target[target >= 0]] = True
+    remaining = int(goals.sum())
+    n_settled = 0
+    if done[source]:
+        return dist, parent
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heappop(heap)
+        if done[u]:
+            continue
+        if d > cutoff:
+            break
+        done[u] = True
+        n_settled += 1
+        if settled is not None:
+            settled.append(u)
+        if goals[u]:
+            remaining -= 1
+            if remaining == 0:
+                break
+        a, b = offsets[u], offsets[u + 1]
+        if a == b:
+            continue
+        nbrs = targets[a:b]
+        nd = d + w[a:b]
+        better = (nd < dist[nbrs]) & ~done[nbrs]
+        if better.any():
+            nbrs, nd = nbrs[better], nd[better]
+            dist[nbrs] = nd
+            parent[nbrs] = u
+            for v, dv in zip(nbrs.tolist(), nd.tolist()):
+                heappush(heap, (dv, v))
+    if stats is not None:
+        stats["settled"] = n_settled
+    return dist, parent
+
+
+def astar(graph, source, target, weights=None, banned=None, h=None, stats=None, settled=None):
+    # A* với heuristic h(nodes) tính theo lô (mặc định haversine, có thể là ALT);
+    # chỉ chính xác khi trọng số >= độ dài cạnh (mét). settled như dijkstra
+    targets, offsets = graph.targets, graph.offsets
+    w = graph.lengths if weights is None else weights
+    h = goal_heuristic(graph, target) if h is None else h
+    dist = np.full(graph.n_nodes, np.inf)
+    parent = np.full(graph.n_nodes, -1, dtype=np.int32)
+    done = np.zeros(graph.n_nodes, dtype=bool) if banned is None else banned.copy()
+    n_settled = 0
+    if done[source]:
+        return dist, parent
+    dist[source] = 0.0
+    heap = [(float(h(np.array([source]))[0]), 0.0, source)]
+    while heap:
+        _, d, u = heappop(heap)
+        if done[u]:
+            continue
+        done[u] = True
+        n_settled += 1
+        if settled is not None:
+            settled.append(u)
+        if u == target:
+            break
+        a, b = offsets[u], offsets[u + 1]
+        if a == b:
+            continue
+        nbrs = targets[a:b]
+        nd = d + w[a:b]
+        better = (nd < dist[nbrs]) & ~done[nbrs]
+        if better.any():
+            nbrs, nd = nbrs[better], nd[better]
+            dist[nbrs] = nd
+            parent[nbrs] = u
+            for v, dv, fv in zip(nbrs.tolist(), nd.tolist(), (nd + h(nbrs)).tolist()):
+                heappush(heap, (fv, dv, v))
+    if stats is not None:
+        stats["settled"] = n_settled
+    return dist, parent
+
+
+def shortest_path(graph, source, target, weights=None, banned=None):
+    # Trọng số mặc định là độ dài (mét) nên dùng được A*; trọng số khác dùng Dijkstra
+    if weights is None and banned is None:
+        return route(graph, source, target, "astar").path
+    search = astar if weights is None else dijkstra
+    dist, parent = search(graph, source, target, weights=weights, banned=banned)
+    if not np.isfinite(dist[target]):
+        return []
+    return reconstruct_path(parent, source, target)
@@ -0,0 +1,379 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+
+from . import citywide
+from .config import (CITYWIDE, DISTRICTS, ISOCHRONE_BUFFER_M, SERVICE_BATCH_MS, SERVICE_HOST, SERVICE_MAX_BODY, SERVICE_PORT,
+                     SERVICE_TIMEOUT_S, SERVICE_WORKERS)
+from .core import route
+from .engine import one_to_many
+from .isochrone import SHAPES, plan_isochrone
+from .planner import plan_routes
+from .store import get_store
+from .traffic import get_traffic
+
+
+# ====== DỊCH VỤ ĐỊNH TUYẾN HTTP/JSON ======
+# Chỉ dùng thư viện chuẩn: asyncio nhận yêu cầu, tìm kiếm chạy trong pool process (mỗi process
+# mmap cache đồ thị và giữ GraphStore / RouteCache riêng) nên vòng lặp sự kiện không bị chặn.
+#   POST /route         {"district", "origin", "destination", "weight"?}
+#   POST /alternatives  {"district", "origin", "destination", "algorithm"?, "max_paths"?, "weight"?}
+#   POST /matrix        {"district", "origins": [...], "destinations": [...], "weight"?}
+#   POST /isochrone     {"district", "sources": [...], "cutoff", "weight"?, "shape"?, "buffer_m"?}
+#   GET  /health, GET /stats
+# Điểm là mã node ("N001"), id OSM (số) hoặc [vĩ độ, kinh độ] gắn vào node gần nhất.
+# Yêu cầu giống hệt nhau đang chạy dùng chung một kết quả; các /route cùng khu vực, trọng số và
+# điểm xuất phát đến trong cửa sổ SERVICE_BATCH_MS được gộp thành một lần tìm một-nhiều.
+MAX_MATRIX_CELLS = 250_000
+MAX_PATHS = 5
+MAX_ISOCHRONE_SOURCES = 10_000
+
+
+# ====== PHẦN CHẠY TRONG WORKER ======
+def _init_worker(preload):
+    for name in preload:
+        get_store().get(name)
+
+
+def _weights(district, weight):
+    if weight == "length":
+        return None
+    if weight == "time":
+        return get_traffic(district).state.weights
+    raise ValueError(f"Không hỗ trợ trọng số '{weight}'")
+
+
+def _route_json(graph, path, cost, weight):
+    if not path:
+        return {"found": False}
+    out = {"found": True, "nodes": graph.node_ids[path].tolist(), "distance_m": round(graph.path_length(path), 2)}
+    if weight == "time":
+        out["duration_s"] = round(float(cost), 1)
+    return out
+
+
+def solve_routes(name, weight, origin, destinations):
+    # Một đích: A* (cận ALT nếu quận có bảng landmark, hành lang với khu vực toàn thành phố);
+    # nhiều đích: một cây một-nhiều
+    district = get_store().get(name)
+    graph = district.graph
+    weights = _weights(district, weight)
+    if len(destinations) == 1:
+        if district.citywide is not None:
+            result = citywide.route(district.citywide, origin, destinations[0], "astar", weights=weights)
+        elif district.contracted is not None:
+            result = district.contracted.route(origin, destinations[0], weights, landmarks=district.landmarks)
+        else:
+            result = route(graph, origin, destinations[0], "astar", weights, landmarks=district.landmarks)
+        return [_route_json(graph, result.path, result.distance, weight)]
+    dists, paths = one_to_many(graph, origin, destinations, with_paths=True,
+                               weights=None if weights is None else weights.values)
+    return [_route_json(graph, path, cost, weight) for path, cost in zip(paths, dists.tolist())]
+
+
+def solve_alternatives(name, origin, destination, algorithm, max_paths, weight):
+    district = get_store().get(name)
+    graph = district.graph
+    result, cached = plan_routes(district, origin, destination, algorithm, max_paths, weight=weight)
+    durations = result["durations"] or [None] * len(result["paths"])
+    routes = [_route_json(graph, path, duration, weight) for path, duration in zip(result["paths"], durations)]
+    return {"cached": cached, "stats": result["stats"],
+            "explored": {"nodes": graph.node_ids[result["path"]].tolist(), "found": bool(result["path"])},
+            "routes": routes}
+
+
+def solve_matrix(name, weight, origins, destinations):
+    district = get_store().get(name)
+    weights = _weights(district, weight)
+    w = None if weights is None else weights.values
+    rows = []
+    for origin in origins:
+        dists, _ = one_to_many(district.graph, origin, destinations, weights=w)
+        rows.append([round(d, 2) if np.isfinite(d) else None for d in dists.tolist()])
+    return rows
+
+
+def solve_isochrone(name, sources, cutoff, weight, shape, buffer_m):
+    # Mọi node đến được (id OSM, chi phí, vị trí nguồn gần nhất trong "sources") và đa giác GeoJSON
+    district = get_store().get(name)
+    graph = district.graph
+    iso = plan_isochrone(district, sources, cutoff, weight)
+    return {"reached": len(iso), "stats": iso.stats, "sources": graph.node_ids[iso.sources].tolist(),
+            "nodes": graph.node_ids[iso.nodes].tolist(),
+            "distances" if weight == "length" else "durations": iso.dist.round(2).tolist(),
+            "source": iso.origin.tolist(), "coverage": iso.coverage()[0],
+            "polygon": iso.geojson(shape=shape, buffer_m=buffer_m)}
+
+
+# ====== ĐỌC THAM SỐ ======
+def resolve_point(district, value):
+    graph = district.graph
+    if isinstance(value, dict):
+        value = [value["lat"], value["lon"]]
+    if isinstance(value, (list, tuple)):
+        lat, lon = (float(v) for v in value)
+        node, _ = graph.spatial_index().nearest(lat, lon)
+        return int(node)
+    if isinstance(value, str) and value in district.reverse_mapping:
+        return district.reverse_mapping[value]
+    try:
+        return graph.index_of(int(value))
+    except (KeyError, ValueError):
+        raise ValueError(f"Không có node {value!r} trong {district.name}") from None
+
+
+class RoutingService:
+    def __init__(self, workers=None, batch_ms=None, timeout=None, preload=()):
+        workers = SERVICE_WORKERS if workers is None else workers
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_s = (SERVICE_BATCH_MS if batch_ms is None else batch_ms) / 1000
+        self.timeout = SERVICE_TIMEOUT_S if timeout is None else timeout
+        self.preload = tuple(preload)
+        self.executor = None
+        self.counters = {"requests": 0, "errors": 0, "timeouts": 0, "coalesced": 0, "batches": 0, "batched": 0}
+        self._inflight = {}
+        self._batches = {}
+        self._routes = {
+            ("POST", "/route"): self.route,
+            ("POST", "/alternatives"): self.alternatives,
+            ("POST", "/matrix"): self.matrix,
+            ("POST", "/isochrone"): self.isochrone,
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+        }
+
+    def start_workers(self):
+        # workers == 1: một luồng trong process chính (tiện khi thử nghiệm); còn lại là process
+        # khởi tạo bằng spawn để không kế thừa khóa đang bị giữ của các luồng trong process chính
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=_init_worker, initargs=(self.preload,))
+        else:
+            self.executor = ThreadPoolExecutor(1, initializer=_init_worker, initargs=(self.preload,))
+        return [self.executor.submit(int, 0) for _ in range(self.workers)]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # ====== GỘP YÊU CẦU ======
+    def _coalesce(self, key, factory):
+        # Yêu cầu trùng khóa với một yêu cầu đang chạy chờ chung kết quả
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.counters["coalesced"] += 1
+            return fut
+        fut = asyncio.ensure_future(factory())
+        self._inflight[key] = fut
+        fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return fut
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _district(self, body):
+        name = body.get("district")
+        if name not in DISTRICTS and name != CITYWIDE:
+            raise ValueError(f"Không có khu vực {name!r}")
+        store = get_store()
+        # Tải lần đầu đọc file cache -> chạy ngoài vòng lặp sự kiện
+        return await asyncio.get_running_loop().run_in_executor(None, store.get, name)
+
+    def _batched_route(self, key, destination):
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = {}
+            loop.call_later(self.batch_s, self._flush, key)
+        fut = batch.get(destination)
+        if fut is None:
+            fut = batch[destination] = loop.create_future()
+        return fut
+
+    def _flush(self, key):
+        batch = self._batches.pop(key)
+        destinations = list(batch)
+        self.counters["batches"] += 1
+        self.counters["batched"] += len(destinations)
+        try:
+            done = asyncio.wrap_future(self.executor.submit(solve_routes, *key, destinations))
+        except Exception as exc:
+            # Không gửi được vào pool (vd pool đã hỏng / đã đóng): báo lỗi cho mọi yêu cầu trong lô
+            for fut in batch.values():
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        def deliver(f):
+            for i, fut in enumerate(batch.values()):
+                if fut.done():
+                    continue
+                if f.cancelled():
+                    fut.cancel()
+                elif f.exception() is not None:
+                    fut.set_exception(f.exception())
+                else:
+                    fut.set_result(f.result()[i])
+        done.add_done_callback(deliver)
+
+    # ====== CÁC ENDPOINT ======
+    async def route(self, body):
+        district = await self._district(body)
+        origin = resolve_point(district, body["origin"])
+        destination = resolve_point(district, body["destination"])
+        weight = body.get("weight", "length")
+        if weight not in ("length", "time"):
+            raise ValueError(f"Không hỗ trợ trọng số '{weight}'")
+        key = (district.name, weight, origin)
+        if district.citywide is not None:
+            # Toàn thành phố: mỗi cặp một A* trong hành lang riêng, không gộp thành cây một-nhiều
+            fut = self._coalesce(("route", *key, destination), lambda: self._single_route(key, destination))
+        else:
+            fut = self._coalesce(("route", *key, destination), lambda: self._batched_route(key, destination))
+        return await asyncio.shield(fut)
+
+    async def _single_route(self, key, destination):
+        return (await self._call(solve_routes, *key, [destination]))[0]
+
+    async def alternatives(self, body):
+        district = await self._district(body)
+        origin = resolve_point(district, body["origin"])
+        destination = resolve_point(district, body["destination"])
+        algorithm = body.get("algorithm", "astar")
+        max_paths = min(int(body.get("max_paths", 3)), MAX_PATHS)
+        if max_paths < 1:
+            raise ValueError(f"max_paths phải trong khoảng 1..{MAX_PATHS}")
+        weight = body.get("weight", "length")
+        args = (district.name, origin, destination, algorithm, max_paths, weight)
+        fut = self._coalesce(("alternatives", *args), lambda: self._call(solve_alternatives, *args))
+        return await asyncio.shield(fut)
+
+    async def matrix(self, body):
+        district = await self._district(body)
+        origins = [resolve_point(district, p) for p in body["origins"]]
+        destinations = [resolve_point(district, p) for p in body["destinations"]]
+        if not origins or not destinations:
+            raise ValueError("Cần ít nhất một điểm xuất phát và một điểm đích")
+        if len(origins) * len(destinations) > MAX_MATRIX_CELLS:
+            raise ValueError(f"Ma trận vượt quá {MAX_MATRIX_CELLS} ô")
+        weight = body.get("weight", "length")
+        # Chia các điểm xuất phát thành từng phần cho các worker
+        chunks = [c.tolist() for c in np.array_split(np.array(origins, dtype=np.int64),
+                                                     min(self.workers, len(origins))) if len(c)]
+        parts = await asyncio.gather(*(self._call(solve_matrix, district.name, weight, chunk, destinations)
+                                       for chunk in chunks))
+        return {"distances" if weight == "length" else "durations": [row for part in parts for row in part]}
+
+    async def isochrone(self, body):
+        district = await self._district(body)
+        sources = tuple(resolve_point(district, p) for p in body["sources"])
+        if not sources or len(sources) > MAX_ISOCHRONE_SOURCES:
+            raise ValueError(f"Cần 1..{MAX_ISOCHRONE_SOURCES} điểm xuất phát")
+        cutoff = float(body["cutoff"])
+        weight = body.get("weight", "length")
+        shape = body.get("shape", "buffer")
+        if shape not in SHAPES:
+            raise ValueError(f"Không hỗ trợ kiểu đa giác '{shape}'")
+        args = (district.name, sources, cutoff, weight, shape, float(body.get("buffer_m", ISOCHRONE_BUFFER_M)))
+        fut = self._coalesce(("isochrone", *args), lambda: self._call(solve_isochrone, *args))
+        return await asyncio.shield(fut)
+
+    async def health(self, body):
+        return {"status": "ok", "resident": get_store().stats()["resident"]}
+
+    async def stats(self, body):
+        return {"service": dict(self.counters, inflight=len(self._inflight), workers=self.workers),
+                "graph_store": get_store().stats()}
+
+    # ====== HTTP ======
+    async def dispatch(self, method, target, body):
+        self.counters["requests"] += 1
+        handler = self._routes.get((method, target.split("?", 1)[0]))
+        if handler is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"Không có {method} {target}"}
+        try:
+            payload = json.loads(body) if body else {}
+            return HTTPStatus.OK, await asyncio.wait_for(handler(payload), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            return HTTPStatus.GATEWAY_TIMEOUT, {"error": "Hết thời gian xử lý"}
+        except (KeyError, ValueError, TypeError) as exc:
+            self.counters["errors"] += 1
+            return HTTPStatus.BAD_REQUEST, {"error": f"{type(exc).__name__}: {exc}"}
+        except Exception as exc:
+            self.counters["errors"] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"}
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json; charset=utf-8\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 tối giản: Content-Length, keep-alive. Dòng yêu cầu hoặc Content-Length sai:
+        # trả 400 rồi đóng kết nối vì không còn biết yêu cầu kế tiếp bắt đầu ở đâu
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("latin-1").split()
+                if len(parts) != 3:
+                    self.counters["errors"] += 1
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Dòng yêu cầu không hợp lệ"}, False)
+                    break
+                method, target, version = parts
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if length < 0:
+                    self.counters["errors"] += 1
+                    status, payload = HTTPStatus.BAD_REQUEST, {"error": "Content-Length không hợp lệ"}
+                    keep_alive = False
+                elif length > SERVICE_MAX_BODY:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Yêu cầu quá lớn"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method, target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # client ngắt kết nối giữa chừng
+        finally:
+            writer.close()
+
+
+async def serve(host=SERVICE_HOST, port=SERVICE_PORT, workers=None, batch_ms=None, preload=()):
+    service = RoutingService(workers, batch_ms, preload=preload)
+    # Khởi động worker trước khi tải đồ thị trong process chính
+    await asyncio.gather(*(asyncio.wrap_future(f) for f in service.start_workers()))
+    for name in service.preload:
+        get_store().get(name)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Đang phục vụ http://{host}:{port} với {service.workers} worker", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
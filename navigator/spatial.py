@@ -0,0 +1,140 @@
+import math
+
+import numpy as np
+
+
+# ====== CHỈ MỤC KHÔNG GIAN (LƯỚI ĐỀU) ======
+# Tọa độ được chiếu phẳng (equirectangular quanh tâm đồ thị, đơn vị mét),
+# node được sắp theo ô lưới nên mỗi hàng ô là một đoạn liên tục trong mảng.
+# Mọi node nằm ngoài khối (2r+1)x(2r+1) ô quanh điểm truy vấn đều cách điểm đó
+# ít nhất r * cell_size, dùng làm điều kiện dừng cho truy vấn gần nhất.
+METERS_PER_DEG = 111_320.0
+NODES_PER_CELL = 4
+SNAP_CHUNK = 4096
+_OFFSETS_X, _OFFSETS_Y = (a.ravel() for a in np.meshgrid([-1, 0, 1], [-1, 0, 1]))
+
+
+class SpatialIndex:
+    def __init__(self, lat, lon, nodes_per_cell=NODES_PER_CELL):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        self.lat0 = float(lat.mean()) if len(lat) else 0.0
+        self.lon0 = float(lon.mean()) if len(lon) else 0.0
+        self.kx = METERS_PER_DEG * math.cos(math.radians(self.lat0))
+        self.ky = METERS_PER_DEG
+
+        px, py = self.project(lat, lon)
+        self.xmin = float(px.min()) if len(px) else 0.0
+        self.ymin = float(py.min()) if len(py) else 0.0
+        width = max(float(px.max()) - self.xmin, 1.0) if len(px) else 1.0
+        height = max(float(py.max()) - self.ymin, 1.0) if len(py) else 1.0
+        self.cell_size = max(math.sqrt(width * height * nodes_per_cell / max(len(px), 1)), 1.0)
+        self.nx = int(width // self.cell_size) + 1
+        self.ny = int(height // self.cell_size) + 1
+
+        cx, cy = self._cells(px, py)
+        cells = cy * self.nx + cx
+        order = np.argsort(cells, kind="stable")
+        self.nodes = order.astype(np.int32)
+        self.px = px[order]
+        self.py = py[order]
+        self.cell_offsets = np.zeros(self.nx * self.ny + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.nx * self.ny), out=self.cell_offsets[1:])
+        self._slots = None
+
+    def project(self, lat, lon):
+        return ((np.asarray(lon, dtype=np.float64) - self.lon0) * self.kx,
+                (np.asarray(lat, dtype=np.float64) - self.lat0) * self.ky)
+
+    def _cells(self, px, py):
+        cx = np.clip(((px - self.xmin) // self.cell_size).astype(np.int64), 0, self.nx - 1)
+        cy = np.clip(((py - self.ymin) // self.cell_size).astype(np.int64), 0, self.ny - 1)
+        return cx, cy
+
+    def _block(self, cx, cy, r):
+        # Vị trí (trong mảng đã sắp) của mọi node thuộc khối ô bán kính r
+        rows = np.arange(max(cy - r, 0), min(cy + r, self.ny - 1) + 1)
+        a = self.cell_offsets[rows * self.nx + max(cx - r, 0)]
+        b = self.cell_offsets[rows * self.nx + min(cx + r, self.nx - 1) + 1]
+        counts = b - a
+        row_start = np.cumsum(counts) - counts
+        return np.repeat(a - row_start, counts) + np.arange(int(counts.sum()))
+
+    def _max_radius(self):
+        return max(self.nx, self.ny)
+
+    # ====== TRUY VẤN ======
+    def nearest(self, lat, lon):
+        # Trả về (node, khoảng cách mét)
+        nodes, dists = self.k_nearest(lat, lon, 1)
+        return int(nodes[0]), float(dists[0])
+
+    def k_nearest(self, lat, lon, k):
+        px, py = self.project(lat, lon)
+        cx, cy = (int(c) for c in self._cells(px, py))
+        k = min(k, len(self.nodes))
+        if k == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        r = 1
+        while True:
+            pos = self._block(cx, cy, r)
+            if len(pos) >= k:
+                d = np.hypot(self.px[pos] - px, self.py[pos] - py)
+                part = np.argpartition(d, k - 1)[:k] if k < len(d) else np.arange(len(d))
+                part = part[np.argsort(d[part], kind="stable")]
+                if d[part[-1]] <= r * self.cell_size or r > self._max_radius():
+                    return self.nodes[pos[part]], d[part]
+            r *= 2
+
+    def within_radius(self, lat, lon, radius_m):
+        px, py = self.project(lat, lon)
+        cx, cy = (int(c) for c in self._cells(px, py))
+        pos = self._block(cx, cy, int(math.ceil(radius_m / self.cell_size)))
+        d = np.hypot(self.px[pos] - px, self.py[pos] - py)
+        keep = d <= radius_m
+        order = np.argsort(d[keep], kind="stable")
+        return self.nodes[pos[keep][order]], d[keep][order]
+
+    def _slot_table(self):
+        # Bảng (số ô + 1) x (số node tối đa/ô) chứa vị trí node, -1 là ô trống;
+        # hàng cuối luôn trống, dùng cho ô láng giềng nằm ngoài lưới
+        if self._slots is None:
+            n_cells = self.nx * self.ny
+            counts = np.diff(self.cell_offsets)
+            table = np.full((n_cells + 1, max(int(counts.max(initial=0)), 1)), -1, dtype=np.int32)
+            cell_of = np.repeat(np.arange(n_cells), counts)
+            pos = np.arange(len(self.nodes))
+            table[cell_of, pos - self.cell_offsets[cell_of]] = pos
+            self._slots = table
+        return self._slots
+
+    def snap(self, lats, lons, chunk=SNAP_CHUNK):
+        # Gắn hàng loạt điểm GPS vào node gần nhất: xét khối 3x3 ô quanh mỗi điểm
+        # cùng lúc cho cả lô; điểm nào chưa chắc chắn thì tra lại bằng nearest().
+        px, py = self.project(lats, lons)
+        px, py = np.atleast_1d(px), np.atleast_1d(py)
+        out_nodes = np.full(len(px), -1, dtype=np.int32)
+        out_dist = np.full(len(px), np.inf)
+        if len(self.nodes) == 0:
+            return out_nodes, out_dist
+
+        table = self._slot_table()
+        n_cells = self.nx * self.ny
+        cx, cy = self._cells(px, py)
+        for lo in range(0, len(px), chunk):
+            sl = slice(lo, lo + chunk)
+            ncx = cx[sl, None] + _OFFSETS_X
+            ncy = cy[sl, None] + _OFFSETS_Y
+            inside = (ncx >= 0) & (ncx < self.nx) & (ncy >= 0) & (ncy < self.ny)
+            cand = table[np.where(inside, ncy * self.nx + ncx, n_cells)].reshape(len(ncx), -1)
+            d = np.hypot(self.px[cand] - px[sl, None], self.py[cand] - py[sl, None])
+            d[cand < 0] = np.inf
+            best = d.argmin(axis=1)
+            rows = np.arange(len(best))
+            out_nodes[sl] = self.nodes[cand[rows, best]]
+            out_dist[sl] = d[rows, best]
+
+        for i in np.flatnonzero(out_dist > self.cell_size):
+            node, dist = self.nearest(self.lat0 + py[i] / self.ky, self.lon0 + px[i] / self.kx)
+            out_nodes[i], out_dist[i] = node, dist
+        return out_nodes, out_dist
@@ -0,0 +1,142 @@
+import threading
+from collections import OrderedDict
+from functools import partial
+from types import MappingProxyType
+
+from . import instrument
+from .attributes import get_attributes
+from .cache import get_graph_from_cache
+from .citywide import get_citywide
+from .config import CITYWIDE, CONTRACT_CHAINS, DISTRICTS, GRAPH_MEMORY_MB
+from .landmarks import load_landmarks
+from .reduction import get_reduction
+from .routecache import get_route_cache
+
+
+# ====== DỮ LIỆU MỘT QUẬN (CHỈ ĐỌC) ======
+class DistrictData:
+    __slots__ = ("name", "place_name", "graph", "citywide", "landmarks", "components", "contracted",
+                 "attributes", "node_mapping", "reverse_mapping", "center")
+
+    def __init__(self, name, place_name, graph, citywide=None):
+        self.name = name
+        self.place_name = place_name
+        self.graph = graph
+        self.citywide = citywide
+        self.landmarks = load_landmarks(graph) if citywide is None else None
+        # Nhãn thành phần gắn vào graph; đồ thị rút gọn chỉ dùng trong một quận
+        self.components, self.contracted = get_reduction(graph, CONTRACT_CHAINS and citywide is None)
+        # Thuộc tính hiển thị (tên đường, hình học...) chỉ được đọc khi giao diện cần
+        self.attributes = get_attributes(graph) if citywide is None else None
+        self.node_mapping = tuple(f"N{i+1:03d}" for i in range(graph.n_nodes))
+        self.reverse_mapping = MappingProxyType({v: i for i, v in enumerate(self.node_mapping)})
+        self.center = (float(graph.y.mean()), float(graph.x.mean()))
+
+    def memory(self):
+        # Bộ nhớ (byte) theo phần: đồ thị tìm đường, nhãn node và dict ngược (ước lượng ~150 byte/node),
+        # bảng ALT, nhãn thành phần + đồ thị rút gọn, thuộc tính hiển thị đã đọc
+        report = {
+            "graph": self.graph.nbytes,
+            "labels": 150 * self.graph.n_nodes,
+            "landmarks": self.landmarks.nbytes if self.landmarks is not None else 0,
+            "reduction": self.components.nbytes + (self.contracted.nbytes if self.contracted is not None else 0),
+            "attributes": self.attributes.nbytes if self.attributes is not None else 0,
+        }
+        report["total"] = sum(report.values())
+        return report
+
+    @property
+    def nbytes(self):
+        return self.memory()["total"]
+
+
+# ====== KHO ĐỒ THỊ DÙNG CHUNG TRONG PROCESS ======
+# Giữ các quận theo thứ tự LRU, loại quận ít dùng nhất khi vượt ngân sách bộ nhớ.
+# Quận vừa được tải luôn được giữ lại dù một mình nó đã vượt ngân sách.
+# cache_dir (mặc định CACHE_DIR) dùng cho cả file cache từng quận lẫn đồ thị toàn thành phố.
+class GraphStore:
+    def __init__(self, districts=None, memory_budget=None, loader=None, cache_dir=None):
+        self.districts = dict(districts or DISTRICTS)
+        self.memory_budget = int((GRAPH_MEMORY_MB if memory_budget is None else memory_budget) * 1024**2)
+        self.cache_dir = cache_dir
+        self.loader = loader or partial(get_graph_from_cache, cache_dir=cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def get(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return entry
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Mỗi quận chỉ được tải bởi một luồng, các luồng khác chờ kết quả
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    self._entries.move_to_end(name)
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+            with instrument.stage("graph_load", district=name) as rec:
+                if name == CITYWIDE:
+                    city = get_citywide(self.districts, self.loader, self.cache_dir)
+                    entry = DistrictData(name, None, city.graph, citywide=city)
+                else:
+                    place_name = self.districts[name]
+                    entry = DistrictData(name, place_name, self.loader(place_name))
+                rec["nodes"] = entry.graph.n_nodes
+                rec["edges"] = entry.graph.n_edges
+            # Kết quả tìm đường tính trên phiên bản đồ thị cũ không còn dùng được
+            get_route_cache().drop_stale(name, entry.graph.meta.get("version"))
+            with self._lock:
+                self._entries[name] = entry
+                self._evict()
+        return entry
+
+    def _evict(self):
+        total = sum(e.nbytes for e in self._entries.values())
+        while total > self.memory_budget and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            total -= old.nbytes
+            self.evictions += 1
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "resident": list(self._entries),
+                "nbytes": sum(e.nbytes for e in self._entries.values()),
+                "districts": {name: e.memory() for name, e in self._entries.items()},
+                "memory_budget": self.memory_budget,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = GraphStore()
+        return _store
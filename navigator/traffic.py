@@ -0,0 +1,268 @@
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from . import instrument
+from .config import (TRAFFIC_BUCKET_MIN, TRAFFIC_DEFAULT_KPH, TRAFFIC_DIR, TRAFFIC_MAX_KPH,
+                     TRAFFIC_MIN_KPH, TRAFFIC_REFRESH_S)
+from .core import EdgeWeights
+from .routecache import get_route_cache
+
+
+# ====== TRỌNG SỐ THỜI GIAN THEO GIAO THÔNG ======
+# Tốc độ (km/h) của từng cạnh theo khung giờ trong ngày, mỗi khung là một mảng float32 dài
+# bằng số cạnh (NaN = chưa có số liệu -> TRAFFIC_DEFAULT_KPH). Thời gian đi (giây) =
+# độ dài / tốc độ với tốc độ kẹp trong [MIN, MAX], nên haversine / MAX vẫn là cận dưới
+# và A* / ALT vẫn chính xác mà không phải tiền xử lý lại landmark.
+# Cập nhật kiểu copy-on-write: chỉ chép các khung giờ bị đổi, dựng trạng thái mới rồi thay
+# tham chiếu một lần; truy vấn đang chạy giữ trạng thái cũ nên không phải chờ khóa.
+# version chỉ tăng khi thời gian đi thực sự thay đổi. Chỉ các kết quả trong RouteCache chạm vào
+# cạnh có thời gian đi thay đổi bị bỏ; kết quả tính trên trạng thái đã cũ không được ghi vào cache.
+KPH = 1000 / 3600
+N_BUCKETS = -(-24 * 60 // TRAFFIC_BUCKET_MIN)
+
+
+def bucket_of(t=None):
+    # Khung giờ (giờ địa phương) của thời điểm t, mặc định là bây giờ
+    lt = time.localtime(t)
+    return (lt.tm_hour * 60 + lt.tm_min) // TRAFFIC_BUCKET_MIN
+
+
+class TrafficState:
+    # Bất biến sau khi tạo: version tăng sau mỗi lần cập nhật làm đổi thời gian đi
+    __slots__ = ("version", "bucket", "rows", "weights")
+
+    def __init__(self, version, bucket, rows, weights):
+        self.version = version
+        self.bucket = bucket
+        self.rows = rows          # tuple N_BUCKETS mảng tốc độ chỉ đọc (có thể dùng chung)
+        self.weights = weights    # EdgeWeights thời gian đi (giây) của khung giờ hiện tại
+
+
+class TrafficWeights:
+    def __init__(self, graph, name, bucket=None):
+        self.graph = graph
+        self.name = name
+        empty = np.full(graph.n_edges, np.nan, dtype=np.float32)
+        empty.flags.writeable = False
+        self._lock = threading.RLock()    # chỉ một luồng cập nhật tại một thời điểm
+        self._keys = None
+        self._mtime = None
+        bucket = bucket_of() if bucket is None else bucket
+        self.state = TrafficState(0, bucket, (empty,) * N_BUCKETS, self._weights(empty))
+
+    def _weights(self, row):
+        speed = np.where(np.isnan(row), TRAFFIC_DEFAULT_KPH, row).astype(np.float64)
+        np.clip(speed, TRAFFIC_MIN_KPH, TRAFFIC_MAX_KPH, out=speed)
+        return EdgeWeights(self.graph.lengths / (speed * KPH), 1 / (TRAFFIC_MAX_KPH * KPH))
+
+    def edge_ids(self, u, v):
+        # Chỉ số cạnh cho các cặp id OSM (u, v), -1 nếu đồ thị không có cạnh đó.
+        # Cạnh CSR đã sắp theo (nguồn, đích) nên khóa nguồn * n + đích tăng dần.
+        g = self.graph
+        if self._keys is None:
+            order = np.argsort(g.node_ids)
+            self._keys = (order, g.node_ids[order], g.edge_sources().astype(np.int64) * g.n_nodes + g.targets)
+        order, sorted_ids, edge_keys = self._keys
+        u, v = np.asarray(u, dtype=np.int64), np.asarray(v, dtype=np.int64)
+        if g.n_edges == 0:
+            return np.full(len(u), -1, dtype=np.int64)
+
+        def index(ids):
+            pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+            return np.where(sorted_ids[pos] == ids, order[pos], -1)
+        ui, vi = index(u), index(v)
+        keys = ui * g.n_nodes + vi
+        pos = np.minimum(np.searchsorted(edge_keys, keys), len(edge_keys) - 1)
+        return np.where((ui >= 0) & (vi >= 0) & (edge_keys[pos] == keys), pos, -1)
+
+    # ====== CẬP NHẬT ======
+    def apply(self, u, v, speed_kph, buckets=None):
+        # Ghi đè tốc độ cho các cạnh (u, v) theo id OSM; buckets None = mọi khung giờ, NaN = xóa số liệu.
+        # Trả về chỉ số các cạnh có thời gian đi trong khung giờ hiện tại thay đổi
+        edges = self.edge_ids(u, v)
+        keep = edges >= 0
+        edges = edges[keep]
+        speed = np.asarray(speed_kph, dtype=np.float32)[keep]
+        if buckets is None:
+            groups = [(range(N_BUCKETS), edges, speed)]
+        else:
+            buckets = np.asarray(buckets, dtype=np.int64)[keep]
+            groups = [([b], edges[buckets == b], speed[buckets == b]) for b in np.unique(buckets).tolist()]
+        with self._lock:
+            rows = list(self.state.rows)
+            for bs, e, sp in groups:
+                replaced = {}    # các khung giờ dùng chung một mảng tiếp tục dùng chung mảng mới
+                for b in bs:
+                    row = rows[b]
+                    if id(row) not in replaced:
+                        new = row
+                        if not np.array_equal(row[e], sp, equal_nan=True):
+                            new = row.copy()
+                            new[e] = sp
+                            new.flags.writeable = False
+                        replaced[id(row)] = new
+                    rows[b] = replaced[id(row)]
+            return self._publish(tuple(rows), self.state.bucket)
+
+    def apply_snapshot(self, frame):
+        # Bảng cột u, v (id OSM), speed_kph hoặc travel_time_s, tùy chọn bucket (khung giờ)
+        u = frame["u"].to_numpy(dtype=np.int64)
+        v = frame["v"].to_numpy(dtype=np.int64)
+        if "speed_kph" in frame:
+            speed = frame["speed_kph"].to_numpy(dtype=np.float64)
+        elif "travel_time_s" in frame:
+            edges = self.edge_ids(u, v)
+            seconds = frame["travel_time_s"].to_numpy(dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                speed = np.where(edges >= 0, self.graph.lengths[edges] / seconds / KPH, np.nan)
+        else:
+            raise ValueError("Snapshot giao thông cần cột speed_kph hoặc travel_time_s")
+        buckets = frame["bucket"].to_numpy(dtype=np.int64) % N_BUCKETS if "bucket" in frame else None
+        return self.apply(u, v, speed, buckets)
+
+    def set_bucket(self, bucket):
+        with self._lock:
+            return self._publish(self.state.rows, bucket)
+
+    def _publish(self, rows, bucket):
+        old = self.state
+        row = rows[bucket]
+        if row is old.rows[old.bucket]:
+            # Thời gian đi không đổi: giữ EdgeWeights (và list đã dựng) của trạng thái cũ
+            changed = np.zeros(0, dtype=np.int64)
+            weights = old.weights
+        else:
+            weights = self._weights(row)
+            changed = np.flatnonzero(weights.values != old.weights.values)
+            if len(changed) == 0:
+                weights = old.weights
+        version = old.version + 1 if len(changed) else old.version
+        self.state = TrafficState(version, bucket, rows, weights)
+        if len(changed):
+            get_route_cache().drop_edges(self.name, changed)
+        return changed
+
+    def cache_result(self, state, cache, key, value, edges):
+        # Ghi kết quả tính trên state nếu thời gian đi chưa đổi từ đó. Giữ khóa cập nhật nên
+        # _publish hoặc chạy trước (kết quả không được ghi) hoặc sau (dọn theo cạnh như thường)
+        with self._lock:
+            if self.state.version != state.version:
+                return False
+            cache.put(key, value, edges)
+            return True
+
+    def refresh(self, now=None):
+        # Đọc lại snapshot khi file thay đổi và chuyển sang khung giờ hiện tại
+        with self._lock, instrument.trace("traffic", district=self.name) as t:
+            changed = []
+            path = snapshot_path(self.graph)
+            if path is not None:
+                mtime = path.stat().st_mtime_ns
+                if mtime != self._mtime:
+                    with t.stage("snapshot", path=str(path)) as rec:
+                        changed.append(self.apply_snapshot(read_snapshot(path)))
+                        rec["changed"] = len(changed[-1])
+                    self._mtime = mtime
+            bucket = bucket_of(now)
+            if bucket != self.state.bucket:
+                with t.stage("bucket", bucket=bucket) as rec:
+                    changed.append(self.set_bucket(bucket))
+                    rec["changed"] = len(changed[-1])
+            t.annotate(version=self.state.version)
+            return np.unique(np.concatenate(changed)) if changed else np.zeros(0, dtype=np.int64)
+
+
+# ====== ĐỌC SNAPSHOT ======
+def snapshot_path(graph, traffic_dir=None):
+    # <TRAFFIC_DIR>/<tên file cache đồ thị>.parquet hoặc .csv, None nếu không có
+    source = graph.meta.get("path")
+    if not source:
+        return None
+    base = Path(traffic_dir or TRAFFIC_DIR) / Path(source).stem
+    for suffix in (".parquet", ".csv"):
+        path = base.with_suffix(suffix)
+        if path.exists():
+            return path
+    return None
+
+
+def read_snapshot(path):
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)    # cần pyarrow
+    return pd.read_csv(path)
+
+
+# ====== DÙNG CHUNG TRONG PROCESS ======
+# Một TrafficWeights cho mỗi khu vực (theo version đồ thị), luồng nền làm mới mỗi TRAFFIC_REFRESH_S giây
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_traffic(district):
+    key = (district.name, district.graph.meta.get("version"))
+    with _registry_lock:
+        traffic = _registry.get(key)
+        created = traffic is None
+        if created:
+            for old in [k for k in _registry if k[0] == district.name]:
+                del _registry[old]
+            traffic = _registry[key] = TrafficWeights(district.graph, district.name)
+    if created:
+        traffic.refresh()
+    get_feed().start()
+    return traffic
+
+
+class TrafficFeed:
+    def __init__(self, interval=TRAFFIC_REFRESH_S):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="traffic-feed", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh_all(self):
+        # Bỏ khu vực đã bị GraphStore loại (để giải phóng đồ thị), làm mới các khu vực còn lại
+        from .store import get_store
+
+        resident = set(get_store().stats()["resident"])
+        with _registry_lock:
+            for key in [k for k in _registry if k[0] not in resident]:
+                del _registry[key]
+            items = list(_registry.values())
+        for traffic in items:
+            try:
+                traffic.refresh()
+            except (OSError, ValueError, KeyError):
+                pass  # snapshot đang ghi dở / sai định dạng -> giữ trạng thái cũ, thử lại lần sau
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh_all()
+
+
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_feed():
+    global _feed
+    with _feed_lock:
+        if _feed is None:
+            _feed = TrafficFeed()
+        return _feed
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from benchmarks.graphs import FIXTURE_DIR, fixture_graphs, grid_graph, random_geometric_graph
+from navigator.build import build_all
+from navigator.cache import get_graph_from_cache
+from navigator.config import DISTRICTS
+from navigator.graph import RoutingGraph
+from navigator.store import GraphStore
+
+
+# ====== ĐỒ THỊ KIỂM THỬ ======
+# Dựng được khi không có mạng: fixture OSM quanh chợ Bến Thành cùng lưới phố lệch và đồ thị
+# hình học ngẫu nhiên nhỏ (có đường một chiều, nhiều chuỗi node bậc 2) theo seed cố định
+N_PAIRS = 40
+
+
+def _graphs():
+    graphs = {name: RoutingGraph.from_multigraph(G) for name, G in fixture_graphs().items()}
+    graphs["grid"] = RoutingGraph.from_multigraph(grid_graph(400, seed=1))
+    graphs["rgg"] = RoutingGraph.from_multigraph(random_geometric_graph(400, seed=2))
+    return graphs
+
+
+_GRAPHS = _graphs()
+
+
+@pytest.fixture(scope="session", params=sorted(_GRAPHS))
+def graph(request):
+    return _GRAPHS[request.param]
+
+
+@pytest.fixture
+def pairs(graph):
+    # Cặp (start, goal) ngẫu nhiên trên mọi node, gồm cả cặp không có đường đi
+    rng = np.random.default_rng(0)
+    return rng.integers(0, graph.n_nodes, size=(N_PAIRS, 2)).tolist()
+
+
+# ====== CACHE BUILD OFFLINE TỪ FIXTURE ======
+# Ranh giới trong fixture chia khu chợ Bến Thành thành Quận 3 (tây) và Quận 1 (đông)
+FIXTURE_DISTRICTS = {name: DISTRICTS[name] for name in ("Quận 1", "Quận 3")}
+
+
+@pytest.fixture(scope="session")
+def fixture_cache(tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp("cache_graphs")
+    build_all(FIXTURE_DIR / "ben_thanh.osm", FIXTURE_DIR / "ben_thanh_districts.geojson",
+              names=list(FIXTURE_DISTRICTS), cache_dir=cache_dir, workers=1, log=lambda line: None, citywide=False)
+    return cache_dir
+
+
+@pytest.fixture
+def loader(fixture_cache):
+    # Cache build offline luôn được coi là còn mới nên không bao giờ tải từ mạng
+    return lambda place_name: get_graph_from_cache(place_name, fixture_cache)
+
+
+@pytest.fixture
+def store(fixture_cache):
+    return GraphStore(FIXTURE_DISTRICTS, cache_dir=fixture_cache)
+
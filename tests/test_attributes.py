@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from benchmarks.graphs import fixture_graphs
+from navigator.attributes import (AttributeStore, _text, decode_strings, encode_strings, extract_attributes,
+                                  get_attributes, save_attributes)
+from navigator.cache import read_graph, write_graph
+from navigator.graph import RoutingGraph
+
+
+# ====== THUỘC TÍNH HIỂN THỊ DẠNG CỘT ======
+@pytest.fixture(scope="module")
+def multigraph():
+    return fixture_graphs()["fixture:ben_thanh"]
+
+
+@pytest.fixture
+def saved(multigraph, tmp_path):
+    # Đồ thị đọc từ file cache kèm file .attr bên cạnh
+    path = tmp_path / "ben_thanh.gtg"
+    write_graph(path, RoutingGraph.from_multigraph(multigraph))
+    graph = read_graph(path)
+    save_attributes(graph, extract_attributes(multigraph, graph))
+    return graph
+
+
+def test_text():
+    assert _text(None) is None and _text(float("nan")) is None
+    assert _text(["Lê Lợi", "Lê Lợi", "Pasteur"]) == "Lê Lợi / Pasteur"
+    assert _text([]) is None and _text(40) == "40"
+
+
+def test_strings_roundtrip():
+    values = ["Lê Lợi", None, "Hàm Nghi", "Lê Lợi", None]
+    codes, blob, offsets = encode_strings(values)
+    assert codes.tolist() == [0, -1, 1, 0, -1]
+    dictionary = decode_strings(blob, offsets)
+    assert [dictionary[c] if c >= 0 else None for c in codes.tolist()] == values
+
+
+def test_columns_follow_graph_order(multigraph, saved):
+    graph = saved
+    attributes = get_attributes(graph)
+    assert not attributes.loaded and attributes.available
+    names = attributes.edge_text("name", np.arange(graph.n_edges))
+    osmids = attributes.column("edge_osmid")
+    src, dst = graph.edge_sources(), graph.targets
+    for k in range(graph.n_edges):
+        u, v = int(graph.node_ids[src[k]]), int(graph.node_ids[dst[k]])
+        # Cạnh song song: thuộc tính lấy từ cạnh ngắn nhất, đúng cạnh RoutingGraph giữ lại
+        data = min(multigraph[u][v].values(), key=lambda d: d["length"])
+        assert names[k] == _text(data.get("name"))
+        assert osmids[k] == (data["osmid"][0] if isinstance(data["osmid"], list) else data["osmid"])
+    assert len(attributes.node_text("highway", [0, 1])) == 2
+    assert attributes.edge_text("khong_co", [0, 1]) == [None, None]
+
+
+def test_geometry_runs_along_edge(saved):
+    graph = saved
+    attributes = get_attributes(graph)
+    src, dst = graph.edge_sources(), graph.targets
+    curved = [k for k in range(graph.n_edges) if attributes.edge_geometry(k) is not None]
+    for k in curved:
+        geom = attributes.edge_geometry(k)
+        assert geom[0] == pytest.approx((graph.y[src[k]], graph.x[src[k]]))
+        assert geom[-1] == pytest.approx((graph.y[dst[k]], graph.x[dst[k]]))
+    path = [int(src[0]), int(dst[0])]
+    coords = attributes.path_coords(graph, path)
+    assert coords[0] == (graph.y[path[0]], graph.x[path[0]])
+    assert coords[-1] == pytest.approx((graph.y[path[1]], graph.x[path[1]]))
+    assert attributes.path_coords(graph, []) == []
+
+
+def test_missing_or_stale_file(multigraph, saved, tmp_path):
+    assert not AttributeStore(tmp_path / "khong_co.attr").available
+    # File thuộc phiên bản đồ thị khác -> coi như không có
+    stale = AttributeStore(get_attributes(saved).path, "phiên bản cũ")
+    assert not stale.available and stale.text("edge_name", [0]) == [None]
+    assert get_attributes(RoutingGraph.from_multigraph(multigraph)) is None
+
+
+def test_nbytes_counts_only_read_columns(saved):
+    attributes = get_attributes(saved)
+    assert attributes.nbytes == 0
+    attributes.column("edge_osmid")
+    first = attributes.nbytes
+    assert first == saved.n_edges * 8
+    attributes.load_all()
+    assert attributes.nbytes > first
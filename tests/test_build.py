@@ -0,0 +1,81 @@
+from benchmarks.graphs import FIXTURE_DIR
+from navigator import build
+from navigator.attributes import attributes_path, get_attributes
+from navigator.build import build_all
+from navigator.cache import cache_path, get_graph_from_cache, read_graph
+from navigator.config import DISTRICTS, LANDMARK_COUNT
+from navigator.landmarks import landmarks_path, load_landmarks
+from navigator.reduction import load_reduction, reduction_path
+
+
+# ====== BUILD OFFLINE TỪ FIXTURE OSM ======
+# Fixture quanh chợ Bến Thành, ranh giới chia đôi thành Quận 3 (tây) và Quận 1 (đông)
+OSM = FIXTURE_DIR / "ben_thanh.osm"
+BOUNDARIES = FIXTURE_DIR / "ben_thanh_districts.geojson"
+BUILT = ["Quận 1", "Quận 3"]
+
+
+def _run(cache_dir, **kwargs):
+    return {r["district"]: r for r in build_all(OSM, BOUNDARIES, cache_dir=cache_dir, workers=1, log=lambda line: None,
+                                                citywide=False, **kwargs)}
+
+
+def test_build_then_skip_then_force(tmp_path):
+    first = _run(tmp_path)
+    assert sorted(name for name, r in first.items() if r["status"] == "built") == BUILT
+    # Quận không có ranh giới trong file chỉ bị bỏ qua khi không được chỉ định
+    assert all(r["status"] == "skipped" and r["reason"] == "không có ranh giới"
+               for name, r in first.items() if name not in BUILT)
+    assert len(first) == len(DISTRICTS)
+
+    second = _run(tmp_path)
+    assert all(r["status"] == "skipped" for r in second.values())
+    assert [second[name]["reason"] for name in BUILT] == ["không đổi", "không đổi"]
+
+    forced = _run(tmp_path, names=["Quận 1"], force=True)
+    assert forced == {"Quận 1": forced["Quận 1"]} and forced["Quận 1"]["status"] == "built"
+
+
+def test_outputs_load(tmp_path):
+    _run(tmp_path, names=BUILT)
+    for name in BUILT:
+        path = cache_path(DISTRICTS[name], tmp_path)
+        graph = read_graph(path)
+        assert graph.n_nodes > 0 and graph.meta["build"]["source"] == "extract"
+        # Cache build offline được coi là còn mới: không tải lại từ mạng
+        assert get_graph_from_cache(DISTRICTS[name], tmp_path).meta["version"] == graph.meta["version"]
+        assert landmarks_path(graph).exists() == (LANDMARK_COUNT > 0)
+        if LANDMARK_COUNT > 0:
+            assert len(load_landmarks(graph).nodes) == min(LANDMARK_COUNT, graph.n_nodes)
+        assert reduction_path(graph).exists()
+        components, _ = load_reduction(graph)
+        assert len(components.scc) == graph.n_nodes
+        assert attributes_path(graph).exists()
+        attributes = get_attributes(graph)
+        assert attributes.available and len(attributes.column("edge_osmid")) == graph.n_edges
+
+
+def test_named_district_without_boundary_is_error(tmp_path):
+    results = _run(tmp_path, names=["Quận 1", "Quận 5"])
+    assert results["Quận 1"]["status"] == "built"
+    assert results["Quận 5"]["status"] == "error"
+
+
+def test_failure_in_one_district_does_not_stop_others(tmp_path, monkeypatch):
+    real = build.build_district
+
+    def flaky(name, *args, **kwargs):
+        if name == "Quận 3":
+            raise RuntimeError("hỏng")
+        return real(name, *args, **kwargs)
+    monkeypatch.setattr(build, "build_district", flaky)
+    results = _run(tmp_path, names=BUILT)
+    assert results["Quận 1"]["status"] == "built"
+    assert results["Quận 3"] == {"district": "Quận 3", "status": "error", "error": "RuntimeError: hỏng"}
+
+
+def test_parallel_build(tmp_path):
+    # Mỗi quận trong một process riêng
+    results = build_all(OSM, BOUNDARIES, names=BUILT, cache_dir=tmp_path, workers=2, log=lambda line: None,
+                        citywide=False)
+    assert sorted(r["district"] for r in results if r["status"] == "built") == BUILT
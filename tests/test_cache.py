@@ -0,0 +1,82 @@
+import struct
+
+import numpy as np
+import pytest
+
+from navigator.cache import (ALIGN, ARRAYS, FORMAT_VERSION, MAGIC, build_params, cache_path, is_fresh, osmnx_version,
+                             read_arrays, read_graph, write_arrays, write_graph)
+
+
+# ====== ĐỊNH DẠNG FILE CACHE ======
+def _arrays():
+    return {"a": np.arange(5, dtype=np.int32), "b": np.linspace(0, 1, 7), "empty": np.zeros(0, dtype=np.int64),
+            "bytes": np.frombuffer("Bến Thành".encode("utf-8"), dtype=np.uint8)}
+
+
+def test_arrays_roundtrip(tmp_path):
+    path = tmp_path / "a.gtg"
+    written = write_arrays(path, _arrays(), {"kind": "test", "note": "chợ"})
+    header, arrays = read_arrays(path)
+    assert header["kind"] == "test" and header["note"] == "chợ" and header["format"] == FORMAT_VERSION
+    assert header["version"] == written["version"]
+    for name, arr in _arrays().items():
+        assert arrays[name].dtype == arr.dtype
+        np.testing.assert_array_equal(arrays[name], arr)
+    # Mảng đọc ra là mmap chỉ đọc, mỗi mảng bắt đầu ở vị trí căn lề
+    assert not arrays["a"].flags.writeable
+    assert all(spec["offset"] % ALIGN == 0 for spec in header["arrays"].values())
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_version_follows_content(tmp_path):
+    first = write_arrays(tmp_path / "a.gtg", _arrays())
+    again = write_arrays(tmp_path / "b.gtg", _arrays(), {"other": 1})
+    changed = dict(_arrays(), b=np.linspace(0, 2, 7))
+    assert first["version"] == again["version"]
+    assert write_arrays(tmp_path / "c.gtg", changed)["version"] != first["version"]
+
+
+def test_graph_roundtrip(tmp_path, graph):
+    path = tmp_path / "g.gtg"
+    write_graph(path, graph, {"build": {"source": "test"}}, {"extra": np.arange(3)})
+    loaded, extra = read_graph(path, with_extra=True)
+    for name in ARRAYS:
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(graph, name))
+    assert loaded.meta["n_nodes"] == graph.n_nodes and loaded.meta["n_edges"] == graph.n_edges
+    assert loaded.meta["path"] == str(path) and loaded.meta["build"] == {"source": "test"}
+    np.testing.assert_array_equal(extra["extra"], np.arange(3))
+    assert read_graph(path).meta["version"] == loaded.meta["version"]
+
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / "bad.gtg"
+    path.write_bytes(b"NOTGRAPH" + bytes(64))
+    with pytest.raises(ValueError):
+        read_arrays(path)
+
+
+def test_unsupported_format(tmp_path):
+    path = tmp_path / "old.gtg"
+    write_arrays(path, _arrays())
+    data = bytearray(path.read_bytes())
+    struct.pack_into("<I", data, len(MAGIC), FORMAT_VERSION + 1)
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        read_arrays(path)
+
+
+def test_cache_path(tmp_path):
+    assert cache_path("District 1, Ho Chi Minh City", tmp_path) == tmp_path / "District_1_Ho_Chi_Minh_City.gtg"
+
+
+def test_is_fresh():
+    place = "District 1, Ho Chi Minh City, Vietnam"
+    downloaded = {"format": FORMAT_VERSION, "osmnx_version": osmnx_version(), "build": build_params(place)}
+    assert is_fresh(downloaded, place)
+    assert not is_fresh(downloaded, "District 3, Ho Chi Minh City, Vietnam")
+    assert not is_fresh(dict(downloaded, osmnx_version="0.0"), place)
+    assert not is_fresh(dict(downloaded, format=FORMAT_VERSION + 1), place)
+    # Build offline không phụ thuộc phiên bản osmnx
+    extract = {"format": FORMAT_VERSION, "build": {"source": "extract", "place_name": place}}
+    assert is_fresh(extract, place)
+    assert not is_fresh(extract, "District 3, Ho Chi Minh City, Vietnam")
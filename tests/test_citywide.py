@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from navigator import alternatives, citywide, core
+from navigator.citywide import (CORRIDOR_CACHE_SIZE, CitywideGraph, build_citywide, citywide_path, get_citywide,
+                                merge_graphs)
+from navigator.search import dijkstra
+from tests.conftest import FIXTURE_DISTRICTS
+from tests.test_search import assert_valid_path
+
+
+# ====== ĐỒ THỊ TOÀN THÀNH PHỐ TỪ HAI QUẬN FIXTURE ======
+@pytest.fixture
+def districts(loader):
+    return [loader(place_name) for place_name in FIXTURE_DISTRICTS.values()]
+
+
+def _city_pairs(graph, n=30):
+    rng = np.random.default_rng(5)
+    return rng.integers(0, graph.n_nodes, size=(n, 2)).tolist()
+
+
+def test_merge_keeps_one_copy_of_boundary_nodes(districts):
+    node_ids, x, y, src, dst, lengths = merge_graphs(districts)
+    assert node_ids.tolist() == sorted(set().union(*(g.node_ids.tolist() for g in districts)))
+    assert len(src) == sum(g.n_edges for g in districts)
+    # Mỗi cạnh giữ đúng id OSM hai đầu và tọa độ của node gốc
+    for g in districts:
+        rows = np.searchsorted(node_ids, g.node_ids)
+        np.testing.assert_array_equal(x[rows], g.x)
+        np.testing.assert_array_equal(y[rows], g.y)
+    first = districts[0]
+    np.testing.assert_array_equal(node_ids[src[:first.n_edges]], first.node_ids[first.edge_sources()])
+    np.testing.assert_array_equal(node_ids[dst[:first.n_edges]], first.node_ids[first.targets])
+
+
+def test_nodes_sorted_by_cell(districts):
+    graph, cell_offsets, grid = build_citywide(districts, cell_size=200)
+    city = CitywideGraph(graph, cell_offsets, grid)
+    cells = citywide.cell_ids(grid, graph.x, graph.y)
+    assert np.all(np.diff(cells) >= 0)
+    assert cell_offsets[-1] == graph.n_nodes
+    for s, t in _city_pairs(graph, 10):
+        nodes = city.corridor_nodes(s, t, 0)
+        assert np.all(np.diff(nodes) > 0) and s in nodes and t in nodes
+
+
+def test_cache_reused_until_sources_change(districts, loader, tmp_path):
+    city = get_citywide(FIXTURE_DISTRICTS, loader, cache_dir=tmp_path)
+    path = citywide_path(tmp_path)
+    assert city.graph.meta["path"] == str(path)
+    versions = [g.meta["version"] for g in districts]
+    assert city.graph.meta["sources"] == dict(zip(FIXTURE_DISTRICTS.values(), versions))
+    mtime = path.stat().st_mtime_ns
+    again = get_citywide(FIXTURE_DISTRICTS, loader, cache_dir=tmp_path)
+    assert path.stat().st_mtime_ns == mtime and again.graph.meta["version"] == city.graph.meta["version"]
+    # Một quận đổi phiên bản -> build lại
+    one = {"Quận 1": FIXTURE_DISTRICTS["Quận 1"]}
+    rebuilt = get_citywide(one, loader, cache_dir=tmp_path)
+    assert rebuilt.graph.n_nodes == districts[0].n_nodes
+    assert rebuilt.graph.meta["sources"] == {FIXTURE_DISTRICTS["Quận 1"]: districts[0].meta["version"]}
+
+
+@pytest.mark.parametrize("mode", ["astar", "bidirectional"])
+def test_route_matches_dijkstra(loader, tmp_path, mode):
+    city = get_citywide(FIXTURE_DISTRICTS, loader, cache_dir=tmp_path)
+    graph = city.graph
+    for s, t in _city_pairs(graph):
+        result = citywide.route(city, s, t, mode, track_edges=True)
+        dist, _ = dijkstra(graph, s, t)
+        if not np.isfinite(dist[t]):
+            assert result.path == []
+            continue
+        # Hành lang nhỏ nhất đã bao trọn khu fixture nên đường đi là tối ưu
+        assert_valid_path(graph, result.path, s, t)
+        assert result.distance == pytest.approx(dist[t])
+        assert graph.path_length(result.path) == pytest.approx(dist[t])
+        # Chỉ số cạnh (vùng đã duyệt, tập phụ thuộc) đổi về đánh số toàn thành phố
+        edges = {graph.edge_index(u, v) for u, v in zip(result.path[:-1], result.path[1:])}
+        assert edges <= set(result.scanned.tolist())
+        assert all(0 <= e < graph.n_edges for e in result.edges)
+
+
+@pytest.fixture
+def city(loader, tmp_path):
+    return get_citywide(FIXTURE_DISTRICTS, loader, cache_dir=tmp_path)
+
+
+class Counter:
+    def __init__(self, fn):
+        self.fn = fn
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.fn(*args, **kwargs)
+
+
+def _reachable_pairs(graph, n):
+    pairs = []
+    for s, t in _city_pairs(graph, 200):
+        if s != t and np.isfinite(dijkstra(graph, s, t)[0][t]):
+            pairs.append((s, t))
+    return pairs[:n]
+
+
+def test_corridor_search_runs_once(city, monkeypatch):
+    # Lần tìm chọn hành lang cũng là kết quả trả về: một lần A* cho mỗi truy vấn
+    searches = Counter(core._astar)
+    monkeypatch.setattr(core, "_astar", searches)
+    for s, t in _reachable_pairs(city.graph, 5):
+        before = searches.calls
+        assert citywide.route(city, s, t, "astar").path
+        assert searches.calls == before + 1
+        before = searches.calls
+        assert citywide.route(city, s, t, "astar").path
+        assert searches.calls == before + 1
+
+
+def test_alternatives_search_once(city, monkeypatch):
+    searches = Counter(alternatives.find_truly_different_paths)
+    monkeypatch.setattr(alternatives, "find_truly_different_paths", searches)
+    s, t = _reachable_pairs(city.graph, 1)[0]
+    scanned = []
+    paths = citywide.find_truly_different_paths(city, s, t, max_paths=3, scanned=scanned)
+    assert paths and searches.calls == 1
+    assert all(e.max() < city.graph.n_edges for e in scanned)
+    assert citywide.find_truly_different_paths(city, s, t, max_paths=3) == paths and searches.calls == 2
+
+
+def test_corridor_cache_is_lru(city, monkeypatch):
+    corridors = Counter(city.corridor_nodes)
+    monkeypatch.setattr(city, "corridor_nodes", corridors)
+    pairs = _reachable_pairs(city.graph, CORRIDOR_CACHE_SIZE + 1)
+    # Các phiên xen kẽ nhau không đẩy hành lang của nhau ra khỏi cache
+    for s, t in pairs[:2] + pairs[:2]:
+        citywide.route(city, s, t, "astar")
+    assert corridors.calls == 2
+    for s, t in pairs[2:] + pairs[:1]:
+        citywide.route(city, s, t, "astar")
+    assert corridors.calls == 2 + (len(pairs) - 2) + 1
@@ -0,0 +1,52 @@
+import csv
+import json
+
+import pytest
+
+from navigator import store
+from navigator.cli import main, resolve_nodes
+from navigator.config import CITYWIDE
+from tests.conftest import FIXTURE_DISTRICTS
+
+
+# ====== LỆNH DÒNG LỆNH TRÊN CACHE FIXTURE ======
+def _write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_isochrone_citywide_uses_cache_dir(fixture_cache, tmp_path, monkeypatch, capsys):
+    # Toàn thành phố gồm hai quận có trong fixture
+    monkeypatch.setattr(store, "DISTRICTS", FIXTURE_DISTRICTS)
+    monkeypatch.chdir(tmp_path)
+    sources = _write_csv(tmp_path / "sources.csv", [{"source": "N001"}, {"source": "N050"}])
+    main(["--cache-dir", str(fixture_cache), "isochrone", "--district", CITYWIDE, "--sources", sources,
+          "--cutoff", "400", "--output", "reached.csv", "--polygon", "reached.geojson", "--coverage", "200,400"])
+    assert not (tmp_path / "cache_graphs").exists()
+    rows = _read_csv(tmp_path / "reached.csv")
+    assert rows and max(float(r["distance_m"]) for r in rows) <= 400
+    feature = json.loads((tmp_path / "reached.geojson").read_text(encoding="utf-8"))
+    assert feature["properties"]["reached"] == len(rows) and feature["geometry"]["type"] in ("Polygon", "MultiPolygon")
+    coverage = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [row["cutoff"] for row in coverage] == [200, 400] and coverage[1]["nodes"] == len(rows)
+
+
+def test_resolve_nodes(graph):
+    rows = [{"source": "N001"}, {"source": f" N{graph.n_nodes} "}, {"source": str(graph.node_ids[2])}]
+    assert resolve_nodes(graph, rows, "source").tolist() == [0, graph.n_nodes - 1, 2]
+
+
+@pytest.mark.parametrize("bad", ["N000", "N{n}", "Nabc", "-1"])
+def test_resolve_nodes_reports_row(graph, bad):
+    bad = bad.format(n=graph.n_nodes + 1)
+    rows = [{"origin": "N001"}, {"origin": "N002"}, {"origin": bad}]
+    with pytest.raises(ValueError, match=f"dòng 3: origin '{bad}'"):
+        resolve_nodes(graph, rows, "origin")
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from navigator.executor import QueryCancelled, QueryExecutor, QueueFull, checkpoint
+
+
+# ====== GIỚI HẠN, DÙNG CHUNG VÀ HỦY TRUY VẤN ======
+@pytest.fixture
+def executor():
+    executor = QueryExecutor(workers=1, max_pending=2, wait=0.05)
+    yield executor
+    executor.shutdown()
+
+
+def _blocker(started, release):
+    started.set()
+    release.wait(5)
+    return "xong"
+
+
+def _until_cancelled(started, steps):
+    started.set()
+    while True:
+        checkpoint()
+        steps.append(1)
+        time.sleep(0.001)
+
+
+def test_run(executor):
+    assert executor.run(sum, [1, 2, 3]) == 6
+    with pytest.raises(ZeroDivisionError):
+        executor.run(lambda: 1 / 0)
+    stats = executor.stats()
+    assert (stats["completed"], stats["failed"], stats["pending"]) == (1, 1, 0)
+
+
+def test_queue_full(executor):
+    started, release = threading.Event(), threading.Event()
+    running = executor.submit(_blocker, started, release)
+    queued = executor.submit(sum, [1])
+    with pytest.raises(QueueFull):
+        executor.submit(sum, [2])
+    assert executor.stats()["rejected"] == 1
+    release.set()
+    assert running.result(5) == "xong" and queued.result(5) == 1
+
+
+def test_waits_for_free_slot():
+    # Hàng đợi đầy: chờ tới khi có chỗ trong thời hạn wait thay vì báo lỗi ngay
+    executor = QueryExecutor(workers=1, max_pending=1, wait=5)
+    try:
+        started, release = threading.Event(), threading.Event()
+        executor.submit(_blocker, started, release)
+        threading.Timer(0.05, release.set).start()
+        assert executor.run(sum, [4], timeout=5) == 4
+        assert executor.stats()["rejected"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_shared_key(executor):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def job():
+        calls.append(1)
+        return _blocker(started, release)
+    first = executor.submit(job, key="k", owner="a")
+    second = executor.submit(job, key="k", owner="b")
+    assert not first.shared and second.shared
+    release.set()
+    assert first.result(5) == second.result(5) == "xong"
+    assert calls == [1] and executor.stats()["shared"] == 1
+    # Khóa đã xong thì truy vấn sau chạy lại
+    assert not executor.submit(job, key="k").shared
+
+
+def test_cancel_queued(executor):
+    started, release = threading.Event(), threading.Event()
+    running = executor.submit(_blocker, started, release)
+    calls = []
+    queued = executor.submit(calls.append, 1, owner="a")
+    queued.cancel()
+    release.set()
+    running.result(5)
+    assert queued.job.future.cancelled() and calls == []
+    assert executor.stats()["cancelled"] == 1
+
+
+def test_cancel_running_stops_at_checkpoint(executor):
+    started, steps = threading.Event(), []
+    ticket = executor.submit(_until_cancelled, started, steps, owner="a")
+    assert started.wait(5)
+    ticket.cancel()
+    with pytest.raises(QueryCancelled):
+        ticket.result(5)
+    done = len(steps)
+    time.sleep(0.02)
+    assert len(steps) == done
+    assert executor.stats()["cancelled"] == 1
+
+
+def test_shared_query_runs_until_last_owner_cancels(executor):
+    started, release = threading.Event(), threading.Event()
+    first = executor.submit(_blocker, started, release, key="k", owner="a")
+    second = executor.submit(_blocker, started, release, key="k", owner="b")
+    first.cancel()
+    assert not first.job.cancel.is_set()
+    release.set()
+    assert second.result(5) == "xong"
+
+
+def test_cancel_owner(executor):
+    started, steps = threading.Event(), []
+    ticket = executor.submit(_until_cancelled, started, steps, owner="phiên 1")
+    other = executor.submit(sum, [5], owner="phiên 2")
+    assert started.wait(5)
+    assert executor.cancel_owner("phiên 1") == 1
+    with pytest.raises(QueryCancelled):
+        ticket.result(5)
+    assert other.result(5) == 5
+    assert executor.cancel_owner("phiên 1") == 0
@@ -0,0 +1,69 @@
+import json
+import tracemalloc
+
+from navigator import instrument
+from navigator.instrument import NULL_TRACE, Trace
+
+
+# ====== ĐO THEO TỪNG BƯỚC ======
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_trace_writes_one_line(tmp_path):
+    log = tmp_path / "logs" / "instrument.jsonl"
+    t = Trace("route", {"district": "Quận 1"}, alloc=True, log_path=log)
+    try:
+        with t.stage("search", mode="astar") as rec:
+            rec["settled"] = 12
+            data = [0] * 10_000
+    finally:
+        tracemalloc.stop()
+    t.annotate(found=bool(data))
+    rec = t.finish()
+    assert t.finish() == rec
+    [line] = _lines(log)
+    assert line == rec
+    assert line["kind"] == "route" and line["district"] == "Quận 1" and line["found"] is True
+    [stage] = line["stages"]
+    assert stage["stage"] == "search" and stage["mode"] == "astar" and stage["settled"] == 12
+    assert stage["ms"] >= 0 and stage["peak_kb"] >= stage["alloc_kb"] and stage["peak_kb"] > 50
+
+
+def test_disabled_trace_is_shared_null():
+    t = instrument.start("rerun", enabled=False)
+    assert t is NULL_TRACE and instrument.current() is NULL_TRACE
+    with instrument.stage("search") as rec:
+        rec["settled"] = 1
+        rec.update(pushes=2)
+    assert dict(rec) == {} and t.finish() is None
+
+
+def test_children_and_module_stage(tmp_path):
+    log = tmp_path / "instrument.jsonl"
+    with instrument.trace("rerun", enabled=True) as parent:
+        parent.log_path = log
+        with instrument.stage("render"):
+            pass
+        # Trace con tự bật vì đang nằm trong một trace đang bật
+        with instrument.trace("route") as child:
+            child.log_path = log
+            assert child.enabled and instrument.current() is child
+            with instrument.stage("search") as rec:
+                rec["settled"] = 3
+        assert instrument.current() is parent
+    assert instrument.current() is NULL_TRACE
+    assert parent.children == [child]
+    assert [s["stage"] for s in parent.stages] == ["render"]
+    assert [line["kind"] for line in _lines(log)] == ["route", "rerun"]
+
+
+def test_root_trace_drops_leftover(tmp_path):
+    # Trace gốc chưa finish (vd script bị ngắt) không trở thành cha của trace gốc tiếp theo
+    leftover = instrument.start("rerun", enabled=True)
+    leftover.log_path = None
+    t = instrument.start("rerun", enabled=True)
+    t.log_path = None
+    t.finish()
+    assert leftover.children == []
+    assert instrument.current() is NULL_TRACE
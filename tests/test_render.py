@@ -0,0 +1,60 @@
+import numpy as np
+
+from navigator.render import _chains, encode_lines, exploration_layer, network_geojson, node_rows, simplify_edges
+
+
+# ====== LỚP VÙNG ĐÃ DUYỆT ======
+def _decode(data):
+    # Giống đoạn JavaScript của EncodedPolylines
+    lines = []
+    for flat in data["lines"]:
+        lat, lon = np.cumsum(flat[0::2]) + data["origin"][0], np.cumsum(flat[1::2]) + data["origin"][1]
+        lines.append(np.stack([lat, lon], axis=1) / data["scale"])
+    return lines
+
+
+def test_chains_cover_every_edge_once():
+    src = [0, 1, 2, 5, 2, 7]
+    dst = [1, 2, 3, 6, 4, 2]
+    lines = _chains(src, dst)
+    pairs = sorted((u, v) for line in lines for u, v in zip(line[:-1], line[1:]))
+    assert pairs == sorted(zip(src, dst))
+    # Cạnh nối tiếp nhau được gộp: 6 cạnh thành ít polyline hơn
+    assert len(lines) < len(src)
+
+
+def test_encode_lines_roundtrip(graph):
+    lines = [[0, 1, 2], [graph.n_nodes - 1, 0]]
+    data = encode_lines(graph, lines)
+    for line, decoded in zip(lines, _decode(data)):
+        np.testing.assert_allclose(decoded[:, 0], graph.y[line], atol=1e-5)
+        np.testing.assert_allclose(decoded[:, 1], graph.x[line], atol=1e-5)
+    assert all(isinstance(v, int) for v in data["lines"][0])
+
+
+def test_simplify_edges(graph):
+    edges = np.arange(graph.n_edges)
+    keep = simplify_edges(graph, np.concatenate([edges, edges]), max_edges=10**9, pixels=64)
+    assert np.all(np.diff(keep) > 0) and set(keep.tolist()) <= set(edges.tolist())
+    # Hai chiều của cùng một cạnh chỉ giữ một
+    src, dst = graph.edge_sources()[keep], graph.targets[keep]
+    assert len({(min(u, v), max(u, v)) for u, v in zip(src.tolist(), dst.tolist())}) == len(keep)
+    assert len(simplify_edges(graph, edges, max_edges=10**9, pixels=4)) < len(keep)
+    assert len(simplify_edges(graph, edges, max_edges=25)) <= 25
+    assert len(simplify_edges(graph, [])) == 0
+
+
+def test_exploration_layer(graph):
+    edges = simplify_edges(graph, np.arange(min(graph.n_edges, 200)))
+    layer = exploration_layer(graph, edges, color="red")
+    drawn = {(u, v) for line in _chains(graph.edge_sources()[edges].tolist(), graph.targets[edges].tolist())
+             for u, v in zip(line[:-1], line[1:])}
+    assert len(drawn) == len(edges)
+    assert len(layer.data["lines"]) > 0 and layer.options["color"] == "red"
+
+
+def test_base_map_layers(graph):
+    feature = network_geojson(graph, max_edges=50)
+    assert len(feature["geometry"]["coordinates"]) <= 50
+    rows = node_rows(graph, max_nodes=30)
+    assert len(rows) == min(30, graph.n_nodes) and rows[0][2] == 0
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from benchmarks.graphs import grid_graph
+from navigator.graph import RoutingGraph
+from navigator.planner import plan_routes
+from navigator.routecache import RouteCache, get_route_cache
+from navigator.store import DistrictData
+from navigator.traffic import get_traffic
+
+
+# ====== VÔ HIỆU HÓA CACHE KẾT QUẢ ======
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _key(version=1, start=0, end=1, **params):
+    return RouteCache.make_key("Quận 1", version, start, end, params)
+
+
+def test_hit_and_miss():
+    cache = RouteCache(max_entries=10, ttl=0)
+    assert cache.get(_key()) is None
+    cache.put(_key(), "a")
+    assert cache.get(_key()) == "a"
+    assert cache.get(_key(mode="bidirectional")) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_lru_eviction():
+    cache = RouteCache(max_entries=2, ttl=0)
+    cache.put(_key(end=1), 1)
+    cache.put(_key(end=2), 2)
+    cache.get(_key(end=1))
+    cache.put(_key(end=3), 3)
+    assert cache.get(_key(end=2)) is None
+    assert cache.get(_key(end=1)) == 1 and cache.get(_key(end=3)) == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl():
+    clock = FakeClock()
+    cache = RouteCache(max_entries=10, ttl=60, clock=clock)
+    cache.put(_key(), "a")
+    clock.now = 59
+    assert cache.get(_key()) == "a"
+    clock.now = 61
+    assert cache.get(_key()) is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_drop_stale_graph_version():
+    cache = RouteCache(max_entries=10, ttl=0)
+    cache.put(_key(version=1), "old")
+    cache.put(_key(version=2), "new")
+    cache.put(RouteCache.make_key("Quận 3", 1, 0, 1, {}), "other")
+    cache.drop_stale("Quận 1", 2)
+    assert cache.get(_key(version=1)) is None
+    assert cache.get(_key(version=2)) == "new"
+    assert cache.get(RouteCache.make_key("Quận 3", 1, 0, 1, {})) == "other"
+
+
+def test_drop_edges():
+    # Chỉ kết quả phụ thuộc vào cạnh vừa đổi bị bỏ; kết quả theo độ dài (không có tập cạnh) được giữ
+    cache = RouteCache(max_entries=10, ttl=0)
+    cache.put(_key(end=1, weight="time"), "a", [3, 1, 2])
+    cache.put(_key(end=2, weight="time"), "b", [7, 8])
+    cache.put(_key(end=3, weight="length"), "len")
+    assert cache.drop_edges("Quận 3", [2]) == 0
+    assert cache.drop_edges("Quận 1", [2, 9]) == 1
+    assert cache.get(_key(end=1, weight="time")) is None
+    assert cache.get(_key(end=2, weight="time")) == "b"
+    assert cache.get(_key(end=3, weight="length")) == "len"
+    assert cache.stats()["dropped"] == 1
+
+
+def test_invalidate():
+    cache = RouteCache(max_entries=10, ttl=0)
+    cache.put(_key(), "a")
+    cache.put(RouteCache.make_key("Quận 3", 1, 0, 1, {}), "b")
+    cache.invalidate("Quận 1")
+    assert cache.get(_key()) is None and cache.stats()["size"] == 1
+    cache.invalidate()
+    assert cache.stats()["size"] == 0
+
+
+@pytest.fixture
+def district(request):
+    # Mỗi test một version đồ thị -> TrafficWeights riêng (get_traffic dùng chung theo khu vực, version)
+    graph = RoutingGraph.from_multigraph(grid_graph(900, seed=1), {"version": request.node.name})
+    yield DistrictData("test-traffic", None, graph)
+    get_route_cache().invalidate("test-traffic")
+
+
+def _set_speed(traffic, graph, edge, kph):
+    return traffic.apply([graph.node_ids[graph.edge_sources()[edge]]], [graph.node_ids[graph.targets[edge]]], [kph])
+
+
+@pytest.mark.parametrize("algorithm", ["astar", "bidirectional", "greedy"])
+def test_traffic_update_drops_only_dependent_routes(district, algorithm):
+    graph = district.graph
+    result, cached = plan_routes(district, 0, 62, algorithm, weight="time")
+    assert not cached and result["paths"]
+    traffic = get_traffic(district)
+    # Cạnh ở góc xa của lưới, ngoài mọi vùng tìm kiếm giữa hai node gần nhau
+    far = int(np.flatnonzero(graph.edge_sources() >= 870)[0])
+    assert len(_set_speed(traffic, graph, far, 7.0)) == 1
+    assert plan_routes(district, 0, 62, algorithm, weight="time")[1]
+    path = result["paths"][0]
+    assert len(_set_speed(traffic, graph, graph.edge_index(path[0], path[1]), 6.0)) == 1
+    fresh, cached = plan_routes(district, 0, 62, algorithm, weight="time")
+    assert not cached and fresh["durations"][0] != result["durations"][0]
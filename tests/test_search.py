@@ -0,0 +1,199 @@
+import numpy as np
+import pytest
+
+from navigator.alternatives import find_truly_different_paths
+from navigator.core import MODES, EdgeWeights, route
+from navigator.graph import RoutingGraph
+from navigator.isochrone import isochrone
+from navigator.landmarks import build_landmarks
+from navigator.reduction import contract_chains, find_components
+from navigator.search import astar, dijkstra
+
+
+# ====== KIỂM TRA VỚI DIJKSTRA LÀM CHUẨN ======
+def assert_valid_path(graph, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    for u, v in zip(path[:-1], path[1:]):
+        assert v in graph.neighbors(u).tolist()
+
+
+def assert_shortest(graph, result, start, goal, weights=None):
+    dist, _ = dijkstra(graph, start, goal, weights=weights)
+    if not np.isfinite(dist[goal]):
+        assert result.path == [] and not np.isfinite(result.distance)
+        return
+    assert_valid_path(graph, result.path, start, goal)
+    assert result.distance == pytest.approx(dist[goal])
+    assert graph.path_length(result.path, weights) == pytest.approx(dist[goal])
+
+
+@pytest.mark.parametrize("mode", [m for m in MODES if m != "greedy"])
+def test_exact_modes(graph, pairs, mode):
+    for s, t in pairs:
+        assert_shortest(graph, route(graph, s, t, mode), s, t)
+
+
+@pytest.mark.parametrize("mode", [m for m in MODES if m != "greedy"])
+def test_exact_modes_weighted(graph, pairs, mode):
+    # Trọng số >= độ dài (vd thời gian đi tính bằng mét tương đương) để heuristic vẫn chấp nhận được
+    values = graph.lengths * np.random.default_rng(1).uniform(1.0, 2.0, graph.n_edges)
+    weights = EdgeWeights(values)
+    for s, t in pairs:
+        assert_shortest(graph, route(graph, s, t, mode, weights=weights), s, t, values)
+
+
+def _outside(graph, scanned, rng):
+    # Trọng số mới: cạnh ngoài tập phụ thuộc đổi tùy ý trong giới hạn chấp nhận được (>= độ dài)
+    values = graph.lengths * rng.uniform(1.0, 3.0, graph.n_edges)
+    mask = np.ones(graph.n_edges, dtype=bool)
+    mask[scanned] = False
+    return mask, values
+
+
+@pytest.mark.parametrize("mode", [m for m in MODES if m != "greedy"] + ["contracted"])
+def test_scanned_edges_cover_result(graph, pairs, mode):
+    # Đổi trọng số mọi cạnh ngoài result.scanned không làm đổi chi phí tốt nhất
+    rng = np.random.default_rng(2)
+    base = graph.lengths * rng.uniform(1.0, 2.0, graph.n_edges)
+    contracted = contract_chains(graph) if mode == "contracted" else None
+
+    def search(values, s, t):
+        weights = EdgeWeights(values)
+        if contracted is not None:
+            return contracted.route(s, t, weights, track_edges=True)
+        return route(graph, s, t, mode, weights, track_edges=True)
+    for s, t in pairs:
+        result = search(base, s, t)
+        mask, values = _outside(graph, result.scanned, rng)
+        changed = np.where(mask, values, base)
+        again = search(changed, s, t)
+        assert again.distance == pytest.approx(result.distance) or not np.isfinite(result.distance) \
+            and not np.isfinite(again.distance)
+
+
+def test_alternatives_scanned_edges(graph, pairs):
+    rng = np.random.default_rng(4)
+    base = EdgeWeights(graph.lengths * rng.uniform(1.0, 2.0, graph.n_edges))
+    for s, t in pairs[:10]:
+        scanned = []
+        paths = find_truly_different_paths(graph, s, t, weights=base, scanned=scanned)
+        mask, values = _outside(graph, np.concatenate(scanned), rng)
+        again = find_truly_different_paths(graph, s, t, weights=EdgeWeights(np.where(mask, values, base.values)))
+        assert again == paths
+
+
+def test_greedy_finds_path(graph, pairs):
+    # Greedy không tối ưu, chỉ cần tìm được đường hợp lệ khi có đường
+    for s, t in pairs:
+        result = route(graph, s, t, "greedy", track_edges=True)
+        dist, _ = dijkstra(graph, s, t)
+        assert bool(result.path) == bool(np.isfinite(dist[t]))
+        if result.path:
+            assert_valid_path(graph, result.path, s, t)
+            assert result.distance == pytest.approx(graph.path_length(result.path))
+            assert result.distance >= dist[t] - 1e-6
+
+
+def test_alt_heuristic(graph, pairs):
+    landmarks = build_landmarks(graph, 4)
+    for s, t in pairs:
+        dist, _ = dijkstra(graph, s, t)
+        alt, _ = astar(graph, s, t, h=landmarks.heuristic(graph, t))
+        assert alt[t] == pytest.approx(dist[t]) or not np.isfinite(dist[t]) and not np.isfinite(alt[t])
+
+
+def test_alt_bounds_never_overestimate(graph, pairs):
+    # Bảng float32: cận phải <= khoảng cách thật (float64) kể cả khi bất đẳng thức tam giác là đẳng thức
+    landmarks = build_landmarks(graph, 8)
+    rev, _ = graph.reversed_graph()
+    for s, t in pairs[:10]:
+        assert np.all(landmarks.lower_bounds(graph, t) <= dijkstra(rev, t)[0])
+        assert np.all(landmarks.lower_bounds(graph, s, reverse=True) <= dijkstra(graph, s)[0])
+
+
+@pytest.mark.parametrize("mode", ["astar", "bidirectional", "contracted"])
+def test_alt_route(graph, pairs, mode):
+    landmarks = build_landmarks(graph, 8)
+    values = graph.lengths * np.random.default_rng(1).uniform(1.0, 2.0, graph.n_edges)
+    contracted = contract_chains(graph) if mode == "contracted" else None
+    settled = {"haversine": 0, "alt": 0}
+    for name, use in (("haversine", None), ("alt", landmarks)):
+        for weights in (None, EdgeWeights(values)):
+            for s, t in pairs:
+                if contracted is not None:
+                    result = contracted.route(s, t, weights, landmarks=use)
+                else:
+                    result = route(graph, s, t, mode, weights, landmarks=use)
+                assert_shortest(graph, result, s, t, None if weights is None else values)
+                settled[name] += result.stats["settled"]
+    assert settled["alt"] <= settled["haversine"]
+
+
+@pytest.mark.parametrize("with_components", [False, True])
+def test_contracted_route(graph, pairs, with_components):
+    contracted = contract_chains(graph)
+    graph.components = find_components(graph) if with_components else None
+    try:
+        for s, t in pairs + [(s, s) for s, _ in pairs[:5]]:
+            assert_shortest(graph, contracted.route(s, t), s, t)
+    finally:
+        graph.components = None
+
+
+def test_components_never_reject_reachable(graph, pairs):
+    components = find_components(graph)
+    # rank là thứ tự topo: không cạnh nào đi ngược rank
+    rank = components.rank[components.scc]
+    assert np.all(rank[graph.edge_sources()] <= rank[graph.targets])
+    for s, t in pairs:
+        dist, _ = dijkstra(graph, s, t)
+        if np.isfinite(dist[t]):
+            assert not components.proven_unreachable(s, t)
+
+
+def test_components_second_order():
+    # 1 -> 0 và 1 -> 2: cùng thành phần yếu, Tarjan xếp scc[2] > scc[0] nên chỉ rank loại được 2 -> 0
+    graph = RoutingGraph.from_edges(np.arange(3), np.zeros(3), np.arange(3) * 1e-3,
+                                    np.array([1, 1]), np.array([0, 2]), np.ones(2))
+    components = find_components(graph)
+    assert components.scc[2] > components.scc[0]
+    reachable = {(0, 0), (1, 1), (2, 2), (1, 0), (1, 2)}
+    for s in range(3):
+        for t in range(3):
+            assert components.proven_unreachable(s, t) == ((s, t) not in reachable)
+
+
+def test_alternatives(graph, pairs):
+    for s, t in pairs[:10]:
+        paths = find_truly_different_paths(graph, s, t, max_paths=3)
+        dist, _ = dijkstra(graph, s, t)
+        if not np.isfinite(dist[t]):
+            assert paths == []
+            continue
+        assert graph.path_length(paths[0]) == pytest.approx(dist[t])
+        assert len({tuple(p) for p in paths}) == len(paths)
+        for p in paths:
+            assert_valid_path(graph, p, s, t)
+
+
+def test_isochrone_nothing_reachable(graph):
+    # Nguồn có chi phí xuất phát vượt cutoff: không node nào, đa giác rỗng thay vì tọa độ NaN
+    iso = isochrone(graph, {0: 500.0}, 100.0)
+    assert len(iso) == 0
+    for shape in ("buffer", "convex"):
+        assert iso.polygon(shape=shape).is_empty
+    assert iso.geojson()["type"] == "Polygon"
+    assert isochrone(graph, 0, 100.0).polygon(cutoff=-1).is_empty
+
+
+def test_isochrone(graph, pairs):
+    sources = [s for s, _ in pairs[:3]]
+    cutoff = 1500.0
+    iso = isochrone(graph, sources, cutoff)
+    best = np.min([dijkstra(graph, s)[0] for s in sources], axis=0)
+    expected = np.flatnonzero(best <= cutoff)
+    assert sorted(iso.nodes.tolist()) == expected.tolist()
+    np.testing.assert_allclose(iso.dist_array()[expected], best[expected])
+    assert np.all(np.diff(iso.dist) >= 0)
+    nodes, _ = iso.within(cutoff / 2)
+    assert sorted(nodes.tolist()) == np.flatnonzero(best <= cutoff / 2).tolist()
@@ -0,0 +1,216 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import numpy as np
+import pytest
+
+from navigator import service as service_module
+from navigator.config import CITYWIDE, SERVICE_MAX_BODY
+from navigator.routecache import get_route_cache
+from navigator.search import dijkstra
+from navigator.service import RoutingService
+
+
+# ====== DỊCH VỤ HTTP TRÊN CACHE FIXTURE ======
+# Một worker là một luồng trong process chính nên GraphStore của test được dùng cho cả phần tìm kiếm
+@pytest.fixture
+def service(store, monkeypatch):
+    monkeypatch.setattr(service_module, "get_store", lambda: store)
+    get_route_cache().invalidate()
+    svc = RoutingService(workers=1, batch_ms=5, timeout=10)
+    for f in svc.start_workers():
+        f.result()
+    yield svc
+    svc.close()
+
+
+@pytest.fixture
+def graph(store):
+    return store.get("Quận 1").graph
+
+
+def _call(service, method, target, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    return asyncio.run(service.dispatch(method, target, data))
+
+
+def _route(origin, destination, **extra):
+    return {"district": "Quận 1", "origin": origin, "destination": destination, **extra}
+
+
+def _pairs(graph, n=15):
+    rng = np.random.default_rng(6)
+    return rng.integers(0, graph.n_nodes, size=(n, 2)).tolist()
+
+
+def test_route_matches_dijkstra(service, graph):
+    for s, t in _pairs(graph):
+        status, res = _call(service, "POST", "/route", _route(f"N{s + 1:03d}", int(graph.node_ids[t])))
+        assert status == HTTPStatus.OK
+        dist, _ = dijkstra(graph, s, t)
+        if not np.isfinite(dist[t]):
+            assert res == {"found": False}
+            continue
+        assert res["found"] and res["distance_m"] == pytest.approx(dist[t], abs=0.01)
+        assert res["nodes"][0] == graph.node_ids[s] and res["nodes"][-1] == graph.node_ids[t]
+
+
+def test_point_snaps_to_nearest_node(service, graph):
+    status, res = _call(service, "POST", "/route", _route([float(graph.y[3]), float(graph.x[3])],
+                                                          {"lat": float(graph.y[3]), "lon": float(graph.x[3])}))
+    assert status == HTTPStatus.OK and res["nodes"] == [int(graph.node_ids[3])]
+
+
+def test_routes_from_one_origin_are_batched(service, graph):
+    targets = ["N010", "N020", "N030", "N020"]
+
+    async def burst():
+        return await asyncio.gather(*(service.dispatch("POST", "/route", json.dumps(_route("N001", t)).encode())
+                                      for t in targets))
+    results = asyncio.run(burst())
+    assert all(status == HTTPStatus.OK for status, _ in results)
+    assert results[1][1] == results[3][1]
+    # Ba đích khác nhau trong một lần một-nhiều, đích trùng dùng chung yêu cầu đang chạy
+    assert (service.counters["batches"], service.counters["batched"], service.counters["coalesced"]) == (1, 3, 1)
+    for label, (_, res) in zip(targets, results):
+        t = int(label[1:]) - 1
+        dist, _ = dijkstra(graph, 0, t)
+        assert res["distance_m"] == pytest.approx(dist[t], abs=0.01) if res["found"] else not np.isfinite(dist[t])
+
+
+def test_citywide_routes_are_not_batched(service, store):
+    targets = ["N010", "N020", "N030"]
+
+    async def burst():
+        body = {"district": CITYWIDE, "origin": "N001"}
+        return await asyncio.gather(*(service.dispatch("POST", "/route", json.dumps(dict(body, destination=t)).encode())
+                                      for t in targets))
+    results = asyncio.run(burst())
+    assert service.counters["batches"] == 0
+    city = store.get(CITYWIDE).graph
+    for label, (status, res) in zip(targets, results):
+        t = int(label[1:]) - 1
+        dist, _ = dijkstra(city, 0, t)
+        assert status == HTTPStatus.OK
+        assert res["distance_m"] == pytest.approx(dist[t], abs=0.01) if res["found"] else not np.isfinite(dist[t])
+
+
+def test_batch_fails_when_pool_rejects(service, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("pool đã đóng")
+    monkeypatch.setattr(service.executor, "submit", broken)
+    service.timeout = 2
+    status, res = _call(service, "POST", "/route", _route("N001", "N002"))
+    assert status == HTTPStatus.INTERNAL_SERVER_ERROR and res["error"] == "RuntimeError: pool đã đóng"
+
+
+def test_matrix(service, graph):
+    origins, destinations = ["N001", "N005", "N009"], ["N002", "N040"]
+    status, res = _call(service, "POST", "/matrix", {"district": "Quận 1", "origins": origins,
+                                                     "destinations": destinations})
+    assert status == HTTPStatus.OK
+    for origin, row in zip(origins, res["distances"]):
+        dist, _ = dijkstra(graph, int(origin[1:]) - 1)
+        expected = [dist[int(d[1:]) - 1] for d in destinations]
+        assert row == [round(float(d), 2) if np.isfinite(d) else None for d in expected]
+
+
+def test_alternatives(service, graph):
+    status, res = _call(service, "POST", "/alternatives", _route("N001", "N040", max_paths=3))
+    assert status == HTTPStatus.OK and not res["cached"]
+    dist, _ = dijkstra(graph, 0, 39)
+    assert res["routes"][0]["distance_m"] == pytest.approx(dist[39], abs=0.01)
+    assert 1 <= len(res["routes"]) <= 3
+    assert _call(service, "POST", "/alternatives", _route("N001", "N040", max_paths=3))[1]["cached"]
+
+
+def test_isochrone(service, graph):
+    status, res = _call(service, "POST", "/isochrone", {"district": "Quận 1", "sources": ["N001"], "cutoff": 300})
+    assert status == HTTPStatus.OK
+    dist, _ = dijkstra(graph, 0)
+    assert res["reached"] == int(np.sum(dist <= 300))
+    assert sorted(res["nodes"]) == sorted(graph.node_ids[dist <= 300].tolist())
+    assert res["polygon"]["type"] in ("Polygon", "MultiPolygon")
+
+
+@pytest.mark.parametrize("method, target, body, status", [
+    ("GET", "/khong-co", None, HTTPStatus.NOT_FOUND),
+    ("POST", "/route", {"district": "Quận 99", "origin": "N001", "destination": "N002"}, HTTPStatus.BAD_REQUEST),
+    ("POST", "/route", _route("N001", "X"), HTTPStatus.BAD_REQUEST),
+    ("POST", "/route", _route("N001", "N002", weight="fuel"), HTTPStatus.BAD_REQUEST),
+    ("POST", "/route", {"district": "Quận 1"}, HTTPStatus.BAD_REQUEST),
+    ("POST", "/matrix", {"district": "Quận 1", "origins": [], "destinations": ["N001"]}, HTTPStatus.BAD_REQUEST),
+    ("POST", "/alternatives", _route("N001", "N040", max_paths=0), HTTPStatus.BAD_REQUEST),
+    ("POST", "/isochrone", {"district": "Quận 1", "sources": ["N001"], "cutoff": 100, "shape": "star"},
+     HTTPStatus.BAD_REQUEST),
+])
+def test_bad_requests(service, method, target, body, status):
+    code, res = _call(service, method, target, body)
+    assert code == status and "error" in res
+    assert service.counters["errors"] == (0 if status == HTTPStatus.NOT_FOUND else 1)
+
+
+def test_invalid_json(service):
+    code, res = asyncio.run(service.dispatch("POST", "/route", b"{"))
+    assert code == HTTPStatus.BAD_REQUEST and res["error"].startswith("JSONDecodeError")
+
+
+# ====== HTTP/1.1 ======
+async def _exchange(reader, writer, method, target, data=b"", headers=""):
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n{headers}\r\n"
+                 .encode("latin-1") + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    received = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        received[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(received["content-length"]))
+    return status, received, json.loads(body)
+
+
+def _over_http(service, client):
+    async def main():
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            try:
+                return await client(reader, writer)
+            finally:
+                writer.close()
+    return asyncio.run(main())
+
+
+def test_keep_alive(service):
+    async def client(reader, writer):
+        first = await _exchange(reader, writer, "GET", "/health")
+        second = await _exchange(reader, writer, "POST", "/route",
+                                  json.dumps(_route("N001", "N002")).encode("utf-8"), "Connection: close\r\n")
+        return first, second, await reader.read()
+    (status, headers, body), (status2, headers2, body2), rest = _over_http(service, client)
+    assert status == 200 and headers["connection"] == "keep-alive" and body["status"] == "ok"
+    assert status2 == 200 and headers2["connection"] == "close" and "found" in body2
+    assert rest == b""
+
+
+def test_body_too_large(service):
+    async def client(reader, writer):
+        writer.write(f"POST /route HTTP/1.1\r\nContent-Length: {SERVICE_MAX_BODY + 1}\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        return await reader.read()
+    head = _over_http(service, client).split(b"\r\n", 1)[0]
+    assert head == b"HTTP/1.1 413 Request Entity Too Large"
+
+
+@pytest.mark.parametrize("request_head", [b"GARBAGE\r\n\r\n", b"POST /route HTTP/1.1 x\r\n\r\n",
+                                          b"POST /route HTTP/1.1\r\nContent-Length: abc\r\n\r\n",
+                                          b"POST /route HTTP/1.1\r\nContent-Length: -4\r\n\r\n"])
+def test_malformed_request_gets_400(service, request_head):
+    async def client(reader, writer):
+        writer.write(request_head)
+        await writer.drain()
+        return await reader.read()
+    head, _, body = _over_http(service, client).partition(b"\r\n\r\n")
+    assert head.split(b"\r\n")[0] == b"HTTP/1.1 400 Bad Request"
+    assert b"Connection: close" in head and "error" in json.loads(body)
@@ -0,0 +1,56 @@
+import numpy as np
+
+from navigator.spatial import SpatialIndex
+
+
+# ====== KIỂM TRA VỚI DUYỆT TOÀN BỘ ======
+def _queries(graph, n=50):
+    # Điểm ngẫu nhiên trong khung bao của đồ thị, lấn ra ngoài một chút
+    rng = np.random.default_rng(3)
+    pad_y, pad_x = np.ptp(graph.y) * 0.1, np.ptp(graph.x) * 0.1
+    lat = rng.uniform(graph.y.min() - pad_y, graph.y.max() + pad_y, n)
+    lon = rng.uniform(graph.x.min() - pad_x, graph.x.max() + pad_x, n)
+    return lat, lon
+
+
+def _brute(index, graph, lat, lon):
+    px, py = index.project(graph.y, graph.x)
+    qx, qy = index.project(lat, lon)
+    return np.hypot(px - qx, py - qy)
+
+
+def test_nearest(graph):
+    index = SpatialIndex(graph.y, graph.x)
+    lats, lons = _queries(graph)
+    for lat, lon in zip(lats.tolist(), lons.tolist()):
+        d = _brute(index, graph, lat, lon)
+        node, dist = index.nearest(lat, lon)
+        assert dist == d.min() and d[node] == d.min()
+
+
+def test_k_nearest(graph):
+    index = SpatialIndex(graph.y, graph.x)
+    lats, lons = _queries(graph)
+    for lat, lon in zip(lats.tolist(), lons.tolist()):
+        d = _brute(index, graph, lat, lon)
+        nodes, dists = index.k_nearest(lat, lon, 8)
+        np.testing.assert_allclose(dists, np.sort(d)[:8])
+        np.testing.assert_allclose(d[nodes], dists)
+
+
+def test_within_radius(graph):
+    index = SpatialIndex(graph.y, graph.x)
+    lats, lons = _queries(graph)
+    for lat, lon in zip(lats.tolist(), lons.tolist()):
+        d = _brute(index, graph, lat, lon)
+        nodes, dists = index.within_radius(lat, lon, 300.0)
+        assert sorted(nodes.tolist()) == np.flatnonzero(d <= 300.0).tolist()
+        assert np.all(np.diff(dists) >= 0)
+
+
+def test_snap(graph):
+    index = SpatialIndex(graph.y, graph.x)
+    lats, lons = _queries(graph, 500)
+    nodes, dists = index.snap(lats, lons, chunk=64)
+    best = np.array([_brute(index, graph, lat, lon).min() for lat, lon in zip(lats, lons)])
+    np.testing.assert_allclose(dists, best)
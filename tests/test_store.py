@@ -0,0 +1,118 @@
+import threading
+import time
+
+from benchmarks.graphs import grid_graph
+from navigator.citywide import citywide_path
+from navigator.config import CITYWIDE
+from navigator.graph import RoutingGraph
+from navigator.store import DistrictData, GraphStore
+
+
+# ====== KHO ĐỒ THỊ: LRU VÀ NGÂN SÁCH BỘ NHỚ ======
+DISTRICTS = {"a": "Khu A", "b": "Khu B", "c": "Khu C"}
+
+
+class Loader:
+    # Đồ thị lưới trong bộ nhớ (không có file cache), đếm số lần tải theo khu vực
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, place_name):
+        with self._lock:
+            self.calls[place_name] = self.calls.get(place_name, 0) + 1
+        time.sleep(self.delay)
+        seed = sorted(DISTRICTS.values()).index(place_name)
+        return RoutingGraph.from_multigraph(grid_graph(400, seed=seed), {"version": place_name})
+
+
+def _budget_mb(entries):
+    size = DistrictData("a", "Khu A", Loader()("Khu A")).nbytes
+    return entries * size / 1024**2
+
+
+def test_hits_misses_and_lru(store):
+    first = store.get("Quận 1")
+    assert store.get("Quận 1") is first
+    store.get("Quận 3")
+    assert store.stats()["resident"] == ["Quận 1", "Quận 3"]
+    store.get("Quận 1")
+    stats = store.stats()
+    assert stats["resident"] == ["Quận 3", "Quận 1"]
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 0)
+    assert stats["hit_rate"] == 0.5
+    assert stats["nbytes"] == sum(report["total"] for report in stats["districts"].values())
+
+
+def test_district_data(store):
+    district = store.get("Quận 1")
+    graph = district.graph
+    # Bảng ALT, nhãn thành phần và thuộc tính đọc từ các file cạnh cache đồ thị
+    assert district.landmarks is not None and district.components is not None
+    assert district.attributes is not None and not district.attributes.loaded
+    assert district.node_mapping[0] == "N001" and district.reverse_mapping["N001"] == 0
+    assert len(district.node_mapping) == graph.n_nodes
+    report = district.memory()
+    assert report["graph"] == graph.nbytes and report["total"] == district.nbytes
+
+
+def test_citywide_in_cache_dir(store, fixture_cache, tmp_path, monkeypatch):
+    # Đồ thị toàn thành phố được gộp vào cùng thư mục cache với các quận, không phải cache_graphs/
+    monkeypatch.chdir(tmp_path)
+    city = store.get(CITYWIDE)
+    assert city.citywide is not None and city.place_name is None
+    assert city.graph.meta["path"] == str(citywide_path(fixture_cache))
+    ids = set().union(*(store.get(name).graph.node_ids.tolist() for name in ("Quận 1", "Quận 3")))
+    assert city.graph.n_nodes == len(ids)
+    assert not (tmp_path / "cache_graphs").exists()
+
+
+def test_memory_budget_evicts_least_recent():
+    store = GraphStore(DISTRICTS, memory_budget=_budget_mb(2.5), loader=Loader())
+    store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    stats = store.stats()
+    assert stats["resident"] == ["a", "c"] and stats["evictions"] == 1
+    assert stats["nbytes"] <= stats["memory_budget"]
+
+
+def test_newest_kept_over_budget():
+    # Một quận vượt ngân sách vẫn được giữ, mọi quận khác bị loại
+    loader = Loader()
+    store = GraphStore(DISTRICTS, memory_budget=_budget_mb(0.5), loader=loader)
+    for name in ("a", "b", "c"):
+        assert store.get(name).name == name
+        assert store.stats()["resident"] == [name]
+    assert store.evictions == 2
+    store.get("a")
+    assert loader.calls["Khu A"] == 2
+
+
+def test_concurrent_get_loads_once():
+    loader = Loader(delay=0.1)
+    store = GraphStore(DISTRICTS, loader=loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get("b"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loader.calls == {"Khu B": 1}
+    assert all(r is results[0] for r in results)
+    assert (store.misses, store.hits) == (1, 7)
+
+
+def test_invalidate():
+    loader = Loader()
+    store = GraphStore(DISTRICTS, loader=loader)
+    store.get("a")
+    store.get("b")
+    store.invalidate("a")
+    assert store.stats()["resident"] == ["b"]
+    store.get("a")
+    assert loader.calls["Khu A"] == 2
+    store.invalidate()
+    assert store.stats()["resident"] == []